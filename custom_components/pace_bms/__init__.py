@@ -5,10 +5,47 @@ from datetime import timedelta
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryNotReady
-
-from .const import CONF_SCAN_INTERVAL, DOMAIN, DEFAULT_SCAN_INTERVAL
-from .coordinator import PaceBMSCoordinator
+from homeassistant.exceptions import (
+    ConfigEntryError,
+    ConfigEntryNotReady,
+    HomeAssistantError,
+)
+from homeassistant.helpers import entity_registry as er
+from pymodbus.exceptions import ConnectionException
+
+from .balancing import BalanceTracker
+from .cell_statistics import CellStatisticsImporter, async_remove_cell_statistics
+from .const import (
+    CONF_CELL_STATISTICS,
+    CONF_DRIFT_TREND_THRESHOLD,
+    CONF_DRIFT_Z_THRESHOLD,
+    CONF_GATEWAY_HOST,
+    CONF_GATEWAY_MAX_AGE,
+    CONF_GATEWAY_PORT,
+    CONF_GATEWAY_WRITES,
+    CONF_HISTORY,
+    CONF_METRICS,
+    CONF_PASSIVE,
+    CONF_SCAN_INTERVAL,
+    CONF_TRACING,
+    DATA_GATEWAYS,
+    DATA_METRICS_VIEW,
+    DEFAULT_CELL_STATISTICS,
+    DEFAULT_GATEWAY_HOST,
+    DEFAULT_GATEWAY_PORT,
+    DEFAULT_HISTORY,
+    DEFAULT_METRICS,
+    DEFAULT_PASSIVE,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_TRACING,
+    DOMAIN,
+)
+from .coordinator import PaceBMSCoordinator, async_remove_layout
+from .gateway import async_register_gateway, async_unregister_gateway
+from .history import async_register_history, async_unregister_history
+from .metrics import PaceBMSMetricsView
+from .services import async_register_services
+from .tracing import TRACER
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -18,20 +55,59 @@ PLATFORMS: list[Platform] = [
     Platform.BINARY_SENSOR,
 ]
 
+# Options applied to a running entry in place; any other change reloads it
+HOT_OPTIONS = frozenset(
+    {
+        CONF_SCAN_INTERVAL,
+        CONF_TRACING,
+        CONF_METRICS,
+        CONF_HISTORY,
+        CONF_GATEWAY_HOST,
+        CONF_GATEWAY_PORT,
+        CONF_GATEWAY_MAX_AGE,
+        CONF_GATEWAY_WRITES,
+        CONF_DRIFT_Z_THRESHOLD,
+        CONF_DRIFT_TREND_THRESHOLD,
+    }
+)
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Pace BMS from a config entry."""
     scan_interval = entry.data.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
-    coordinator = PaceBMSCoordinator(
-        hass,
-        entry.data,
-        timedelta(seconds=scan_interval),
-        entry.entry_id,
+    if entry.data.get(CONF_TRACING, DEFAULT_TRACING):
+        TRACER.enable(entry.entry_id)
+    try:
+        coordinator = PaceBMSCoordinator(
+            hass,
+            entry.data,
+            timedelta(seconds=scan_interval),
+            entry.entry_id,
+        )
+    except ConnectionException as err:
+        # The settings themselves are unusable, retrying will not help
+        TRACER.disable(entry.entry_id)
+        raise ConfigEntryError(str(err)) from err
+
+    # Carry on the balancing counters from before, and skip detecting the layout
+    # if it is known
+    await coordinator.balancing.async_load()
+    await coordinator.async_load_layout()
+
+    # Poll only the register blocks the enabled entities need
+    coordinator.async_update_plan()
+    entry.async_on_unload(
+        hass.bus.async_listen(
+            er.EVENT_ENTITY_REGISTRY_UPDATED, coordinator.async_registry_updated
+        )
     )
 
     try:
         await coordinator.async_config_entry_first_refresh()
     except Exception as err:
+        TRACER.disable(entry.entry_id)
+        await coordinator.async_shutdown()
+        await hass.async_add_executor_job(coordinator.disconnect)
         raise ConfigEntryNotReady from err
 
     hass.data.setdefault(DOMAIN, {})
@@ -39,21 +115,114 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    # Re-export the register image to other Modbus clients if enabled
+    await _async_start_gateway(hass, entry, coordinator)
+
+    # Record telemetry in the integration's own compact history store
+    if entry.data.get(CONF_HISTORY, DEFAULT_HISTORY):
+        await async_register_history(hass, coordinator)
+
+    # Aggregate cell voltages into hourly long-term statistics ourselves
+    if entry.data.get(CONF_CELL_STATISTICS, DEFAULT_CELL_STATISTICS):
+        importer = CellStatisticsImporter(hass, coordinator)
+        await importer.async_start()
+        entry.async_on_unload(importer.async_stop)
+
+    if entry.data.get(CONF_METRICS, DEFAULT_METRICS):
+        _register_metrics_view(hass)
+
+    await async_register_services(hass)
+
     entry.async_on_unload(entry.add_update_listener(async_reload_entry))
 
     return True
 
 
+async def _async_start_gateway(
+    hass: HomeAssistant, entry: ConfigEntry, coordinator: PaceBMSCoordinator
+) -> None:
+    """Serve the pack through the local Modbus gateway if one is configured."""
+    gateway_port = entry.data.get(CONF_GATEWAY_PORT, DEFAULT_GATEWAY_PORT)
+    if not gateway_port or not coordinator.register_access:
+        return
+    try:
+        await async_register_gateway(
+            hass,
+            hass.data.setdefault(DATA_GATEWAYS, {}),
+            entry.data.get(CONF_GATEWAY_HOST, DEFAULT_GATEWAY_HOST),
+            gateway_port,
+            coordinator,
+        )
+    except (OSError, HomeAssistantError) as err:
+        _LOGGER.error("Failed to start Modbus gateway on port %d: %s", gateway_port, err)
+
+
+def _register_metrics_view(hass: HomeAssistant) -> None:
+    """Register the metrics view unless an earlier entry did."""
+    # Views cannot be removed, so one view serves every entry with metrics enabled
+    if not hass.data.get(DATA_METRICS_VIEW):
+        hass.http.register_view(PaceBMSMetricsView(hass))
+        hass.data[DATA_METRICS_VIEW] = True
+
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Reload config entry when options change."""
-    await hass.config_entries.async_reload(entry.entry_id)
+    """Apply changed options, reloading the entry only if they need it."""
+    coordinator: PaceBMSCoordinator = hass.data[DOMAIN][entry.entry_id]
+    old = coordinator.config
+    changed = {key for key in {*old, *entry.data} if old.get(key) != entry.data.get(key)}
+    if not changed:
+        return
+    hot = HOT_OPTIONS
+    if entry.data.get(CONF_PASSIVE, DEFAULT_PASSIVE):
+        # A passive link takes its maximum block age from the scan interval
+        hot = HOT_OPTIONS - {CONF_SCAN_INTERVAL}
+    if not changed <= hot:
+        # The link stays open across the reload if its settings did not change
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    _LOGGER.debug("Applying %s to %s in place", ", ".join(sorted(changed)), entry.title)
+    coordinator.config = entry.data
+    if CONF_SCAN_INTERVAL in changed:
+        coordinator.async_set_update_interval(
+            timedelta(seconds=entry.data.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL))
+        )
+    if CONF_TRACING in changed:
+        if entry.data.get(CONF_TRACING, DEFAULT_TRACING):
+            TRACER.enable(entry.entry_id)
+        else:
+            TRACER.disable(entry.entry_id)
+    if CONF_METRICS in changed and entry.data.get(CONF_METRICS, DEFAULT_METRICS):
+        _register_metrics_view(hass)
+    if CONF_HISTORY in changed:
+        if entry.data.get(CONF_HISTORY, DEFAULT_HISTORY):
+            await async_register_history(hass, coordinator)
+        else:
+            await async_unregister_history(hass, coordinator)
+    # The maximum age and writes are looked up per request
+    if changed & {CONF_GATEWAY_HOST, CONF_GATEWAY_PORT}:
+        await async_unregister_gateway(hass, hass.data.get(DATA_GATEWAYS, {}), coordinator)
+        await _async_start_gateway(hass, entry, coordinator)
+    # Metrics, history and the gateway all decide which registers are read
+    coordinator.async_update_plan()
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        TRACER.disable(entry.entry_id)
+        await coordinator.async_shutdown()
+        await async_unregister_gateway(hass, hass.data.get(DATA_GATEWAYS, {}), coordinator)
+        await async_unregister_history(hass, coordinator)
         # Disconnect from the BMS
         await hass.async_add_executor_job(coordinator.disconnect)
 
-    return unload_ok
\ No newline at end of file
+    return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the data an entry saved."""
+    await BalanceTracker(hass, entry.entry_id).async_remove()
+    await async_remove_cell_statistics(hass, entry.entry_id)
+    await async_remove_layout(hass, entry.entry_id)
@@ -0,0 +1,101 @@
+"""Per-cell balancing time and transition counters.
+
+A cell the BMS keeps bleeding is an early sign of a weak or high cell, but the
+balance status register only says which cells balance right now. Each poll
+adds the time since the previous one to the cells that were balancing and
+counts the cells whose balancing switched on or off, in constant time per
+cell. The counters are persisted so they survive restarts.
+"""
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    BALANCE_MAX_GAP,
+    BALANCE_SAVE_DELAY,
+    BALANCE_STORAGE_VERSION,
+    DOMAIN,
+    REG_CELL_VOLTAGE_COUNT,
+)
+
+
+class BalanceTracker:
+    """Accumulate balancing time and on/off transitions of each cell of a pack."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, BALANCE_STORAGE_VERSION, f"{DOMAIN}.balancing.{entry_id}"
+        )
+        self.seconds = [0.0] * REG_CELL_VOLTAGE_COUNT
+        self.transitions = [0] * REG_CELL_VOLTAGE_COUNT
+        # Time covered by samples, the denominator of each cell's duty cycle
+        self.observed = 0.0
+        self._status: int | None = None
+        self._time: float | None = None
+
+    async def async_load(self) -> None:
+        """Restore the counters saved earlier."""
+        if (data := await self._store.async_load()) is None:
+            return
+        self.seconds[: len(data["seconds"])] = data["seconds"]
+        self.transitions[: len(data["transitions"])] = data["transitions"]
+        self.observed = data["observed"]
+
+    async def async_save(self) -> None:
+        """Save the counters now."""
+        await self._store.async_save(self._data())
+
+    async def async_remove(self) -> None:
+        """Delete the saved counters."""
+        await self._store.async_remove()
+
+    def _data(self) -> dict[str, Any]:
+        """Return the counters to persist."""
+        return {
+            "seconds": [round(seconds, 1) for seconds in self.seconds],
+            "transitions": self.transitions,
+            "observed": round(self.observed, 1),
+        }
+
+    @callback
+    def update(self, status: int, now: float) -> None:
+        """Add a balance status sample taken at a wall-clock time."""
+        previous, last = self._status, self._time
+        self._status, self._time = status, now
+        if previous is None:
+            # The state before the first sample after a restart is unknown
+            return
+        elapsed = now - last
+        # Time across a long gap, such as failing polls, is not attributed
+        if 0 < elapsed <= BALANCE_MAX_GAP:
+            self.observed += elapsed
+            bits = previous
+            while bits:
+                cell = (bits & -bits).bit_length() - 1
+                if cell < REG_CELL_VOLTAGE_COUNT:
+                    self.seconds[cell] += elapsed
+                bits &= bits - 1
+        changed = status ^ previous
+        while changed:
+            cell = (changed & -changed).bit_length() - 1
+            if cell < REG_CELL_VOLTAGE_COUNT:
+                self.transitions[cell] += 1
+            changed &= changed - 1
+        self._store.async_delay_save(self._data, BALANCE_SAVE_DELAY)
+
+    def duty_cycles(self, cells: int) -> list[float | None]:
+        """Return the percentage of observed time each cell balanced."""
+        if not self.observed:
+            return [None] * cells
+        return [round(100 * seconds / self.observed, 2) for seconds in self.seconds[:cells]]
+
+    def as_dict(self, cells: int) -> dict[str, Any]:
+        """Return the counters of the populated cells."""
+        return {
+            "observed_seconds": round(self.observed, 1),
+            "balancing_seconds": [round(seconds, 1) for seconds in self.seconds[:cells]],
+            "balancing_transitions": self.transitions[:cells],
+            "balancing_duty_cycle": self.duty_cycles(cells),
+        }
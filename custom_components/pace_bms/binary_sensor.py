@@ -17,6 +17,10 @@ async def async_setup_entry(
     """Set up Pace BMS binary sensors."""
     coordinator: PaceBMSCoordinator = hass.data[DOMAIN][entry.entry_id]
 
+    # Status bits are only reachable through holding registers
+    if not coordinator.register_access:
+        return
+
     entities = [
         PaceBMSStatusBinarySensor(coordinator, 8, "Charging"),
         PaceBMSStatusBinarySensor(coordinator, 9, "Discharging"),
@@ -0,0 +1,171 @@
+"""Compact binary capture of bus transactions for offline replay.
+
+Every transaction is stored as a pair of records: the request frame and the
+response frame (or a no-response marker). Frames are normalised to Modbus RTU
+(slave address + PDU + CRC) whatever transport carried them, so captures from
+serial ports and TCP gateways replay the same way.
+
+File layout: an 8-byte magic, then records of a 7-byte header (time since the
+previous record in microseconds, record kind, frame length) followed by the
+frame. Each time capture starts, a session record holding the wall-clock start
+time is appended, so one file can span several Home Assistant restarts.
+"""
+import logging
+import os
+import struct
+import threading
+import time
+from collections.abc import Iterator
+
+from .framing import (
+    FUNC_READ_HOLDING_REGISTERS,
+    FUNC_WRITE_MULTIPLE_REGISTERS,
+    read_request_pdu,
+    rtu_frame,
+    write_request_pdu,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+CAPTURE_MAGIC = b"PBMSCAP\x01"
+
+RECORD_SESSION = 0
+RECORD_REQUEST = 1
+RECORD_RESPONSE = 2
+# The slave did not answer, or answered with a frame we could not use
+RECORD_NO_RESPONSE = 3
+
+_RECORD = struct.Struct("<IBH")
+_SESSION = struct.Struct("<d")
+_MAX_DELTA = 0xFFFFFFFF
+
+
+def read_response_frame(slave_id: int, values: list[int]) -> bytes:
+    """Build the RTU frame of a successful read response."""
+    count = len(values)
+    return rtu_frame(
+        slave_id, struct.pack(f">BB{count}H", FUNC_READ_HOLDING_REGISTERS, count * 2, *values)
+    )
+
+
+def exception_frame(slave_id: int, function: int, code: int | None) -> bytes:
+    """Build the RTU frame of an exception response."""
+    # Unknown codes are recorded as a slave device failure
+    return rtu_frame(slave_id, bytes((function | 0x80, 0x04 if code is None else code)))
+
+
+class BusCapture:
+    """Appends transactions to a capture file."""
+
+    def __init__(self, path: str) -> None:
+        """Initialize."""
+        self.path = path
+        self._lock = threading.Lock()
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "ab")
+        if new:
+            self._file.write(CAPTURE_MAGIC)
+        self._last = time.monotonic()
+        self._write(RECORD_SESSION, _SESSION.pack(time.time()), self._last)
+        self._file.flush()
+        _LOGGER.info("Capturing bus traffic to %s", path)
+
+    def _write(self, kind: int, frame: bytes, now: float) -> None:
+        """Append one record."""
+        delta = min(int((now - self._last) * 1_000_000), _MAX_DELTA)
+        self._last = now
+        self._file.write(_RECORD.pack(max(delta, 0), kind, len(frame)))
+        self._file.write(frame)
+
+    def record(
+        self, request: bytes, started: float, response: bytes | None, finished: float
+    ) -> None:
+        """Append one transaction; response None means no usable reply."""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._write(RECORD_REQUEST, request, started)
+            if response is None:
+                self._write(RECORD_NO_RESPONSE, b"", finished)
+            else:
+                self._write(RECORD_RESPONSE, response, finished)
+            self._file.flush()
+
+    def record_read(
+        self,
+        slave_id: int,
+        address: int,
+        count: int,
+        started: float,
+        finished: float,
+        values: list[int] | None = None,
+        code: int | None = None,
+    ) -> None:
+        """Append a read transaction from its decoded outcome."""
+        if values is not None:
+            response = read_response_frame(slave_id, values)
+        elif code is not None:
+            response = exception_frame(slave_id, FUNC_READ_HOLDING_REGISTERS, code)
+        else:
+            response = None
+        self.record(
+            rtu_frame(slave_id, read_request_pdu(address, count)), started, response, finished
+        )
+
+    def record_write(
+        self,
+        slave_id: int,
+        address: int,
+        values: list[int],
+        started: float,
+        finished: float,
+        success: bool,
+        code: int | None = None,
+    ) -> None:
+        """Append a write transaction from its decoded outcome."""
+        request = write_request_pdu(address, values)
+        if success:
+            response = rtu_frame(slave_id, request[:5])
+        elif code is not None:
+            response = exception_frame(slave_id, FUNC_WRITE_MULTIPLE_REGISTERS, code)
+        else:
+            response = None
+        self.record(rtu_frame(slave_id, request), started, response, finished)
+
+    def close(self) -> None:
+        """Flush and close the file."""
+        with self._lock:
+            self._file.close()
+
+
+def read_capture(path: str) -> Iterator[tuple[float, int, bytes]]:
+    """Yield (seconds since capture start, kind, frame) for every record.
+
+    Sessions are laid end to end, so time only moves forward across restarts.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"{path} is not a Pace BMS capture file")
+        offset = 0.0
+        while header := file.read(_RECORD.size):
+            if len(header) < _RECORD.size:
+                break
+            delta, kind, length = _RECORD.unpack(header)
+            frame = file.read(length)
+            if len(frame) < length:
+                # Truncated by a crash while writing
+                break
+            if kind != RECORD_SESSION:
+                offset += delta / 1_000_000
+            yield offset, kind, frame
+
+
+def read_transactions(path: str) -> Iterator[tuple[float, bytes, float, bytes | None]]:
+    """Yield (request time, request, response time, response or None) pairs."""
+    request: tuple[float, bytes] | None = None
+    for timestamp, kind, frame in read_capture(path):
+        if kind == RECORD_REQUEST:
+            request = (timestamp, frame)
+        elif kind in (RECORD_RESPONSE, RECORD_NO_RESPONSE) and request is not None:
+            yield request[0], request[1], timestamp, frame if kind == RECORD_RESPONSE else None
+            request = None
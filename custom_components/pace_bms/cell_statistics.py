@@ -0,0 +1,156 @@
+"""Hourly long-term statistics of cell voltages, imported in bulk.
+
+Cell sensors then need no state class: instead of the recorder compiling
+statistics from the state rows of every cell entity, the mean, min and max of
+each cell are accumulated from the polls and added once per hour as external
+statistics. Only complete hours are imported: the hour in progress is kept in
+storage across reloads and restarts and continued when polling resumes.
+"""
+import logging
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.const import UnitOfElectricPotential
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    CELL_STATISTICS_PERIOD,
+    CELL_STATISTICS_SAVE_DELAY,
+    CELL_STATISTICS_STORAGE_VERSION,
+    DOMAIN,
+    REG_CELL_VOLTAGE_COUNT,
+)
+from .history import Rollup
+
+if TYPE_CHECKING:
+    from .coordinator import PaceBMSCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+_CELL_KEYS = tuple(f"cell_{i}_voltage" for i in range(1, REG_CELL_VOLTAGE_COUNT + 1))
+
+
+def statistic_id(entry_id: str, key: str) -> str:
+    """Return the external statistic ID of one cell of a pack."""
+    return f"{DOMAIN}:{entry_id.lower()}_{key}"
+
+
+def _hour_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Return the storage of a pack's hour in progress."""
+    return Store(
+        hass, CELL_STATISTICS_STORAGE_VERSION, f"{DOMAIN}.cell_statistics.{entry_id}"
+    )
+
+
+def _hour(rollups: dict[str, Rollup]) -> float:
+    """Return the start of the hour the cell rollups cover."""
+    return next(iter(rollups.values())).start
+
+
+async def async_remove_cell_statistics(hass: HomeAssistant, entry_id: str) -> None:
+    """Delete a pack's saved hour in progress."""
+    await _hour_store(hass, entry_id).async_remove()
+
+
+class CellStatisticsImporter:
+    """Accumulate one pack's cell voltages and import them every hour."""
+
+    def __init__(self, hass: HomeAssistant, coordinator: "PaceBMSCoordinator") -> None:
+        """Initialize."""
+        self.hass = hass
+        self.coordinator = coordinator
+        self._store = _hour_store(hass, coordinator.entry_id)
+        # One rollup per cell, so a cell missing from a poll does not split the hour
+        self._rollups: dict[str, Rollup] = {}
+        self._last_recorded: float | None = None
+        self._unsub = None
+
+    async def async_start(self) -> None:
+        """Restore the hour in progress and start following the coordinator's polls."""
+        if data := await self._store.async_load():
+            rollups = {key: Rollup.from_dict(rollup) for key, rollup in data.items()}
+            if _hour(rollups) + CELL_STATISTICS_PERIOD <= time.time():
+                # The hour ended while the pack was not polled
+                self._async_import(rollups)
+            else:
+                self._rollups = rollups
+        self._unsub = self.coordinator.async_add_listener(self._async_poll)
+
+    async def async_stop(self) -> None:
+        """Stop, keeping the hour in progress for the next start."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        if (data := self._data()) is None:
+            await self._store.async_remove()
+        else:
+            await self._store.async_save(data)
+
+    def _data(self) -> dict[str, Any] | None:
+        """Return the hour in progress to persist."""
+        if not self._rollups:
+            return None
+        return {key: rollup.as_dict() for key, rollup in self._rollups.items()}
+
+    @callback
+    def _async_poll(self) -> None:
+        """Fold a successful poll into the current hour."""
+        coordinator = self.coordinator
+        when = coordinator.last_success_time
+        # Failed polls notify listeners too, with the previous data
+        if not coordinator.last_update_success or when is None or when == self._last_recorded:
+            return
+        self._last_recorded = when
+
+        data = coordinator.data
+        start = when - when % CELL_STATISTICS_PERIOD
+        if self._rollups and _hour(self._rollups) != start:
+            self._async_import(self._rollups)
+            self._rollups = {}
+        for key in _CELL_KEYS:
+            if (value := data.get(key)) is None:
+                continue
+            if (rollup := self._rollups.get(key)) is None:
+                self._rollups[key] = Rollup(start, (key,), [value])
+            else:
+                rollup.add([value])
+        self._store.async_delay_save(self._data, CELL_STATISTICS_SAVE_DELAY)
+
+    @callback
+    def _async_import(self, rollups: dict[str, Rollup]) -> None:
+        """Add one hour of every cell as external statistics."""
+        if "recorder" not in self.hass.config.components:
+            return
+        # Import here so the recorder stays optional
+        from homeassistant.components.recorder.statistics import (
+            async_add_external_statistics,
+        )
+
+        coordinator = self.coordinator
+        start = datetime.fromtimestamp(_hour(rollups), timezone.utc)
+        for key, rollup in rollups.items():
+            metadata = {
+                "has_mean": True,
+                "has_sum": False,
+                "name": f"{coordinator.device_name} {key.replace('_', ' ').capitalize()}",
+                "source": DOMAIN,
+                "statistic_id": statistic_id(coordinator.entry_id, key),
+                "unit_of_measurement": UnitOfElectricPotential.VOLT,
+            }
+            statistics = [
+                {
+                    "start": start,
+                    "mean": rollup.sums[0] / rollup.count,
+                    "min": rollup.mins[0],
+                    "max": rollup.maxs[0],
+                }
+            ]
+            async_add_external_statistics(self.hass, metadata, statistics)
+        _LOGGER.debug(
+            "Imported %d cell statistics of %s for %s",
+            len(rollups),
+            coordinator.device_name,
+            start,
+        )
@@ -9,25 +9,156 @@ from homeassistant.const import CONF_NAME
 from homeassistant.data_entry_flow import FlowResult
 
 from .const import (
+    BAUDRATE_AUTO,
+    BAUDRATES,
     CONF_BAUDRATE,
+    CONF_CAPTURE_FILE,
+    CONF_CELL_STATISTICS,
+    CONF_DRIFT_TREND_THRESHOLD,
+    CONF_DRIFT_Z_THRESHOLD,
+    CONF_GATEWAY_HOST,
+    CONF_GATEWAY_MAX_AGE,
+    CONF_GATEWAY_PORT,
+    CONF_GATEWAY_WRITES,
+    CONF_GROUP_READ,
+    CONF_HISTORY,
+    CONF_HOST,
+    CONF_LEAN_RTU,
+    CONF_LOW_LATENCY,
+    CONF_METRICS,
+    CONF_PASSIVE,
+    CONF_PIPELINE,
     CONF_PORT,
     CONF_SCAN_INTERVAL,
     CONF_SLAVE_ID,
+    CONF_TCP_PORT,
+    CONF_TRACING,
+    CONF_TRANSPORT,
+    CONF_WORKER_PROCESS,
     DEFAULT_BAUDRATE,
+    DEFAULT_CAPTURE_FILE,
+    DEFAULT_CELL_STATISTICS,
+    DEFAULT_DRIFT_TREND_THRESHOLD,
+    DEFAULT_DRIFT_Z_THRESHOLD,
+    DEFAULT_GATEWAY_HOST,
+    DEFAULT_GATEWAY_MAX_AGE,
+    DEFAULT_GATEWAY_PORT,
+    DEFAULT_GATEWAY_WRITES,
+    DEFAULT_GROUP_READ,
+    DEFAULT_HISTORY,
+    DEFAULT_LEAN_RTU,
+    DEFAULT_LOW_LATENCY,
+    DEFAULT_METRICS,
+    DEFAULT_PASSIVE,
+    DEFAULT_PIPELINE,
     DEFAULT_PORT,
     DEFAULT_SCAN_INTERVAL,
     DEFAULT_SLAVE_ID,
+    DEFAULT_TCP_PORT,
+    DEFAULT_TRACING,
+    DEFAULT_TRANSPORT,
+    DEFAULT_WORKER_PROCESS,
     DOMAIN,
+    TRANSPORT_PACE_ASCII,
+    TRANSPORT_RTU_OVER_TCP,
+    TRANSPORT_SERIAL,
+    TRANSPORT_TCP,
 )
+from .transport import stable_port
 
 _LOGGER = logging.getLogger(__name__)
 
+BAUDRATE_OPTIONS = {
+    BAUDRATE_AUTO: "Auto-detect",
+    **{baudrate: str(baudrate) for baudrate in BAUDRATES},
+}
+
+TRANSPORT_OPTIONS = {
+    TRANSPORT_SERIAL: "Serial (Modbus RTU)",
+    TRANSPORT_PACE_ASCII: "Serial (Pace native protocol)",
+    TRANSPORT_TCP: "Gateway (Modbus TCP)",
+    TRANSPORT_RTU_OVER_TCP: "Gateway (Modbus RTU over TCP)",
+}
+
+
+def _worker_field(current: dict[str, Any]) -> vol.Optional:
+    """Return the field choosing the out-of-process poller."""
+    return vol.Optional(
+        CONF_WORKER_PROCESS,
+        default=current.get(CONF_WORKER_PROCESS, DEFAULT_WORKER_PROCESS),
+    )
+
+
+def _connection_errors(user_input: dict[str, Any]) -> dict[str, str]:
+    """Return form errors for connection settings that cannot work together."""
+    # Probing baud rates would transmit on a bus another master owns
+    if user_input.get(CONF_PASSIVE) and user_input.get(CONF_BAUDRATE) == BAUDRATE_AUTO:
+        return {CONF_BAUDRATE: "passive_auto_baudrate"}
+    return {}
+
+
+def _connection_schema(transport: str, current: dict[str, Any]) -> dict:
+    """Return the connection fields for a transport."""
+    if transport in (TRANSPORT_SERIAL, TRANSPORT_PACE_ASCII):
+        fields = {
+            vol.Required(
+                CONF_PORT, default=current.get(CONF_PORT, DEFAULT_PORT)
+            ): str,
+            vol.Required(
+                CONF_BAUDRATE, default=current.get(CONF_BAUDRATE, DEFAULT_BAUDRATE)
+            ): vol.In(BAUDRATE_OPTIONS),
+            vol.Optional(
+                CONF_LOW_LATENCY,
+                default=current.get(CONF_LOW_LATENCY, DEFAULT_LOW_LATENCY),
+            ): bool,
+        }
+        if transport == TRANSPORT_SERIAL:
+            fields[
+                vol.Optional(
+                    CONF_LEAN_RTU,
+                    default=current.get(CONF_LEAN_RTU, DEFAULT_LEAN_RTU),
+                )
+            ] = bool
+            fields[
+                vol.Optional(
+                    CONF_PASSIVE,
+                    default=current.get(CONF_PASSIVE, DEFAULT_PASSIVE),
+                )
+            ] = bool
+            fields[_worker_field(current)] = bool
+        if transport == TRANSPORT_PACE_ASCII:
+            fields[
+                vol.Optional(
+                    CONF_GROUP_READ,
+                    default=current.get(CONF_GROUP_READ, DEFAULT_GROUP_READ),
+                )
+            ] = bool
+        return fields
+    fields = {
+        vol.Required(CONF_HOST, default=current.get(CONF_HOST, "")): str,
+        vol.Required(
+            CONF_TCP_PORT, default=current.get(CONF_TCP_PORT, DEFAULT_TCP_PORT)
+        ): vol.All(vol.Coerce(int), vol.Range(min=1, max=65535)),
+    }
+    if transport == TRANSPORT_TCP:
+        fields[
+            vol.Optional(
+                CONF_PIPELINE, default=current.get(CONF_PIPELINE, DEFAULT_PIPELINE)
+            )
+        ] = bool
+    fields[_worker_field(current)] = bool
+    return fields
+
 
 class PaceBMSConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Pace BMS."""
 
     VERSION = 1
 
+    def __init__(self) -> None:
+        """Initialize the config flow."""
+        self._data: dict[str, Any] = {}
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -35,17 +166,14 @@ class PaceBMSConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         errors = {}
 
         if user_input is not None:
-            return self.async_create_entry(
-                title=user_input.get(CONF_NAME, "Pace BMS"),
-                data=user_input,
-            )
+            self._data = user_input
+            return await self.async_step_connection()
 
         schema = vol.Schema(
             {
                 vol.Optional(CONF_NAME, default="Pace BMS"): str,
-                vol.Required(CONF_PORT, default=DEFAULT_PORT): str,
-                vol.Required(CONF_BAUDRATE, default=DEFAULT_BAUDRATE): vol.In(
-                    [4800, 9600, 19200, 38400, 57600, 115200]
+                vol.Required(CONF_TRANSPORT, default=DEFAULT_TRANSPORT): vol.In(
+                    TRANSPORT_OPTIONS
                 ),
                 vol.Required(CONF_SLAVE_ID, default=DEFAULT_SLAVE_ID): vol.All(
                     vol.Coerce(int), vol.Range(min=0, max=247)
@@ -58,6 +186,30 @@ class PaceBMSConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         return self.async_show_form(step_id="user", data_schema=schema, errors=errors)
 
+    async def async_step_connection(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Handle the transport-specific connection step."""
+        errors: dict[str, str] = {}
+
+        if user_input is not None:
+            errors = _connection_errors(user_input)
+            if not errors:
+                if CONF_PORT in user_input:
+                    user_input[CONF_PORT] = await self.hass.async_add_executor_job(
+                        stable_port, user_input[CONF_PORT]
+                    )
+                data = {**self._data, **user_input}
+                return self.async_create_entry(
+                    title=data.get(CONF_NAME, "Pace BMS"),
+                    data=data,
+                )
+
+        schema = vol.Schema(
+            _connection_schema(self._data[CONF_TRANSPORT], user_input or {})
+        )
+        return self.async_show_form(step_id="connection", data_schema=schema, errors=errors)
+
     @staticmethod
     def async_get_options_flow(config_entry: config_entries.ConfigEntry):
         """Get the options flow for this handler."""
@@ -75,27 +227,38 @@ class PaceBMSOptionsFlow(config_entries.OptionsFlow):
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Manage the options."""
+        errors: dict[str, str] = {}
+
         if user_input is not None:
-            # Update config entry with new data
-            self.hass.config_entries.async_update_entry(
-                self.config_entry,
-                data={**self.config_entry.data, **user_input},
-            )
-            return self.async_create_entry(title="", data={})
+            errors = _connection_errors(user_input)
+            if capture_file := user_input.get(CONF_CAPTURE_FILE):
+                # Relative paths are in the configuration directory
+                capture_file = self.hass.config.path(capture_file)
+                if await self.hass.async_add_executor_job(
+                    self.hass.config.is_allowed_path, capture_file
+                ):
+                    user_input[CONF_CAPTURE_FILE] = capture_file
+                else:
+                    errors[CONF_CAPTURE_FILE] = "capture_file_not_allowed"
+            if not errors:
+                if CONF_PORT in user_input:
+                    user_input[CONF_PORT] = await self.hass.async_add_executor_job(
+                        stable_port, user_input[CONF_PORT]
+                    )
+                # Update config entry with new data
+                self.hass.config_entries.async_update_entry(
+                    self.config_entry,
+                    data={**self.config_entry.data, **user_input},
+                )
+                return self.async_create_entry(title="", data={})
 
-        # Get current values from config entry
-        current_data = self.config_entry.data
+        # Get current values from config entry, keeping what was just entered
+        current_data = {**self.config_entry.data, **(user_input or {})}
+        transport = current_data.get(CONF_TRANSPORT, DEFAULT_TRANSPORT)
 
         schema = vol.Schema(
             {
-                vol.Required(
-                    CONF_PORT,
-                    default=current_data.get(CONF_PORT, DEFAULT_PORT)
-                ): str,
-                vol.Required(
-                    CONF_BAUDRATE,
-                    default=current_data.get(CONF_BAUDRATE, DEFAULT_BAUDRATE)
-                ): vol.In([4800, 9600, 19200, 38400, 57600, 115200]),
+                **_connection_schema(transport, current_data),
                 vol.Required(
                     CONF_SLAVE_ID,
                     default=current_data.get(CONF_SLAVE_ID, DEFAULT_SLAVE_ID)
@@ -104,7 +267,53 @@ class PaceBMSOptionsFlow(config_entries.OptionsFlow):
                     CONF_SCAN_INTERVAL,
                     default=current_data.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
                 ): vol.All(vol.Coerce(int), vol.Range(min=5, max=300)),
+                vol.Optional(
+                    CONF_GATEWAY_PORT,
+                    default=current_data.get(CONF_GATEWAY_PORT, DEFAULT_GATEWAY_PORT)
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=65535)),
+                vol.Optional(
+                    CONF_GATEWAY_HOST,
+                    default=current_data.get(CONF_GATEWAY_HOST, DEFAULT_GATEWAY_HOST)
+                ): str,
+                vol.Optional(
+                    CONF_GATEWAY_MAX_AGE,
+                    default=current_data.get(CONF_GATEWAY_MAX_AGE, DEFAULT_GATEWAY_MAX_AGE)
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=3600)),
+                vol.Optional(
+                    CONF_GATEWAY_WRITES,
+                    default=current_data.get(CONF_GATEWAY_WRITES, DEFAULT_GATEWAY_WRITES)
+                ): bool,
+                vol.Optional(
+                    CONF_METRICS,
+                    default=current_data.get(CONF_METRICS, DEFAULT_METRICS)
+                ): bool,
+                vol.Optional(
+                    CONF_CAPTURE_FILE,
+                    default=current_data.get(CONF_CAPTURE_FILE, DEFAULT_CAPTURE_FILE)
+                ): str,
+                vol.Optional(
+                    CONF_TRACING,
+                    default=current_data.get(CONF_TRACING, DEFAULT_TRACING)
+                ): bool,
+                vol.Optional(
+                    CONF_HISTORY,
+                    default=current_data.get(CONF_HISTORY, DEFAULT_HISTORY)
+                ): bool,
+                vol.Optional(
+                    CONF_CELL_STATISTICS,
+                    default=current_data.get(CONF_CELL_STATISTICS, DEFAULT_CELL_STATISTICS)
+                ): bool,
+                vol.Optional(
+                    CONF_DRIFT_Z_THRESHOLD,
+                    default=current_data.get(CONF_DRIFT_Z_THRESHOLD, DEFAULT_DRIFT_Z_THRESHOLD)
+                ): vol.All(vol.Coerce(float), vol.Range(min=1, max=50)),
+                vol.Optional(
+                    CONF_DRIFT_TREND_THRESHOLD,
+                    default=current_data.get(
+                        CONF_DRIFT_TREND_THRESHOLD, DEFAULT_DRIFT_TREND_THRESHOLD
+                    )
+                ): vol.All(vol.Coerce(float), vol.Range(min=1, max=1000)),
             }
         )
 
-        return self.async_show_form(step_id="init", data_schema=schema)
\ No newline at end of file
+        return self.async_show_form(step_id="init", data_schema=schema, errors=errors)
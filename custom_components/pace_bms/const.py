@@ -1,25 +1,191 @@
 """Constants for the Pace BMS integration."""
+from datetime import timedelta
 from typing import Final
 
 DOMAIN: Final = "pace_bms"
 
+# hass.data keys shared by all config entries
+DATA_GATEWAYS: Final = f"{DOMAIN}_gateways"
+DATA_GATEWAYS_LOCK: Final = f"{DOMAIN}_gateways_lock"
+DATA_METRICS_VIEW: Final = f"{DOMAIN}_metrics_view"
+DATA_HISTORY: Final = f"{DOMAIN}_history"
+DATA_HISTORY_LOCK: Final = f"{DOMAIN}_history_lock"
+
 # Configuration
 CONF_SLAVE_ID: Final = "slave_id"
 CONF_PORT: Final = "port"
 CONF_BAUDRATE: Final = "baudrate"
 CONF_SCAN_INTERVAL: Final = "scan_interval"
+CONF_TRANSPORT: Final = "transport"
+CONF_HOST: Final = "host"
+CONF_TCP_PORT: Final = "tcp_port"
+CONF_PIPELINE: Final = "pipeline"
+CONF_GROUP_READ: Final = "group_read"
+CONF_LEAN_RTU: Final = "lean_rtu"
+CONF_LOW_LATENCY: Final = "low_latency"
+CONF_PASSIVE: Final = "passive"
+CONF_GATEWAY_HOST: Final = "gateway_host"
+CONF_GATEWAY_PORT: Final = "gateway_port"
+CONF_GATEWAY_MAX_AGE: Final = "gateway_max_age"
+CONF_GATEWAY_WRITES: Final = "gateway_writes"
+CONF_CAPTURE_FILE: Final = "capture_file"
+CONF_METRICS: Final = "metrics"
+CONF_TRACING: Final = "tracing"
+CONF_HISTORY: Final = "history"
+CONF_CELL_STATISTICS: Final = "cell_statistics"
+CONF_DRIFT_Z_THRESHOLD: Final = "drift_z_threshold"
+CONF_DRIFT_TREND_THRESHOLD: Final = "drift_trend_threshold"
+CONF_WORKER_PROCESS: Final = "worker_process"
+CONF_REPLAY_FILE: Final = "replay_file"
+CONF_REPLAY_SPEED: Final = "replay_speed"
+
+# Transports
+TRANSPORT_SERIAL: Final = "serial"
+TRANSPORT_TCP: Final = "tcp"
+TRANSPORT_RTU_OVER_TCP: Final = "rtu_over_tcp"
+TRANSPORT_PACE_ASCII: Final = "pace_ascii"
+# Plays back a capture file instead of talking to a bus (development)
+TRANSPORT_REPLAY: Final = "replay"
 
 # Defaults
 DEFAULT_SLAVE_ID: Final = 1
 DEFAULT_PORT: Final = "/dev/ttyUSB1"
 DEFAULT_BAUDRATE: Final = 9600
 DEFAULT_SCAN_INTERVAL: Final = 10
+DEFAULT_TRANSPORT: Final = TRANSPORT_SERIAL
+DEFAULT_TCP_PORT: Final = 502
+DEFAULT_PIPELINE: Final = False
+DEFAULT_GROUP_READ: Final = False
+DEFAULT_LEAN_RTU: Final = False
+DEFAULT_LOW_LATENCY: Final = False
+DEFAULT_PASSIVE: Final = False
+# Local Modbus TCP gateway; port 0 leaves it disabled
+DEFAULT_GATEWAY_PORT: Final = 0
+# Loopback only; clients on other hosts need an explicit address
+DEFAULT_GATEWAY_HOST: Final = "127.0.0.1"
+DEFAULT_GATEWAY_MAX_AGE: Final = 30
+DEFAULT_GATEWAY_WRITES: Final = False
+# Bus capture; an empty path leaves it disabled
+DEFAULT_CAPTURE_FILE: Final = ""
+DEFAULT_METRICS: Final = False
+DEFAULT_TRACING: Final = False
+DEFAULT_HISTORY: Final = False
+DEFAULT_CELL_STATISTICS: Final = False
+DEFAULT_DRIFT_Z_THRESHOLD: Final = 4.0
+# mV per hour
+DEFAULT_DRIFT_TREND_THRESHOLD: Final = 10.0
+DEFAULT_WORKER_PROCESS: Final = False
+# Replay at the original pace; 0 replays as fast as possible
+DEFAULT_REPLAY_SPEED: Final = 1.0
+
+# Baud rates
+BAUDRATE_AUTO: Final = 0
+BAUDRATES: Final = [4800, 9600, 19200, 38400, 57600, 115200]
+# Auto-detect probes the most common factory settings first
+AUTO_BAUDRATE_ORDER: Final = [9600, 19200, 115200, 38400, 57600, 4800]
+# Consecutive failed polls before an auto-detected baud rate is re-probed
+AUTO_BAUDRATE_REDETECT_FAILURES: Final = 3
+
+# Jobs queued per bus thread before further polls and writes are rejected
+BUS_QUEUE_SIZE: Final = 16
+
+# Seconds an unused bus link stays open, so reloading an entry reuses it
+TRANSPORT_LINGER: Final = 10.0
+
+# Out-of-process poller: packs per port, and the longest wait for it to answer
+# a command or publish a pack's first snapshot
+WORKER_SLOTS: Final = 32
+WORKER_TIMEOUT: Final = 30.0
+
+# Cycles a bus keeps reporting overrun after its last missed poll slot
+SCHEDULER_OVERRUN_CYCLES: Final = 3
+
+# Services
+SERVICE_EXPORT_TRACE: Final = "export_trace"
+SERVICE_EXPORT_HISTORY: Final = "export_history"
+SERVICE_SYNC_PARAMETERS: Final = "sync_parameters"
+
+# Named protection parameter profiles, in the configuration directory
+PROFILES_FILE: Final = "pace_bms_profiles.yaml"
+
+# Poll tracing: spans kept in memory for export
+TRACE_BUFFER_EVENTS: Final = 20000
+
+# Local history store, in the configuration directory
+HISTORY_FILE: Final = "pace_bms_history.db"
+HISTORY_FLUSH_INTERVAL: Final = timedelta(seconds=10)
+HISTORY_PRUNE_INTERVAL: Final = 3600
+# Rows fetched per step when exporting
+HISTORY_QUERY_CHUNK: Final = 1000
+# Tier -> rollup period and retention, in seconds; period 0 keeps every poll
+HISTORY_TIER_RAW: Final = "raw"
+HISTORY_TIERS: Final = {
+    HISTORY_TIER_RAW: (0, 48 * 3600),
+    "minute": (60, 30 * 86400),
+    "hour": (3600, 2 * 365 * 86400),
+}
+
+# Long-term statistics period of imported cell statistics (the recorder's hour),
+# and storage and save delay (s) of the hour in progress
+CELL_STATISTICS_PERIOD: Final = 3600
+CELL_STATISTICS_STORAGE_VERSION: Final = 1
+CELL_STATISTICS_SAVE_DELAY: Final = 300
+
+# Layout detection: polls a cell temperature probe must keep reading 0 before
+# it counts as absent, and storage of the detected layout
+LAYOUT_CONFIRM_POLLS: Final = 30
+LAYOUT_STORAGE_VERSION: Final = 1
+
+# Per-cell balancing counters: storage, save delay (s) and the longest gap
+# between polls (s) still counted as balancing time
+BALANCE_STORAGE_VERSION: Final = 1
+BALANCE_SAVE_DELAY: Final = 300
+BALANCE_MAX_GAP: Final = 600
+
+# Cell drift detection: smoothing factor per poll, polls before alerting, floor
+# of a cell's deviation spread (V) and the share of a threshold that clears it
+DRIFT_ALPHA: Final = 0.01
+DRIFT_WARMUP: Final = 100
+DRIFT_MIN_STD: Final = 0.002
+DRIFT_CLEAR_RATIO: Final = 0.75
+EVENT_CELL_DRIFT: Final = f"{DOMAIN}_cell_drift"
+
+# OpenMetrics scrape endpoint
+METRICS_URL: Final = f"/api/{DOMAIN}/metrics"
 
 # Modbus Settings
 MODBUS_TIMEOUT: Final = 0.2
+# Gateways add network latency on top of the serial round trip
+MODBUS_TCP_TIMEOUT: Final = 1.0
+
+# Passive mode: line silence that marks the bus as free for our own request
+SNIFFER_IDLE_GAP: Final = 0.05
+# Longest wait for a free bus before transmitting anyway
+SNIFFER_IDLE_TIMEOUT: Final = 1.0
+SNIFFER_READ_TIMEOUT: Final = 0.05
+
+# udev links that follow a USB serial adapter when it re-enumerates
+SERIAL_LINK_DIRS: Final = ("/dev/serial/by-id", "/dev/serial/by-path")
+# How often a vanished serial device is checked for while it is gone
+SERIAL_WATCH_INTERVAL: Final = timedelta(seconds=1)
+
+# Low-latency mode: USB adapter latency timer (ms) and reads timed before and after
+LOW_LATENCY_TIMER: Final = 1
+LATENCY_PROBE_READS: Final = 5
+
+# Pace native ASCII protocol settings
+PACE_ASCII_TIMEOUT: Final = 0.5
+# Upper bound of hex characters one pack adds to an analog reply
+PACE_ASCII_PACK_CHARS: Final = 130
+# Largest parallel group a group read is expected to return
+PACE_ASCII_MAX_PACKS: Final = 16
 MODBUS_BYTESIZE: Final = 8
 MODBUS_PARITY: Final = "N"
 MODBUS_STOPBITS: Final = 1
+# Bits per character on the wire (start + 8 data + stop)
+MODBUS_CHAR_BITS: Final = 10
+# Fixed allowance for the BMS turnaround when probing a baud rate
+PROBE_TURNAROUND: Final = 0.05
 
 # Register Addresses
 REG_CURRENT: Final = 0
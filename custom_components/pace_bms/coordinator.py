@@ -1,43 +1,95 @@
 """DataUpdateCoordinator for Pace BMS."""
 import logging
+import time
 from datetime import timedelta
 from typing import Any
 
-from pymodbus.client import ModbusSerialClient
 from pymodbus.exceptions import ModbusException
 
 from homeassistant.const import CONF_NAME
-from homeassistant.core import HomeAssistant
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er, issue_registry as ir
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import slugify
 
 from .const import (
-    CONF_BAUDRATE,
-    CONF_PORT,
+    AUTO_BAUDRATE_REDETECT_FAILURES,
+    CONF_CELL_STATISTICS,
+    CONF_DRIFT_TREND_THRESHOLD,
+    CONF_DRIFT_Z_THRESHOLD,
+    CONF_GATEWAY_PORT,
+    CONF_HISTORY,
+    CONF_METRICS,
     CONF_SLAVE_ID,
+    DEFAULT_CELL_STATISTICS,
+    DEFAULT_DRIFT_TREND_THRESHOLD,
+    DEFAULT_DRIFT_Z_THRESHOLD,
+    DEFAULT_GATEWAY_PORT,
+    DEFAULT_HISTORY,
+    DEFAULT_METRICS,
     DOMAIN,
-    MODBUS_BYTESIZE,
-    MODBUS_PARITY,
-    MODBUS_STOPBITS,
-    MODBUS_TIMEOUT,
-    REG_BASIC_DATA_COUNT,
-    REG_BASIC_DATA_START,
+    EVENT_CELL_DRIFT,
+    LAYOUT_CONFIRM_POLLS,
+    LAYOUT_STORAGE_VERSION,
     REG_CELL_VOLTAGE_COUNT,
-    REG_CELL_VOLTAGE_START,
-    REG_MODEL_SN,
-    REG_PACK_SN,
-    REG_PROTECTION_PARAMS_COUNT,
-    REG_PROTECTION_PARAMS_START,
-    REG_STATUS_FLAGS_COUNT,
-    REG_STATUS_FLAGS_START,
-    REG_TEMP_GROUP_COUNT,
-    REG_TEMP_GROUP_START,
-    REG_VERSION_INFO,
+    SERIAL_WATCH_INTERVAL,
 )
+from .balancing import BalanceTracker
+from .decode import (
+    CELL_TEMP_PROBES,
+    IDENTITY_BLOCKS,
+    IDENTITY_KEYS,
+    PARAMETER_BLOCK,
+    TELEMETRY_BLOCKS,
+    decode_parameters,
+    decode_telemetry,
+    detect_layout,
+    layout_blocks,
+    default_parameters,
+    registers_to_string,
+)
+from .drift import DriftDetector
+from .executor import BusBusyError
+from .framing import ModbusDeviceError
+from .plan import CELL_VOLTAGE_KEYS, FULL_PLAN, RegisterPlan, build_plan
+from .sniffer import RegisterImage
+from .stats import (
+    ERROR_EXCEPTION,
+    EXCEPTION_REPLY_BYTES,
+    READ_REQUEST_BYTES,
+    WRITE_REPLY_BYTES,
+    SlaveStats,
+    error_kind,
+    read_reply_bytes,
+    write_request_bytes,
+)
+from .tracing import TRACER
+from .transport import (
+    PaceAsciiTransport,
+    PaceBMSTransport,
+    SerialTransport,
+    SnifferTransport,
+    acquire_transport,
+    release_transport,
+)
+from .worker import SNAPSHOT_BLOCKS, ProcessTransport
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def _layout_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Return the storage of a pack's detected layout."""
+    return Store(hass, LAYOUT_STORAGE_VERSION, f"{DOMAIN}.layout.{entry_id}")
+
+
+async def async_remove_layout(hass: HomeAssistant, entry_id: str) -> None:
+    """Delete a pack's stored layout."""
+    await _layout_store(hass, entry_id).async_remove()
+
+
 class PaceBMSCoordinator(DataUpdateCoordinator[dict[str, Any]]):
     """Class to manage fetching Pace BMS data."""
 
@@ -50,11 +102,41 @@ class PaceBMSCoordinator(DataUpdateCoordinator[dict[str, Any]]):
     ) -> None:
         """Initialize."""
         self.config = config
-        self.client: ModbusSerialClient | None = None
+        # Shared with every other config entry on the same port or gateway
+        self.transport: PaceBMSTransport = acquire_transport(config)
         self._slave_id = config[CONF_SLAVE_ID]
         self._entry_id = entry_id
+        # Raw values of every register block read, for the local gateway
+        self.registers = RegisterImage()
+        self._failed_polls = 0
+        self._redetect_baudrate = False
+        self.stats = SlaveStats()
+        self._connected = False
+        # Wall-clock time of the last successful poll and duration of the last poll
+        self.last_success_time: float | None = None
+        self.last_poll_duration: float | None = None
+        # Sequence of the last worker process snapshot used
+        self._snapshot_sequence = 0
+        # Register blocks each poll reads, narrowed to the enabled entities
+        self.plan: RegisterPlan = FULL_PLAN
+        # Populated cells and cell temperature probes, detected on the first poll
+        # or restored from an earlier detection
+        self.cells: int | None = None
+        self.temp_probes: int | None = None
+        self._layout_store = _layout_store(hass, entry_id)
+        # Polls left before probes that kept reading 0 count as absent
+        self._probe_polls = 0
+        self._probes_seen = 0
+        # Per-cell balancing time and transitions, persisted
+        self.balancing = BalanceTracker(hass, entry_id)
+        # Cells drifting away from the pack mean
+        self.drift = DriftDetector()
+        # Cancels the check for a vanished serial device coming back
+        self._unsub_device_watch = None
         # Store the user-provided name
         self._device_name = config.get(CONF_NAME, "Pace BMS")
+        # Trace events of this pack are grouped under one track
+        self._trace_track = f"{self._device_name} (slave {self._slave_id})"
 
         super().__init__(
             hass,
@@ -62,12 +144,18 @@ class PaceBMSCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             name=DOMAIN,
             update_interval=update_interval,
         )
+        self.transport.scheduler.add(entry_id, update_interval.total_seconds(), hass.loop.time())
 
     @property
     def device_name(self) -> str:
         """Return the device name."""
         return self._device_name
 
+    @property
+    def slave_id(self) -> int:
+        """Return the Modbus slave ID."""
+        return self._slave_id
+
     @property
     def entry_id(self) -> str:
         """Return the config entry ID."""
@@ -86,233 +174,622 @@ class PaceBMSCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             configuration_url=f"homeassistant://config/devices/device/{self._entry_id}",
         )
 
+    @property
+    def register_access(self) -> bool:
+        """Return True if the transport can read and write holding registers."""
+        return not isinstance(self.transport, PaceAsciiTransport)
+
+    @property
+    def baudrate(self) -> int | None:
+        """Return the serial baud rate in use (None while auto-detecting)."""
+        if isinstance(self.transport, SerialTransport):
+            return self.transport.baudrate
+        return None
+
+    @property
+    def latency_report(self) -> dict[str, Any] | None:
+        """Return the low-latency settings applied and round trips timed, if any."""
+        if isinstance(self.transport, SerialTransport):
+            return self.transport.latency_report
+        return None
+
+    @callback
+    def async_update_plan(self) -> None:
+        """Narrow the blocks each poll reads to the enabled entities."""
+        plan = FULL_PLAN
+        # The first poll reads everything to detect the layout. Gateway clients
+        # may read any register, so it must stay current
+        if self.cells is not None and not self.config.get(
+            CONF_GATEWAY_PORT, DEFAULT_GATEWAY_PORT
+        ):
+            registry = er.async_get(self.hass)
+            prefix = f"{self._entry_id}_"
+            keys = [
+                entry.unique_id[len(prefix):]
+                for entry in er.async_entries_for_config_entry(registry, self._entry_id)
+                if entry.disabled_by is None and entry.unique_id.startswith(prefix)
+            ]
+            # Before the entities are first registered, read everything
+            if keys:
+                # Drift detection compares every cell with the pack mean
+                plan = build_plan([*keys, *CELL_VOLTAGE_KEYS])
+                # Scrapes export, the history store records and cell statistics
+                # import telemetry whether or not it has an entity
+                if (
+                    self.config.get(CONF_METRICS, DEFAULT_METRICS)
+                    or self.config.get(CONF_HISTORY, DEFAULT_HISTORY)
+                    or self.config.get(CONF_CELL_STATISTICS, DEFAULT_CELL_STATISTICS)
+                ):
+                    plan = RegisterPlan(list(TELEMETRY_BLOCKS), plan.parameters, plan.identity)
+            # Skip the registers of cells the pack does not have
+            plan = RegisterPlan(
+                layout_blocks(plan.telemetry, self.cells), plan.parameters, plan.identity
+            )
+
+        if plan != self.plan:
+            _LOGGER.debug("%s now reads %s", self._device_name, plan)
+            self.plan = plan
+
+    @callback
+    def async_set_update_interval(self, update_interval: timedelta) -> None:
+        """Poll at a new interval, keeping the connection and entities."""
+        self.update_interval = update_interval
+        seconds = update_interval.total_seconds()
+        self.transport.scheduler.add(self._entry_id, seconds, self.hass.loop.time())
+        if isinstance(self.transport, SnifferTransport):
+            # A block the other master read within one scan interval is fresh
+            self.transport.max_age = seconds
+        if self._listeners:
+            self._schedule_refresh()
+
+    @callback
+    def async_registry_updated(self, event: Event) -> None:
+        """Rebuild the register plan when one of this entry's entities changes."""
+        # Removed entities are no longer in the registry to check, so rebuild
+        if event.data["action"] != "remove":
+            entry = er.async_get(self.hass).async_get(event.data["entity_id"])
+            if entry is None or entry.config_entry_id != self._entry_id:
+                return
+        self.async_update_plan()
+
     async def _async_update_data(self) -> dict[str, Any]:
         """Update data via Modbus."""
-        return await self.hass.async_add_executor_job(self._fetch_data)
+        if self._failed_polls:
+            self.stats.retries += 1
+        started = time.monotonic()
+        try:
+            with TRACER.span("poll", self._trace_track):
+                data = await self.transport.executor.async_run(self._fetch_data)
+        except BusBusyError as err:
+            # The link is still busy with earlier jobs; skip rather than queue up
+            raise UpdateFailed(str(err)) from err
+        except UpdateFailed:
+            self._failed_polls += 1
+            transport = self.transport
+            if (
+                isinstance(transport, SerialTransport)
+                and transport.auto_baudrate
+                and transport.baudrate is not None
+                and self._failed_polls >= AUTO_BAUDRATE_REDETECT_FAILURES
+            ):
+                _LOGGER.warning(
+                    "%d consecutive polls failed at %d baud, re-detecting baud rate",
+                    self._failed_polls,
+                    transport.baudrate,
+                )
+                self._redetect_baudrate = True
+            if (
+                isinstance(transport, SerialTransport)
+                and transport.device_missing
+                and self._unsub_device_watch is None
+            ):
+                _LOGGER.warning(
+                    "Serial device %s is gone, polling again once it is back", transport.path
+                )
+                self._unsub_device_watch = async_track_time_interval(
+                    self.hass, self._async_watch_device, SERIAL_WATCH_INTERVAL
+                )
+            raise
+        finally:
+            self.last_poll_duration = time.monotonic() - started
+            self.stats.update_bus_utilization(self.transport.busy_time)
+        self._failed_polls = 0
+        self.last_success_time = time.time()
+        if self.cells is None:
+            self._detect_layout(data)
+        elif self._probe_polls:
+            self._confirm_probes(data)
+        if (balance_status := data.get("balance_status")) is not None:
+            self.balancing.update(balance_status, self.last_success_time)
+        self._detect_drift(data)
+        return data
 
-    def _connect(self) -> None:
-        """Connect to Modbus device."""
-        # Close existing connection if it's in a bad state
-        if self.client is not None:
-            if not self.client.is_socket_open():
-                try:
-                    self.client.close()
-                except Exception as err:
-                    _LOGGER.debug("Error closing old connection: %s", err)
-                self.client = None
-            else:
-                # Connection appears to be open
-                return
-        
-        # Create new connection
-        if self.client is None:
-            _LOGGER.debug(
-                "Connecting to BMS at %s (baudrate=%s, slave_id=%s)",
-                self.config[CONF_PORT],
-                self.config[CONF_BAUDRATE],
-                self._slave_id,
+    @callback
+    def _detect_drift(self, data: dict[str, Any]) -> None:
+        """Update the drift statistics and announce cells that started drifting."""
+        drift = self.drift
+        started = drift.update(
+            [data.get(f"cell_{i}_voltage") for i in range(1, REG_CELL_VOLTAGE_COUNT + 1)],
+            self.last_success_time,
+            self.config.get(CONF_DRIFT_Z_THRESHOLD, DEFAULT_DRIFT_Z_THRESHOLD),
+            self.config.get(CONF_DRIFT_TREND_THRESHOLD, DEFAULT_DRIFT_TREND_THRESHOLD),
+        )
+        for cell in started:
+            _LOGGER.warning(
+                "Cell %d of %s is drifting: %.1f mV from the pack mean, z-score %.1f, "
+                "trend %.1f mV/h",
+                cell + 1,
+                self._device_name,
+                drift.mean[cell] * 1000,
+                drift.z_score[cell],
+                drift.trend[cell],
             )
-            self.client = ModbusSerialClient(
-                port=self.config[CONF_PORT],
-                baudrate=self.config[CONF_BAUDRATE],
-                bytesize=MODBUS_BYTESIZE,
-                parity=MODBUS_PARITY,
-                stopbits=MODBUS_STOPBITS,
-                timeout=MODBUS_TIMEOUT,
+            self.hass.bus.async_fire(
+                EVENT_CELL_DRIFT,
+                {
+                    "entry_id": self._entry_id,
+                    "name": self._device_name,
+                    "cell": cell + 1,
+                    "deviation_mv": round(drift.mean[cell] * 1000, 2),
+                    "z_score": round(drift.z_score[cell], 2),
+                    "trend_mv_per_hour": round(drift.trend[cell], 2),
+                },
             )
-            if not self.client.connect():
-                self.client = None
-                raise UpdateFailed(
-                    f"Failed to connect to BMS at {self.config[CONF_PORT]}. "
-                    f"Check that the device is connected and not in use by another application."
-                )
-            _LOGGER.info("Successfully connected to BMS at %s", self.config[CONF_PORT])
+
+    async def async_load_layout(self) -> None:
+        """Restore the layout detected by an earlier setup, if it was of this slave."""
+        data = await self._layout_store.async_load()
+        if data is None or data.get("slave_id") != self._slave_id:
+            return
+        self.cells = data["cells"]
+        self.temp_probes = data["temp_probes"]
+        _LOGGER.debug(
+            "%s has %d cells and %d cell temperature probes (stored)",
+            self._device_name,
+            self.cells,
+            self.temp_probes,
+        )
+
+    @callback
+    def _detect_layout(self, data: dict[str, Any]) -> None:
+        """Size the register plan to the populated cells and probes."""
+        # A connected cell never reads 0 V, so one poll settles the cells. Probes
+        # reading 0 are kept until they have read 0 for a while
+        self.cells, self._probes_seen = detect_layout(data)
+        self.temp_probes = CELL_TEMP_PROBES
+        self._probe_polls = LAYOUT_CONFIRM_POLLS
+        self._confirm_probes(data)
+        # Drop the unpopulated cells read while detecting
+        self._drop_unpopulated(data)
+        self.async_update_plan()
+
+    @callback
+    def _confirm_probes(self, data: dict[str, Any]) -> None:
+        """Count one more poll of the probes; settle the layout once they are known."""
+        self._probes_seen = max(self._probes_seen, detect_layout(data)[1])
+        self._probe_polls -= 1
+        if self._probes_seen < CELL_TEMP_PROBES and self._probe_polls > 0:
+            return
+        self._probe_polls = 0
+        self.temp_probes = self._probes_seen
+        _LOGGER.info(
+            "%s has %d cells and %d cell temperature probes",
+            self._device_name,
+            self.cells,
+            self.temp_probes,
+        )
+        self._drop_unpopulated(data)
+        self.async_remove_absent_sensors()
+        self.async_update_plan()
+        self._layout_store.async_delay_save(
+            lambda: {
+                "slave_id": self._slave_id,
+                "cells": self.cells,
+                "temp_probes": self.temp_probes,
+            }
+        )
+
+    @callback
+    def async_remove_absent_sensors(self) -> None:
+        """Remove the sensors created for inputs the pack does not have."""
+        registry = er.async_get(self.hass)
+        absent = [f"cell_{i}_voltage" for i in range(self.cells + 1, REG_CELL_VOLTAGE_COUNT + 1)]
+        absent += [f"temp_{i}" for i in range(self.temp_probes + 1, CELL_TEMP_PROBES + 1)]
+        for key in absent:
+            if entity_id := registry.async_get_entity_id(
+                "sensor", DOMAIN, f"{self._entry_id}_{key}"
+            ):
+                registry.async_remove(entity_id)
+
+    def _drop_unpopulated(self, data: dict[str, Any]) -> None:
+        """Remove the values of cells and probes the pack does not have."""
+        for i in range(self.cells + 1, REG_CELL_VOLTAGE_COUNT + 1):
+            data.pop(f"cell_{i}_voltage", None)
+        for i in range(self.temp_probes + 1, CELL_TEMP_PROBES + 1):
+            data.pop(f"temp_{i}", None)
+
+    @callback
+    def _schedule_refresh(self) -> None:
+        """Schedule the next poll in this pack's slot on the bus."""
+        if self.update_interval is None:
+            return
+        if self.config_entry and self.config_entry.pref_disable_polling:
+            return
+        self._async_unsub_refresh()
+        # A poll still running at shutdown finishes after the slot was given up
+        if self._entry_id not in self.transport.scheduler:
+            return
+
+        loop = self.hass.loop
+        now = loop.time()
+        slot, missed = self.transport.scheduler.next_poll(self._entry_id, now)
+        if missed:
+            self.stats.missed_polls += missed
+        self._report_overrun(now)
+        self._unsub_refresh = loop.call_at(slot, self.hass.async_run_hass_job, self._job).cancel
+
+    @callback
+    def _report_overrun(self, now: float) -> None:
+        """Raise or clear the repair issue of a bus that misses poll slots."""
+        scheduler = self.transport.scheduler
+        overrun = scheduler.overrun(now)
+        if overrun == scheduler.reported:
+            return
+        scheduler.reported = overrun
+        issue_id = f"bus_overrun_{slugify(scheduler.name)}"
+        if not overrun:
+            _LOGGER.info("Polls on %s keep their schedule again", scheduler.name)
+            ir.async_delete_issue(self.hass, DOMAIN, issue_id)
+            return
+        utilization = self.stats.bus_utilization
+        _LOGGER.warning(
+            "Polls on %s are missing their slots (%d so far, bus %s%% busy): "
+            "the scan intervals ask for more than the bus can carry",
+            scheduler.name,
+            scheduler.missed,
+            "?" if utilization is None else f"{utilization:.0f}",
+        )
+        ir.async_create_issue(
+            self.hass,
+            DOMAIN,
+            issue_id,
+            is_fixable=False,
+            severity=ir.IssueSeverity.WARNING,
+            translation_key="bus_overrun",
+            translation_placeholders={"bus": scheduler.name},
+        )
+
+    async def _async_watch_device(self, _now: Any) -> None:
+        """Poll right away once a vanished serial device is back."""
+        transport = self.transport
+        if not await self.hass.async_add_executor_job(transport.device_present):
+            return
+        self._async_stop_device_watch()
+        _LOGGER.info("Serial device %s is back", transport.path)
+        await self.async_request_refresh()
+
+    @callback
+    def _async_stop_device_watch(self) -> None:
+        """Stop checking for the serial device."""
+        if self._unsub_device_watch is not None:
+            self._unsub_device_watch()
+            self._unsub_device_watch = None
+
+    async def async_shutdown(self) -> None:
+        """Stop polling and give up this pack's slot on the bus."""
+        self._async_stop_device_watch()
+        await super().async_shutdown()
+        await self.balancing.async_save()
+        self.transport.scheduler.remove(self._entry_id)
+        # Clears the overrun issue once the last pack on the bus is gone
+        self._report_overrun(self.hass.loop.time())
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all registered listeners, timing each entity while tracing."""
+        if not TRACER.enabled:
+            super().async_update_listeners()
+            return
+        track = self._trace_track
+        with TRACER.span("dispatch", track):
+            for update_callback, _ in list(self._listeners.values()):
+                entity = getattr(update_callback, "__self__", None)
+                with TRACER.span("entity update", track, getattr(entity, "entity_id", None)):
+                    update_callback()
+
+    def _connect(self) -> None:
+        """Connect to Modbus device."""
+        transport = self.transport
+        if isinstance(transport, SerialTransport):
+            transport.watch_device()
+        if isinstance(transport, SerialTransport) and transport.auto_baudrate:
+            if self._redetect_baudrate or transport.baudrate is None:
+                self._redetect_baudrate = False
+                transport.detect_baudrate(self._slave_id)
+        if not transport.is_connected():
+            if self._connected:
+                self.stats.reconnects += 1
+            with TRACER.span("connect", self._trace_track):
+                transport.connect()
+            self._connected = True
+            if isinstance(transport, SerialTransport) and transport.low_latency:
+                transport.tune_latency(self._slave_id)
 
     def disconnect(self) -> None:
-        """Disconnect from Modbus device."""
-        if self.client is not None:
-            try:
-                self.client.close()
-                _LOGGER.debug("Disconnected from BMS")
-            except Exception as err:
-                _LOGGER.debug("Error disconnecting: %s", err)
-            finally:
-                self.client = None
+        """Release the shared connection; it closes once no entry has used it for a while."""
+        if isinstance(self.transport, ProcessTransport):
+            self.transport.unregister(self._slave_id)
+        release_transport(self.transport)
 
-    def _read_holding_registers(self, address: int, count: int = 1) -> list[int]:
-        """Read holding registers."""
-        try:
-            self._connect()
-        except Exception as err:
-            # Force disconnect on connection error
-            self.disconnect()
-            raise
-        
+    def _read_blocks(self, blocks: list[tuple[int, int]]) -> list[list[int]]:
+        """Read several holding register blocks in one pass over the bus."""
         try:
-            result = self.client.read_holding_registers(
-                address=address,
-                count=count,
-                device_id=self._slave_id,
-            )
-            if result.isError():
-                _LOGGER.error("Modbus error reading address %d: %s", address, result)
-                # Don't immediately disconnect on read error, might be transient
-                raise UpdateFailed(f"Modbus error reading address {address}: {result}")
-            return result.registers
+            with self.transport.lock:
+                started = time.monotonic()
+                try:
+                    self._connect()
+                    with TRACER.span("read", self._trace_track, blocks):
+                        results = self.transport.read_blocks(self._slave_id, blocks)
+                except Exception as err:
+                    self._record_failed_read(blocks, started, err)
+                    raise
+                now = time.monotonic()
+                self._record_reads(blocks, results, started, now)
+        except ModbusDeviceError as err:
+            _LOGGER.error("Modbus error reading blocks %s: %s", blocks, err)
+            # Don't immediately disconnect on read error, might be transient
+            raise UpdateFailed(f"Modbus error reading blocks {blocks}: {err}") from err
         except ModbusException as err:
             _LOGGER.error("Modbus exception: %s", err)
             # Disconnect on exception to force reconnect next time
-            self.disconnect()
+            self.transport.close()
             raise UpdateFailed(f"Modbus exception: {err}") from err
         except Exception as err:
             _LOGGER.error("Unexpected error: %s", err)
-            self.disconnect()
+            self.transport.close()
             raise UpdateFailed(f"Unexpected error: {err}") from err
 
+        for (address, _), values in zip(blocks, results):
+            self.registers.update(address, values, now)
+        return results
+
+    def _record_reads(
+        self,
+        blocks: list[tuple[int, int]],
+        results: list[list[int]],
+        started: float,
+        finished: float,
+    ) -> None:
+        """Count successful reads; blocks read in one pass share its time."""
+        elapsed = finished - started
+        self.transport.busy_time += elapsed
+        latency = elapsed / len(blocks)
+        capture = self.transport.capture
+        for (address, count), values in zip(blocks, results):
+            self.stats.record(
+                f"{address}-{address + count - 1}",
+                latency,
+                READ_REQUEST_BYTES,
+                read_reply_bytes(count),
+            )
+            if capture is not None:
+                capture.record_read(self._slave_id, address, count, started, finished, values)
+
+    def _record_failed_read(
+        self, blocks: list[tuple[int, int]], started: float, err: Exception
+    ) -> None:
+        """Count a failed read; the error is attributed to the first block."""
+        finished = time.monotonic()
+        self.transport.busy_time += finished - started
+        address, count = blocks[0]
+        kind = error_kind(err)
+        self.stats.record(
+            f"{address}-{address + count - 1}",
+            finished - started,
+            READ_REQUEST_BYTES,
+            EXCEPTION_REPLY_BYTES if kind == ERROR_EXCEPTION else 0,
+            kind,
+        )
+        if (capture := self.transport.capture) is not None:
+            capture.record_read(
+                self._slave_id,
+                address,
+                count,
+                started,
+                finished,
+                code=err.code if isinstance(err, ModbusDeviceError) else None,
+            )
+
+    def _read_holding_registers(self, address: int, count: int = 1) -> list[int]:
+        """Read holding registers."""
+        return self._read_blocks([(address, count)])[0]
+
+    async def async_write_register(self, address: int, value: int) -> bool:
+        """Write a holding register on the bus thread."""
+        try:
+            return await self.transport.executor.async_run(
+                self.write_register, address, value
+            )
+        except BusBusyError as err:
+            _LOGGER.error("Cannot write register %d: %s", address, err)
+            return False
+
     def write_register(self, address: int, value: int) -> bool:
         """Write to a holding register using 0x10 (write multiple registers)."""
-        self._connect()
         try:
             _LOGGER.debug("Writing to register %d: value=%d, slave_id=%d (using 0x10)", address, value, self._slave_id)
             # Use write_registers (0x10) with single-element array as required by BMS
-            result = self.client.write_registers(
-                address=address,
-                values=[value],
-                device_id=self._slave_id,
-            )
-            if result.isError():
-                _LOGGER.error("Modbus write error for address %d: %s", address, result)
-                return False
+            with self.transport.lock:
+                started = time.monotonic()
+                try:
+                    self._connect()
+                    self.transport.write_registers(self._slave_id, address, [value])
+                except Exception as err:
+                    self._record_write(address, value, started, err)
+                    raise
+                self._record_write(address, value, started)
             _LOGGER.debug("Successfully wrote to register %d using 0x10", address)
             return True
+        except ModbusDeviceError as err:
+            _LOGGER.error("Modbus write error for address %d: %s", address, err)
+            return False
         except ModbusException as err:
             _LOGGER.error("Modbus exception writing register %d: %s", address, err)
+            self.transport.close()
             return False
         except Exception as err:
             _LOGGER.error("Unexpected error writing register %d: %s", address, err)
             return False
 
+    def read_parameter_registers(self) -> dict[int, int]:
+        """Read the protection parameter block; return the raw value of each parameter."""
+        # Import here to avoid circular imports
+        from .number import PARAMETER_CONFIG
+
+        address, count = PARAMETER_BLOCK
+        values = self._read_holding_registers(address, count)
+        return {
+            config["address"]: values[config["address"] - address]
+            for config in PARAMETER_CONFIG.values()
+        }
+
+    def sync_registers(
+        self, target: dict[int, int], dry_run: bool = False
+    ) -> dict[int, tuple[int, int, bool]]:
+        """Write the target parameter registers that differ from the pack's.
+
+        Returns address -> (old value, new value, written) for each register
+        that differed; nothing is written when all match.
+        """
+        current = self.read_parameter_registers()
+        diff = {}
+        for address, value in sorted(target.items()):
+            old = current.get(address)
+            if old is None or old == value:
+                continue
+            written = False if dry_run else self.write_register(address, value)
+            diff[address] = (old, value, written)
+        return diff
+
+    def _record_write(
+        self, address: int, value: int, started: float, err: Exception | None = None
+    ) -> None:
+        """Count a write and its outcome."""
+        finished = time.monotonic()
+        self.transport.busy_time += finished - started
+        kind = None if err is None else error_kind(err)
+        if err is None:
+            reply_bytes = WRITE_REPLY_BYTES
+        elif kind == ERROR_EXCEPTION:
+            reply_bytes = EXCEPTION_REPLY_BYTES
+        else:
+            reply_bytes = 0
+        self.stats.record(
+            f"write {address}", finished - started, write_request_bytes(1), reply_bytes, kind
+        )
+        if (capture := self.transport.capture) is not None:
+            capture.record_write(
+                self._slave_id,
+                address,
+                [value],
+                started,
+                finished,
+                success=err is None,
+                code=err.code if isinstance(err, ModbusDeviceError) else None,
+            )
+
+    def _fetch_ascii_data(self) -> dict[str, Any]:
+        """Fetch analog data over the Pace native protocol."""
+        # A group reply younger than half a scan interval serves every pack
+        max_age = self.update_interval.total_seconds() / 2
+        try:
+            with self.transport.lock:
+                self._connect()
+                with TRACER.span("read analog", self._trace_track):
+                    return self.transport.read_analog(self._slave_id, max_age)
+        except ModbusDeviceError as err:
+            raise UpdateFailed(f"Pace protocol error: {err}") from err
+        except ModbusException as err:
+            _LOGGER.error("Pace protocol exception: %s", err)
+            self.transport.close()
+            raise UpdateFailed(f"Pace protocol exception: {err}") from err
+
+    def _fetch_snapshot(self) -> dict[str, Any]:
+        """Return the pack's latest snapshot from the worker process."""
+        interval = self.update_interval.total_seconds()
+        try:
+            with self.transport.lock:
+                self._connect()
+                self.transport.register(self._slave_id, interval)
+            snapshot = self.transport.snapshot(self._slave_id)
+        except ModbusException as err:
+            raise UpdateFailed(f"Poller process error: {err}") from err
+
+        # A worker that stopped publishing leaves the same snapshot behind
+        age = time.monotonic() - snapshot.monotonic
+        if snapshot.sequence == self._snapshot_sequence and age > 3 * interval:
+            raise UpdateFailed(f"No poll from the poller process for {age:.0f} s")
+        self._snapshot_sequence = snapshot.sequence
+        if snapshot.error:
+            raise UpdateFailed(snapshot.error)
+
+        for (address, _), values in zip(SNAPSHOT_BLOCKS, snapshot.blocks):
+            if values is not None:
+                self.registers.update(address, values, snapshot.monotonic)
+        # The worker reads every block whatever the layout
+        if self.cells is not None:
+            self._drop_unpopulated(snapshot.data)
+        return snapshot.data
+
     def _fetch_data(self) -> dict[str, Any]:
         """Fetch all data from BMS."""
+        if isinstance(self.transport, PaceAsciiTransport):
+            return self._fetch_ascii_data()
+        if isinstance(self.transport, ProcessTransport):
+            return self._fetch_snapshot()
+
         data = {}
+        # Read once: the registry listener may swap it while a poll runs
+        plan = self.plan
 
         try:
-            # Read basic measurements in ONE transaction (registers 0-7)
-            basic_data = self._read_holding_registers(
-                REG_BASIC_DATA_START, REG_BASIC_DATA_COUNT
-            )
-            data["current"] = self._to_signed_16(basic_data[0]) * 0.01
-            data["pack_voltage"] = basic_data[1] * 0.01
-            data["soc"] = basic_data[2]
-            data["soh"] = basic_data[3]
-            data["remain_capacity"] = basic_data[4] * 0.01
-            data["full_capacity"] = basic_data[5] * 0.01
-            data["design_capacity"] = basic_data[6] * 0.01
-            data["cycle_count"] = basic_data[7]
-
-            # Read status flags in ONE transaction (registers 9-12)
-            status_data = self._read_holding_registers(
-                REG_STATUS_FLAGS_START, REG_STATUS_FLAGS_COUNT
-            )
-            data["warning_flags"] = status_data[0]
-            data["protection_flags"] = status_data[1]
-            data["status_fault"] = status_data[2]
-            data["balance_status"] = status_data[3]
-
-            # Read cell voltages in ONE transaction (registers 15-30)
-            cell_voltages = self._read_holding_registers(
-                REG_CELL_VOLTAGE_START, REG_CELL_VOLTAGE_COUNT
-            )
-            for i, voltage in enumerate(cell_voltages, start=1):
-                data[f"cell_{i}_voltage"] = voltage * 0.001
+            if plan.telemetry:
+                results = self._read_blocks(plan.telemetry)
 
-            # Read temperatures in ONE transaction (registers 31-36)
-            temp_data = self._read_holding_registers(
-                REG_TEMP_GROUP_START, REG_TEMP_GROUP_COUNT
-            )
-            data["temp_1"] = self._to_signed_16(temp_data[0]) * 0.1
-            data["temp_2"] = self._to_signed_16(temp_data[1]) * 0.1
-            data["temp_3"] = self._to_signed_16(temp_data[2]) * 0.1
-            data["temp_4"] = self._to_signed_16(temp_data[3]) * 0.1
-            data["mosfet_temp"] = self._to_signed_16(temp_data[4]) * 0.1
-            data["env_temp"] = self._to_signed_16(temp_data[5]) * 0.1
+                with TRACER.span("decode telemetry", self._trace_track):
+                    decode_telemetry(data, plan.telemetry, results)
 
             # Read parameter values for number entities
-            self._fetch_parameter_values(data)
+            if plan.parameters is not None:
+                self._fetch_parameter_values(data, plan.parameters)
 
             # Version and identification (string data, 10 registers each = 20 bytes)
-            try:
-                # Read Version Info (address 150, 10 registers)
-                version_regs = self._read_holding_registers(REG_VERSION_INFO, 10)
-                data["version_info"] = self._registers_to_string(version_regs)
-                
-                # Read Model SN (address 160, 10 registers)
-                model_regs = self._read_holding_registers(REG_MODEL_SN, 10)
-                data["model_sn"] = self._registers_to_string(model_regs)
-                
-                # Read Pack SN (address 170, 10 registers)
-                pack_regs = self._read_holding_registers(REG_PACK_SN, 10)
-                data["pack_sn"] = self._registers_to_string(pack_regs)
-            except Exception as err:
-                _LOGGER.warning("Failed to read identification strings: %s", err)
-                data["version_info"] = "Unknown"
-                data["model_sn"] = "Unknown"
-                data["pack_sn"] = "Unknown"
+            if plan.identity:
+                try:
+                    with TRACER.span("read identity", self._trace_track):
+                        identity = self._read_blocks(IDENTITY_BLOCKS)
+                    for key, registers in zip(IDENTITY_KEYS, identity):
+                        data[key] = registers_to_string(registers)
+                except Exception as err:
+                    _LOGGER.warning("Failed to read identification strings: %s", err)
+                    for key in IDENTITY_KEYS:
+                        data[key] = "Unknown"
 
             return data
 
         except Exception as err:
             raise UpdateFailed(f"Error communicating with BMS: {err}") from err
 
-    def _fetch_parameter_values(self, data: dict[str, Any]) -> None:
+    def _fetch_parameter_values(self, data: dict[str, Any], block: tuple[int, int]) -> None:
         """Fetch parameter values for number entities."""
-        # Import here to avoid circular imports
-        from .number import PARAMETER_CONFIG
-        
         try:
-            # Read ALL protection parameters in ONE transaction (registers 60-114)
-            param_data = self._read_holding_registers(
-                REG_PROTECTION_PARAMS_START, REG_PROTECTION_PARAMS_COUNT
-            )
-            
-            for key, config in PARAMETER_CONFIG.items():
-                try:
-                    # Calculate offset from base address (60)
-                    offset = config["address"] - REG_PROTECTION_PARAMS_START
-                    raw_value = param_data[offset]
-                    
-                    # Handle signed values for temperature parameters
-                    if "temp" in key or "ot_" in key or "ut_" in key:
-                        raw_value = self._to_signed_16(raw_value)
-                    
-                    # Scale the value back to the display value
-                    # For scale > 1: divide to get user-facing value
-                    # For scale = 1: value is already in correct units (mV, mA, A, %, min)
-                    data[key] = raw_value / config["scale"]
-                except Exception as err:
-                    _LOGGER.warning("Failed to parse parameter %s: %s", key, err)
-                    # Set a default value if parsing fails
-                    data[key] = config["min"]
-                    
+            # Read the parameters in use in ONE transaction (at most registers 60-114)
+            param_data = self._read_holding_registers(*block)
+
+            with TRACER.span("parse parameters", self._trace_track):
+                decode_parameters(data, param_data, block[0])
+
         except Exception as err:
             _LOGGER.warning("Failed to read protection parameters block: %s", err)
             # Fallback to default values for all parameters
-            for key, config in PARAMETER_CONFIG.items():
-                data[key] = config["min"]
-
-    @staticmethod
-    def _to_signed_16(value: int) -> int:
-        """Convert unsigned 16-bit to signed."""
-        return value if value < 32768 else value - 65536
-
-    @staticmethod
-    def _registers_to_string(registers: list[int]) -> str:
-        """Convert Modbus registers to ASCII string."""
-        # Each register is 2 bytes (big-endian)
-        bytes_data = []
-        for reg in registers:
-            bytes_data.append((reg >> 8) & 0xFF)  # High byte
-            bytes_data.append(reg & 0xFF)          # Low byte
-        
-        # Convert to string, removing null bytes and trailing whitespace
-        return bytes(bytes_data).decode('ascii', errors='ignore').rstrip('\x00 ')
\ No newline at end of file
+            default_parameters(data)
@@ -0,0 +1,243 @@
+"""Decoding of Pace BMS register blocks into entity values.
+
+Kept free of coordinator state so the same code runs in the out-of-process
+poller.
+"""
+import logging
+from typing import Any
+
+from .const import (
+    REG_BASIC_DATA_COUNT,
+    REG_BASIC_DATA_START,
+    REG_CELL_VOLTAGE_COUNT,
+    REG_CELL_VOLTAGE_START,
+    REG_MODEL_SN,
+    REG_PACK_SN,
+    REG_PROTECTION_PARAMS_COUNT,
+    REG_PROTECTION_PARAMS_START,
+    REG_STATUS_FLAGS_COUNT,
+    REG_STATUS_FLAGS_START,
+    REG_TEMP_GROUP_COUNT,
+    REG_TEMP_GROUP_START,
+    REG_VERSION_INFO,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Telemetry blocks read together every poll (pipelined where supported)
+TELEMETRY_BLOCKS: list[tuple[int, int]] = [
+    (REG_BASIC_DATA_START, REG_BASIC_DATA_COUNT),
+    (REG_STATUS_FLAGS_START, REG_STATUS_FLAGS_COUNT),
+    (REG_CELL_VOLTAGE_START, REG_CELL_VOLTAGE_COUNT),
+    (REG_TEMP_GROUP_START, REG_TEMP_GROUP_COUNT),
+]
+
+# All protection parameters, read in one transaction (registers 60-114)
+PARAMETER_BLOCK: tuple[int, int] = (REG_PROTECTION_PARAMS_START, REG_PROTECTION_PARAMS_COUNT)
+
+# Version and identification strings, 10 registers (20 bytes) each
+IDENTITY_BLOCKS: list[tuple[int, int]] = [
+    (REG_VERSION_INFO, 10),
+    (REG_MODEL_SN, 10),
+    (REG_PACK_SN, 10),
+]
+IDENTITY_KEYS: tuple[str, ...] = ("version_info", "model_sn", "pack_sn")
+
+# Cell temperature probes ahead of the MOSFET and environment sensors
+CELL_TEMP_PROBES = 4
+
+# Keys decode_telemetry() fills, in a fixed order
+TELEMETRY_KEYS: tuple[str, ...] = (
+    "current",
+    "pack_voltage",
+    "soc",
+    "soh",
+    "remain_capacity",
+    "full_capacity",
+    "design_capacity",
+    "cycle_count",
+    "warning_flags",
+    "protection_flags",
+    "status_fault",
+    "balance_status",
+    *(f"cell_{i}_voltage" for i in range(1, REG_CELL_VOLTAGE_COUNT + 1)),
+    "temp_1",
+    "temp_2",
+    "temp_3",
+    "temp_4",
+    "mosfet_temp",
+    "env_temp",
+)
+
+# Telemetry values that are raw register counts or flags rather than measurements
+INTEGER_KEYS: frozenset[str] = frozenset(
+    (
+        "soc",
+        "soh",
+        "cycle_count",
+        "warning_flags",
+        "protection_flags",
+        "status_fault",
+        "balance_status",
+    )
+)
+
+
+def to_signed_16(value: int) -> int:
+    """Convert unsigned 16-bit to signed."""
+    return value if value < 32768 else value - 65536
+
+
+def registers_to_string(registers: list[int]) -> str:
+    """Convert Modbus registers to ASCII string."""
+    # Each register is 2 bytes (big-endian)
+    bytes_data = []
+    for reg in registers:
+        bytes_data.append((reg >> 8) & 0xFF)  # High byte
+        bytes_data.append(reg & 0xFF)          # Low byte
+
+    # Convert to string, removing null bytes and trailing whitespace
+    return bytes(bytes_data).decode('ascii', errors='ignore').rstrip('\x00 ')
+
+
+# Telemetry register -> key, scale (None for raw integers) and signedness
+_TELEMETRY_REGISTERS: dict[int, tuple[str, float | None, bool]] = {
+    # Basic measurements (registers 0-7)
+    REG_BASIC_DATA_START: ("current", 0.01, True),
+    REG_BASIC_DATA_START + 1: ("pack_voltage", 0.01, False),
+    REG_BASIC_DATA_START + 2: ("soc", None, False),
+    REG_BASIC_DATA_START + 3: ("soh", None, False),
+    REG_BASIC_DATA_START + 4: ("remain_capacity", 0.01, False),
+    REG_BASIC_DATA_START + 5: ("full_capacity", 0.01, False),
+    REG_BASIC_DATA_START + 6: ("design_capacity", 0.01, False),
+    REG_BASIC_DATA_START + 7: ("cycle_count", None, False),
+    # Status flags (registers 9-12)
+    REG_STATUS_FLAGS_START: ("warning_flags", None, False),
+    REG_STATUS_FLAGS_START + 1: ("protection_flags", None, False),
+    REG_STATUS_FLAGS_START + 2: ("status_fault", None, False),
+    REG_STATUS_FLAGS_START + 3: ("balance_status", None, False),
+    # Cell voltages (registers 15-30)
+    **{
+        REG_CELL_VOLTAGE_START + i: (f"cell_{i + 1}_voltage", 0.001, False)
+        for i in range(REG_CELL_VOLTAGE_COUNT)
+    },
+    # Temperatures (registers 31-36)
+    REG_TEMP_GROUP_START: ("temp_1", 0.1, True),
+    REG_TEMP_GROUP_START + 1: ("temp_2", 0.1, True),
+    REG_TEMP_GROUP_START + 2: ("temp_3", 0.1, True),
+    REG_TEMP_GROUP_START + 3: ("temp_4", 0.1, True),
+    REG_TEMP_GROUP_START + 4: ("mosfet_temp", 0.1, True),
+    REG_TEMP_GROUP_START + 5: ("env_temp", 0.1, True),
+}
+
+# Register each telemetry key is read from
+TELEMETRY_ADDRESSES: dict[str, int] = {
+    key: address for address, (key, _, _) in _TELEMETRY_REGISTERS.items()
+}
+
+
+def decode_telemetry(
+    data: dict[str, Any], blocks: list[tuple[int, int]], results: list[list[int]]
+) -> None:
+    """Decode any telemetry registers read into data."""
+    for (address, _), values in zip(blocks, results):
+        for register, value in enumerate(values, start=address):
+            if (entry := _TELEMETRY_REGISTERS.get(register)) is None:
+                continue
+            key, scale, signed = entry
+            if signed:
+                value = to_signed_16(value)
+            data[key] = value if scale is None else value * scale
+
+
+def detect_layout(data: dict[str, Any]) -> tuple[int, int]:
+    """Return the number of populated cells and cell temperature probes in one poll.
+
+    Unpopulated cell and probe inputs read 0, so the last non-zero one
+    counts; a cell or probe reading 0 before it still counts. A pack
+    reporting no cell at all is taken to have them all. A probe can also
+    read 0 at 0 °C, so one poll only gives a lower bound of the probes.
+    """
+    cells = REG_CELL_VOLTAGE_COUNT
+    for i in range(REG_CELL_VOLTAGE_COUNT, 0, -1):
+        if data.get(f"cell_{i}_voltage"):
+            cells = i
+            break
+    probes = 0
+    for i in range(1, CELL_TEMP_PROBES + 1):
+        if data.get(f"temp_{i}"):
+            probes = i
+    return cells, probes
+
+
+def layout_blocks(blocks: list[tuple[int, int]], cells: int) -> list[tuple[int, int]]:
+    """Return the telemetry blocks without the cell registers past the last cell."""
+    end = REG_CELL_VOLTAGE_START + cells
+    trimmed = []
+    for address, count in blocks:
+        if REG_CELL_VOLTAGE_START <= address < REG_CELL_VOLTAGE_START + REG_CELL_VOLTAGE_COUNT:
+            count = min(count, end - address)
+            if count <= 0:
+                continue
+        trimmed.append((address, count))
+    return trimmed
+
+
+def decode_parameters(
+    data: dict[str, Any], param_data: list[int], start: int = REG_PROTECTION_PARAMS_START
+) -> None:
+    """Decode protection parameters read from the start address on into data."""
+    # Import here to avoid circular imports
+    from .number import PARAMETER_CONFIG
+
+    for key, config in PARAMETER_CONFIG.items():
+        # Calculate offset from the first register read
+        offset = config["address"] - start
+        if not 0 <= offset < len(param_data):
+            continue
+        try:
+            data[key] = parameter_value(key, param_data[offset])
+        except Exception as err:
+            _LOGGER.warning("Failed to parse parameter %s: %s", key, err)
+            # Set a default value if parsing fails
+            data[key] = config["min"]
+
+
+def parameter_value(key: str, raw_value: int) -> float:
+    """Return the display value of a protection parameter register."""
+    # Import here to avoid circular imports
+    from .number import PARAMETER_CONFIG
+
+    # Handle signed values for temperature parameters
+    if "temp" in key or "ot_" in key or "ut_" in key:
+        raw_value = to_signed_16(raw_value)
+
+    # Scale the value back to the display value
+    # For scale > 1: divide to get user-facing value
+    # For scale = 1: value is already in correct units (mV, mA, A, %, min)
+    return raw_value / PARAMETER_CONFIG[key]["scale"]
+
+
+def parameter_register(key: str, value: float) -> int:
+    """Return the register value of a protection parameter, as 16 bits."""
+    # Import here to avoid circular imports
+    from .number import PARAMETER_CONFIG
+
+    return round(value * PARAMETER_CONFIG[key]["scale"]) & 0xFFFF
+
+
+def default_parameters(data: dict[str, Any]) -> None:
+    """Fill every parameter with its minimum when the block could not be read."""
+    # Import here to avoid circular imports
+    from .number import PARAMETER_CONFIG
+
+    for key, config in PARAMETER_CONFIG.items():
+        data[key] = config["min"]
+
+
+def parameter_keys() -> tuple[str, ...]:
+    """Return the keys decode_parameters() fills, in a fixed order."""
+    # Import here to avoid circular imports
+    from .number import PARAMETER_CONFIG
+
+    return tuple(PARAMETER_CONFIG)
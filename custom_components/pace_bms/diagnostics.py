@@ -0,0 +1,32 @@
+"""Diagnostics support for Pace BMS."""
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_HOST, DOMAIN, REG_CELL_VOLTAGE_COUNT
+from .coordinator import PaceBMSCoordinator
+
+TO_REDACT = {CONF_HOST, "pack_sn", "model_sn"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: PaceBMSCoordinator = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "transport": type(coordinator.transport).__name__,
+        "baudrate": coordinator.baudrate,
+        "low_latency": coordinator.latency_report,
+        "last_update_success": coordinator.last_update_success,
+        "poll_phase": coordinator.transport.scheduler.phase(entry.entry_id),
+        "register_plan": repr(coordinator.plan),
+        "layout": {"cells": coordinator.cells, "temp_probes": coordinator.temp_probes},
+        "balancing": coordinator.balancing.as_dict(coordinator.cells or REG_CELL_VOLTAGE_COUNT),
+        "drift": coordinator.drift.as_dict(coordinator.cells or REG_CELL_VOLTAGE_COUNT),
+        "statistics": coordinator.stats.as_dict(),
+        "data": async_redact_data(coordinator.data or {}, TO_REDACT),
+    }
@@ -0,0 +1,92 @@
+"""Streaming detection of cells drifting away from their pack.
+
+Each cell's deviation from the pack mean is followed by an exponentially
+weighted mean and variance, updated in constant time per sample. A sample far
+outside a cell's usual deviation (its z-score) or a steady change of the
+smoothed deviation (its trend) marks the cell as drifting.
+"""
+import math
+
+from .const import (
+    DRIFT_ALPHA,
+    DRIFT_CLEAR_RATIO,
+    DRIFT_MIN_STD,
+    DRIFT_WARMUP,
+    REG_CELL_VOLTAGE_COUNT,
+)
+
+
+class DriftDetector:
+    """Exponentially weighted statistics of each cell's deviation from the pack mean."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.samples = 0
+        # Smoothed deviation (V) and its variance (V^2)
+        self.mean = [0.0] * REG_CELL_VOLTAGE_COUNT
+        self.var = [0.0] * REG_CELL_VOLTAGE_COUNT
+        # Smoothed rate of change of the deviation (mV per hour)
+        self.trend = [0.0] * REG_CELL_VOLTAGE_COUNT
+        # z-score of each cell's latest deviation
+        self.z_score = [0.0] * REG_CELL_VOLTAGE_COUNT
+        self.drifting: set[int] = set()
+        self._time: float | None = None
+
+    def update(
+        self,
+        voltages: list[float | None],
+        now: float,
+        z_threshold: float,
+        trend_threshold: float,
+    ) -> list[int]:
+        """Add a sample of cell voltages; return the cells that started drifting."""
+        present = [voltage for voltage in voltages if voltage]
+        if len(present) < 2:
+            return []
+        pack_mean = sum(present) / len(present)
+        elapsed = None if self._time is None else now - self._time
+        self._time = now
+        self.samples += 1
+        first = self.samples == 1
+        armed = self.samples > DRIFT_WARMUP
+
+        started = []
+        for cell, voltage in enumerate(voltages[:REG_CELL_VOLTAGE_COUNT]):
+            if not voltage:
+                continue
+            deviation = voltage - pack_mean
+            if first:
+                self.mean[cell] = deviation
+                continue
+            diff = deviation - self.mean[cell]
+            self.z_score[cell] = diff / max(math.sqrt(self.var[cell]), DRIFT_MIN_STD)
+            increment = DRIFT_ALPHA * diff
+            self.mean[cell] += increment
+            self.var[cell] = (1 - DRIFT_ALPHA) * (self.var[cell] + diff * increment)
+            if elapsed:
+                rate = increment * 1000 * 3600 / elapsed
+                self.trend[cell] += DRIFT_ALPHA * (rate - self.trend[cell])
+            if not armed:
+                continue
+
+            # Once drifting, a cell must fall well below the thresholds to clear
+            ratio = DRIFT_CLEAR_RATIO if cell in self.drifting else 1.0
+            drifting = (
+                abs(self.z_score[cell]) >= z_threshold * ratio
+                or abs(self.trend[cell]) >= trend_threshold * ratio
+            )
+            if drifting and cell not in self.drifting:
+                self.drifting.add(cell)
+                started.append(cell)
+            elif not drifting:
+                self.drifting.discard(cell)
+        return started
+
+    def as_dict(self, cells: int) -> dict[str, list[float]]:
+        """Return the statistics of the populated cells, in mV."""
+        return {
+            "deviation_mv": [round(mean * 1000, 2) for mean in self.mean[:cells]],
+            "deviation_std_mv": [round(math.sqrt(var) * 1000, 2) for var in self.var[:cells]],
+            "trend_mv_per_hour": [round(trend, 2) for trend in self.trend[:cells]],
+            "z_score": [round(z_score, 2) for z_score in self.z_score[:cells]],
+        }
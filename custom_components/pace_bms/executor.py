@@ -0,0 +1,88 @@
+"""Dedicated I/O thread per bus link.
+
+Blocking Modbus calls run on one worker thread per pooled transport instead of
+Home Assistant's shared executor, so a slow serial read only ever holds up its
+own bus. Jobs queue in a bounded FIFO; when it is full, new jobs are rejected
+instead of piling up behind a stuck link.
+"""
+import asyncio
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, TypeVar
+
+from pymodbus.exceptions import ModbusIOException
+
+from .const import BUS_QUEUE_SIZE
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+class BusBusyError(ModbusIOException):
+    """The bus job queue is full or the bus is shutting down."""
+
+
+class BusExecutor:
+    """Run jobs in order on a single thread owned by one bus link."""
+
+    def __init__(self, name: str, size: int = BUS_QUEUE_SIZE) -> None:
+        """Initialize; the thread starts with the first job."""
+        self.name = name
+        self._queue: queue.Queue = queue.Queue(size)
+        self._thread: threading.Thread | None = None
+        self._shutdown = False
+        self._start_lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Return the number of queued jobs."""
+        return self._queue.qsize()
+
+    def submit(self, func: Callable[..., _T], *args: Any) -> "Future[_T]":
+        """Queue a job, raising BusBusyError if the queue is full."""
+        if self._shutdown:
+            raise BusBusyError(f"Bus {self.name} is shut down")
+        future: Future[_T] = Future()
+        try:
+            self._queue.put_nowait((future, func, args))
+        except queue.Full as err:
+            raise BusBusyError(
+                f"Bus {self.name} has {self._queue.maxsize} jobs queued"
+            ) from err
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"pace_bms {self.name}", daemon=True
+                )
+                self._thread.start()
+        return future
+
+    async def async_run(self, func: Callable[..., _T], *args: Any) -> _T:
+        """Run a job on the bus thread and wait for its result."""
+        return await asyncio.wrap_future(self.submit(func, *args))
+
+    def shutdown(self) -> None:
+        """Stop the thread once the jobs already queued have run."""
+        self._shutdown = True
+        with self._start_lock:
+            if self._thread is None:
+                return
+        # Blocks while the queue is full; queued jobs are bounded by bus timeouts
+        self._queue.put(None)
+
+    def _run(self) -> None:
+        """Worker loop."""
+        while (item := self._queue.get()) is not None:
+            future, func, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = func(*args)
+            except BaseException as err:
+                future.set_exception(err)
+            else:
+                future.set_result(result)
+        _LOGGER.debug("Bus thread for %s stopped", self.name)
@@ -0,0 +1,116 @@
+"""Modbus frame encoding and decoding helpers for Pace BMS."""
+import struct
+
+from pymodbus.exceptions import ModbusException, ModbusIOException
+
+FUNC_READ_HOLDING_REGISTERS = 0x03
+FUNC_WRITE_MULTIPLE_REGISTERS = 0x10
+
+
+class ModbusDeviceError(ModbusException):
+    """The slave answered with a Modbus exception response."""
+
+    def __init__(self, string: str, code: int | None = None) -> None:
+        """Initialize."""
+        super().__init__(string)
+        self.code = code
+
+
+class ModbusCrcError(ModbusIOException):
+    """A reply arrived but failed its CRC check."""
+
+
+def _crc16_table() -> tuple[int, ...]:
+    """Build the lookup table for the reflected 0xA001 polynomial."""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+
+_CRC16_TABLE = _crc16_table()
+
+
+def crc16(data: bytes | bytearray | memoryview) -> int:
+    """Return the Modbus RTU CRC16 of data (one table lookup per byte)."""
+    crc = 0xFFFF
+    table = _CRC16_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def rtu_frame(slave_id: int, pdu: bytes) -> bytes:
+    """Wrap a PDU in an RTU frame (slave address + PDU + CRC)."""
+    frame = bytes((slave_id,)) + pdu
+    return frame + struct.pack("<H", crc16(frame))
+
+
+def check_rtu_frame(frame: bytes, slave_id: int) -> bytes:
+    """Validate an RTU frame and return its PDU."""
+    if crc16(frame[:-2]) != struct.unpack("<H", frame[-2:])[0]:
+        raise ModbusCrcError(f"CRC error in response from slave {slave_id}")
+    if frame[0] != slave_id:
+        raise ModbusIOException(
+            f"Response from slave {frame[0]} while waiting for slave {slave_id}"
+        )
+    return frame[1:-2]
+
+
+def read_request_pdu(address: int, count: int) -> bytes:
+    """Build a read holding registers (0x03) request PDU."""
+    return struct.pack(">BHH", FUNC_READ_HOLDING_REGISTERS, address, count)
+
+
+def write_request_pdu(address: int, values: list[int]) -> bytes:
+    """Build a write multiple registers (0x10) request PDU."""
+    count = len(values)
+    return struct.pack(
+        f">BHHB{count}H",
+        FUNC_WRITE_MULTIPLE_REGISTERS,
+        address,
+        count,
+        count * 2,
+        *values,
+    )
+
+
+def _check_exception(pdu: bytes, function: int) -> None:
+    """Raise if the PDU is an exception response or for another function."""
+    if pdu[0] == function | 0x80:
+        raise ModbusDeviceError(f"Exception response, code {pdu[1]}", pdu[1])
+    if pdu[0] != function:
+        raise ModbusIOException(f"Unexpected function code {pdu[0]:#04x}")
+
+
+def decode_read_response(pdu: bytes, count: int) -> list[int]:
+    """Decode a read holding registers response PDU into register values."""
+    _check_exception(pdu, FUNC_READ_HOLDING_REGISTERS)
+    if pdu[1] != count * 2 or len(pdu) < 2 + count * 2:
+        raise ModbusIOException(
+            f"Expected {count * 2} data bytes, got {pdu[1]}"
+        )
+    return list(struct.unpack_from(f">{count}H", pdu, 2))
+
+
+def check_write_response(pdu: bytes, address: int, count: int) -> None:
+    """Validate a write multiple registers response PDU."""
+    _check_exception(pdu, FUNC_WRITE_MULTIPLE_REGISTERS)
+    if struct.unpack_from(">HH", pdu, 1) != (address, count):
+        raise ModbusIOException("Write response does not echo the request")
+
+
+def rtu_response_length(header: bytes) -> int:
+    """Return the full RTU response length given its first three bytes."""
+    function = header[1]
+    if function & 0x80:
+        return 5
+    if function == FUNC_READ_HOLDING_REGISTERS:
+        return 5 + header[2]
+    return 8
@@ -0,0 +1,197 @@
+"""Local Modbus TCP server re-exporting cached Pace BMS registers.
+
+Other Modbus clients (inverter tools, Node-RED, loggers) read the register
+image the coordinators already hold instead of competing for the serial
+port, so any number of readers cost one bus poll. The server listens on the
+loopback interface unless told otherwise, and writes are only forwarded
+through the owning coordinator for packs that allow them.
+"""
+import asyncio
+import logging
+import struct
+from typing import TYPE_CHECKING
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import (
+    CONF_GATEWAY_MAX_AGE,
+    CONF_GATEWAY_WRITES,
+    DATA_GATEWAYS_LOCK,
+    DEFAULT_GATEWAY_MAX_AGE,
+    DEFAULT_GATEWAY_WRITES,
+    REG_PROTECTION_PARAMS_COUNT,
+    REG_PROTECTION_PARAMS_START,
+)
+from .framing import FUNC_READ_HOLDING_REGISTERS, FUNC_WRITE_MULTIPLE_REGISTERS
+
+if TYPE_CHECKING:
+    from .coordinator import PaceBMSCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+FUNC_WRITE_SINGLE_REGISTER = 0x06
+
+# Modbus exception codes
+EXC_ILLEGAL_FUNCTION = 0x01
+EXC_ILLEGAL_ADDRESS = 0x02
+EXC_ILLEGAL_VALUE = 0x03
+EXC_DEVICE_FAILURE = 0x04
+EXC_PATH_UNAVAILABLE = 0x0A
+EXC_TARGET_NO_RESPONSE = 0x0B
+
+# Only protection parameters are writable, as through the number entities
+_WRITABLE = range(
+    REG_PROTECTION_PARAMS_START,
+    REG_PROTECTION_PARAMS_START + REG_PROTECTION_PARAMS_COUNT,
+)
+
+
+def _exception(function: int, code: int) -> bytes:
+    """Build an exception response PDU."""
+    return bytes((function | 0x80, code))
+
+
+class PaceBMSGateway:
+    """Modbus TCP server for every coordinator sharing a listen port."""
+
+    def __init__(self, hass: HomeAssistant, host: str, port: int) -> None:
+        """Initialize."""
+        self.hass = hass
+        self.host = host
+        self.port = port
+        self.coordinators: dict[int, "PaceBMSCoordinator"] = {}
+        self._server: asyncio.Server | None = None
+        self._clients: set[asyncio.StreamWriter] = set()
+
+    async def async_start(self) -> None:
+        """Start listening."""
+        self._server = await asyncio.start_server(
+            self._handle_client, host=self.host, port=self.port
+        )
+        _LOGGER.info("Modbus gateway listening on %s port %d", self.host, self.port)
+
+    async def async_stop(self) -> None:
+        """Stop listening and drop all clients."""
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._clients):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+            _LOGGER.info("Modbus gateway on port %d stopped", self.port)
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve MBAP requests from one client until it disconnects."""
+        peer = writer.get_extra_info("peername")
+        _LOGGER.debug("Gateway client connected: %s", peer)
+        self._clients.add(writer)
+        try:
+            while True:
+                header = await reader.readexactly(7)
+                transaction_id, protocol_id, length, unit_id = struct.unpack(
+                    ">HHHB", header
+                )
+                if length < 2 or length > 254:
+                    break
+                pdu = await reader.readexactly(length - 1)
+                response = await self._handle_pdu(unit_id, pdu)
+                writer.write(
+                    struct.pack(">HHHB", transaction_id, protocol_id, len(response) + 1, unit_id)
+                    + response
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+            _LOGGER.debug("Gateway client disconnected: %s", peer)
+
+    async def _handle_pdu(self, unit_id: int, pdu: bytes) -> bytes:
+        """Answer one request PDU."""
+        function = pdu[0]
+        coordinator = self.coordinators.get(unit_id)
+        if coordinator is None:
+            return _exception(function, EXC_PATH_UNAVAILABLE)
+
+        if function == FUNC_READ_HOLDING_REGISTERS:
+            if len(pdu) != 5:
+                return _exception(function, EXC_ILLEGAL_VALUE)
+            address, count = struct.unpack_from(">HH", pdu, 1)
+            if not 1 <= count <= 125:
+                return _exception(function, EXC_ILLEGAL_VALUE)
+            if address + count > len(coordinator.registers.values):
+                return _exception(function, EXC_ILLEGAL_ADDRESS)
+            # Each pack keeps its own freshness limit
+            max_age = coordinator.config.get(CONF_GATEWAY_MAX_AGE, DEFAULT_GATEWAY_MAX_AGE)
+            values = coordinator.registers.get(address, count, max_age)
+            if values is None:
+                return _exception(function, EXC_TARGET_NO_RESPONSE)
+            return struct.pack(f">BB{count}H", function, count * 2, *values)
+
+        if function == FUNC_WRITE_SINGLE_REGISTER:
+            if len(pdu) != 5:
+                return _exception(function, EXC_ILLEGAL_VALUE)
+            address, value = struct.unpack_from(">HH", pdu, 1)
+            values = [value]
+        elif function == FUNC_WRITE_MULTIPLE_REGISTERS:
+            if len(pdu) < 6:
+                return _exception(function, EXC_ILLEGAL_VALUE)
+            address, count, byte_count = struct.unpack_from(">HHB", pdu, 1)
+            if byte_count != count * 2 or len(pdu) != 6 + byte_count:
+                return _exception(function, EXC_ILLEGAL_VALUE)
+            values = list(struct.unpack_from(f">{count}H", pdu, 6))
+        else:
+            return _exception(function, EXC_ILLEGAL_FUNCTION)
+
+        if not coordinator.config.get(CONF_GATEWAY_WRITES, DEFAULT_GATEWAY_WRITES):
+            return _exception(function, EXC_ILLEGAL_FUNCTION)
+        if address not in _WRITABLE or address + len(values) - 1 not in _WRITABLE:
+            return _exception(function, EXC_ILLEGAL_ADDRESS)
+        # The BMS only accepts single-register writes, so forward them one by one
+        for offset, value in enumerate(values):
+            success = await coordinator.async_write_register(address + offset, value)
+            if not success:
+                return _exception(function, EXC_DEVICE_FAILURE)
+        await coordinator.async_request_refresh()
+        return pdu[:5]
+
+
+async def async_register_gateway(
+    hass: HomeAssistant,
+    gateways: dict[int, PaceBMSGateway],
+    host: str,
+    port: int,
+    coordinator: "PaceBMSCoordinator",
+) -> None:
+    """Expose a coordinator through the gateway on a port, starting it if needed."""
+    # Entries set up concurrently must not both bind the port
+    async with hass.data.setdefault(DATA_GATEWAYS_LOCK, asyncio.Lock()):
+        gateway = gateways.get(port)
+        if gateway is not None and gateway.host != host:
+            raise HomeAssistantError(
+                f"Gateway port {port} is already listening on {gateway.host}, not {host}"
+            )
+        if gateway is None:
+            gateway = PaceBMSGateway(hass, host, port)
+            await gateway.async_start()
+            gateways[port] = gateway
+        gateway.coordinators[coordinator.slave_id] = coordinator
+
+
+async def async_unregister_gateway(
+    hass: HomeAssistant,
+    gateways: dict[int, PaceBMSGateway],
+    coordinator: "PaceBMSCoordinator",
+) -> None:
+    """Remove a coordinator from its gateway, stopping it when unused."""
+    async with hass.data.setdefault(DATA_GATEWAYS_LOCK, asyncio.Lock()):
+        for port, gateway in list(gateways.items()):
+            if gateway.coordinators.get(coordinator.slave_id) is coordinator:
+                del gateway.coordinators[coordinator.slave_id]
+                if not gateway.coordinators:
+                    del gateways[port]
+                    await gateway.async_stop()
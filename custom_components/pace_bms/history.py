@@ -0,0 +1,445 @@
+"""Compact local history of pack telemetry.
+
+Each poll is stored as one row per pack holding its telemetry as a packed
+float32 array, so cell-level history at a short scan interval stays small.
+Rows are batched in memory and written by a single thread. Minute and hour
+rollups (mean, min, max) are accumulated as polls arrive; a period cut short
+by a restart is merged with the part written before. Every tier is pruned
+after its own retention period.
+"""
+import asyncio
+import csv
+import logging
+import sqlite3
+import struct
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import (
+    DATA_HISTORY,
+    DATA_HISTORY_LOCK,
+    HISTORY_FILE,
+    HISTORY_FLUSH_INTERVAL,
+    HISTORY_PRUNE_INTERVAL,
+    HISTORY_QUERY_CHUNK,
+    HISTORY_TIER_RAW,
+    HISTORY_TIERS,
+)
+from .decode import TELEMETRY_KEYS
+
+if TYPE_CHECKING:
+    from .coordinator import PaceBMSCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS packs (id INTEGER PRIMARY KEY, entry_id TEXT UNIQUE)",
+    "CREATE TABLE IF NOT EXISTS layouts (id INTEGER PRIMARY KEY, keys TEXT UNIQUE)",
+    *(
+        f"CREATE TABLE IF NOT EXISTS samples_{tier} (pack INTEGER, ts INTEGER, "
+        "layout INTEGER, count INTEGER, data BLOB, PRIMARY KEY (pack, ts)) WITHOUT ROWID"
+        for tier in HISTORY_TIERS
+    ),
+]
+
+
+def _pack(values: list[float]) -> bytes:
+    """Pack values as little-endian float32."""
+    return struct.pack(f"<{len(values)}f", *values)
+
+
+def _unpack(data: bytes) -> tuple[float, ...]:
+    """Unpack little-endian float32 values."""
+    return struct.unpack(f"<{len(data) // 4}f", data)
+
+
+def _merge_rollups(count: int, data: bytes, new_count: int, new_data: bytes) -> bytes:
+    """Combine two rollups of the same period and layout (SQL function)."""
+    old, new = _unpack(data), _unpack(new_data)
+    width = len(old) // 3
+    total = count + new_count
+    means = [(old[i] * count + new[i] * new_count) / total for i in range(width)]
+    mins = [min(a, b) for a, b in zip(old[width:2 * width], new[width:2 * width])]
+    maxs = [max(a, b) for a, b in zip(old[2 * width:], new[2 * width:])]
+    return _pack(means + mins + maxs)
+
+
+class Rollup:
+    """Running mean, min and max of one pack's telemetry over one rollup period."""
+
+    __slots__ = ("start", "keys", "count", "sums", "mins", "maxs")
+
+    def __init__(self, start: float, keys: tuple[str, ...], values: list[float]) -> None:
+        """Initialize with the first poll."""
+        self.start = start
+        self.keys = keys
+        self.count = 1
+        self.sums = list(values)
+        self.mins = list(values)
+        self.maxs = list(values)
+
+    def add(self, values: list[float]) -> None:
+        """Add one poll."""
+        self.count += 1
+        for i, value in enumerate(values):
+            self.sums[i] += value
+            if value < self.mins[i]:
+                self.mins[i] = value
+            elif value > self.maxs[i]:
+                self.maxs[i] = value
+
+    def data(self) -> list[float]:
+        """Return the means, minimums and maximums, in that order."""
+        return [total / self.count for total in self.sums] + self.mins + self.maxs
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the rollup as JSON-serializable data."""
+        return {
+            "start": self.start,
+            "keys": list(self.keys),
+            "count": self.count,
+            "sums": self.sums,
+            "mins": self.mins,
+            "maxs": self.maxs,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Rollup":
+        """Return a rollup saved with as_dict()."""
+        rollup = cls(data["start"], tuple(data["keys"]), data["mins"])
+        rollup.count = data["count"]
+        rollup.sums = data["sums"]
+        rollup.maxs = data["maxs"]
+        return rollup
+
+
+class HistoryStore:
+    """Shared SQLite store recording the telemetry of every enabled pack."""
+
+    def __init__(self, hass: HomeAssistant, path: str) -> None:
+        """Initialize."""
+        self.hass = hass
+        self.path = path
+        # Every database write happens on this one thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pace_bms_history")
+        self._db: sqlite3.Connection | None = None
+        self._packs: dict[str, int] = {}
+        self._layouts: dict[tuple[str, ...], int] = {}
+        # Rows waiting for the next flush: tier, entry ID, time, keys, count, values
+        self._pending: list[tuple[str, str, float, tuple[str, ...], int, list[float]]] = []
+        self._buckets: dict[tuple[str, str], Rollup] = {}
+        self._last_recorded: dict[str, float] = {}
+        self._last_prune = 0.0
+        self._unsub_flush: CALLBACK_TYPE | None = None
+        # Entry ID -> listener removal
+        self.coordinators: dict[str, CALLBACK_TYPE] = {}
+
+    async def async_start(self) -> None:
+        """Open the database and start flushing periodically."""
+        await self._async_run(self._open)
+        self._unsub_flush = async_track_time_interval(
+            self.hass, self._async_flush_interval, HISTORY_FLUSH_INTERVAL
+        )
+
+    async def async_stop(self) -> None:
+        """Write everything still buffered, partial rollups included, and close."""
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        for (tier, entry_id), bucket in self._buckets.items():
+            self._pending.append(
+                (tier, entry_id, bucket.start, bucket.keys, bucket.count, bucket.data())
+            )
+        self._buckets.clear()
+        await self.async_flush()
+        await self._async_run(self._close)
+        self._executor.shutdown(wait=False)
+
+    async def _async_run(self, func, *args) -> Any:
+        """Run a function on the database thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    @callback
+    def async_add_coordinator(self, coordinator: "PaceBMSCoordinator") -> None:
+        """Record every successful poll of a coordinator."""
+        entry_id = coordinator.entry_id
+
+        @callback
+        def _async_record() -> None:
+            when = coordinator.last_success_time
+            # Failed polls notify listeners too, with the previous data
+            if not coordinator.last_update_success or when is None:
+                return
+            if self._last_recorded.get(entry_id) == when:
+                return
+            self._last_recorded[entry_id] = when
+            self.record(entry_id, when, coordinator.data)
+
+        self.coordinators[entry_id] = coordinator.async_add_listener(_async_record)
+
+    @callback
+    def async_remove_coordinator(self, coordinator: "PaceBMSCoordinator") -> None:
+        """Stop recording a coordinator."""
+        entry_id = coordinator.entry_id
+        if (unsub := self.coordinators.pop(entry_id, None)) is not None:
+            unsub()
+        self._last_recorded.pop(entry_id, None)
+        # Keep what the pack's open rollups hold so far
+        for tier in HISTORY_TIERS:
+            if (bucket := self._buckets.pop((tier, entry_id), None)) is not None:
+                self._pending.append(
+                    (tier, entry_id, bucket.start, bucket.keys, bucket.count, bucket.data())
+                )
+
+    def record(self, entry_id: str, when: float, data: dict[str, Any]) -> None:
+        """Buffer one poll's telemetry and fold it into the rollups."""
+        keys = tuple(key for key in TELEMETRY_KEYS if data.get(key) is not None)
+        if not keys:
+            return
+        values = [float(data[key]) for key in keys]
+        self._pending.append((HISTORY_TIER_RAW, entry_id, when, keys, 1, values))
+
+        for tier, (period, _) in HISTORY_TIERS.items():
+            if not period:
+                continue
+            start = when - when % period
+            bucket = self._buckets.get((tier, entry_id))
+            if bucket is not None and bucket.start == start and bucket.keys == keys:
+                bucket.add(values)
+                continue
+            # A new period (or a new layout) closes the previous rollup
+            if bucket is not None:
+                self._pending.append(
+                    (tier, entry_id, bucket.start, bucket.keys, bucket.count, bucket.data())
+                )
+            self._buckets[(tier, entry_id)] = Rollup(start, keys, values)
+
+    async def _async_flush_interval(self, _now: datetime) -> None:
+        """Flush on the periodic timer."""
+        await self.async_flush()
+
+    async def async_flush(self) -> None:
+        """Write the buffered rows in one transaction."""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            await self._async_run(self._write, batch)
+        except sqlite3.Error as err:
+            _LOGGER.error("Failed to write %d history rows: %s", len(batch), err)
+
+    def _open(self) -> None:
+        """Open the database and create the schema (database thread)."""
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.create_function("merge_rollups", 4, _merge_rollups, deterministic=True)
+        # Readers (exports) never block the writer
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            for statement in _SCHEMA:
+                self._db.execute(statement)
+        self._packs = dict(
+            (entry_id, pack) for pack, entry_id in self._db.execute("SELECT id, entry_id FROM packs")
+        )
+        self._layouts = {
+            tuple(keys.split(",")): layout
+            for layout, keys in self._db.execute("SELECT id, keys FROM layouts")
+        }
+
+    def _close(self) -> None:
+        """Close the database (database thread)."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _pack_id(self, entry_id: str) -> int:
+        """Return the row ID of a pack, adding it if new (database thread)."""
+        if (pack := self._packs.get(entry_id)) is None:
+            cursor = self._db.execute("INSERT INTO packs (entry_id) VALUES (?)", (entry_id,))
+            pack = self._packs[entry_id] = cursor.lastrowid
+        return pack
+
+    def _layout_id(self, keys: tuple[str, ...]) -> int:
+        """Return the row ID of a key layout, adding it if new (database thread)."""
+        if (layout := self._layouts.get(keys)) is None:
+            cursor = self._db.execute("INSERT INTO layouts (keys) VALUES (?)", (",".join(keys),))
+            layout = self._layouts[keys] = cursor.lastrowid
+        return layout
+
+    def _write(self, batch: list[tuple[str, str, float, tuple[str, ...], int, list[float]]]) -> None:
+        """Insert a batch of rows and prune expired ones (database thread)."""
+        rows: dict[str, list[tuple]] = {tier: [] for tier in HISTORY_TIERS}
+        with self._db:
+            for tier, entry_id, when, keys, count, values in batch:
+                rows[tier].append(
+                    (
+                        self._pack_id(entry_id),
+                        round(when * 1000),
+                        self._layout_id(keys),
+                        count,
+                        _pack(values),
+                    )
+                )
+            for tier, tier_rows in rows.items():
+                if not tier_rows:
+                    continue
+                if not HISTORY_TIERS[tier][0]:
+                    self._db.executemany(
+                        f"INSERT OR REPLACE INTO samples_{tier} VALUES (?, ?, ?, ?, ?)",
+                        tier_rows,
+                    )
+                    continue
+                # A rollup written at shutdown is merged with the rest of its
+                # period; one of another layout (cells detected anew) replaces it
+                self._db.executemany(
+                    f"INSERT INTO samples_{tier} VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (pack, ts) DO UPDATE SET "
+                    "count = CASE WHEN layout = excluded.layout "
+                    "THEN count + excluded.count ELSE excluded.count END, "
+                    "data = CASE WHEN layout = excluded.layout "
+                    "THEN merge_rollups(count, data, excluded.count, excluded.data) "
+                    "ELSE excluded.data END, "
+                    "layout = excluded.layout",
+                    tier_rows,
+                )
+
+        now = time.time()
+        if now - self._last_prune >= HISTORY_PRUNE_INTERVAL:
+            self._last_prune = now
+            self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        """Delete the rows older than each tier's retention (database thread)."""
+        with self._db:
+            for tier, (_, retention) in HISTORY_TIERS.items():
+                cutoff = round((now - retention) * 1000)
+                # Per pack, so every delete is a range scan of the primary key
+                for pack in self._packs.values():
+                    self._db.execute(
+                        f"DELETE FROM samples_{tier} WHERE pack = ? AND ts < ?", (pack, cutoff)
+                    )
+
+    async def async_export(
+        self,
+        filename: str,
+        tier: str,
+        entry_ids: list[str] | None,
+        start: float | None,
+        end: float | None,
+        keys: list[str] | None,
+    ) -> int:
+        """Stream a range of one tier to a CSV file and return the rows written."""
+        # Rows still buffered would be missing from the file
+        await self.async_flush()
+        return await self.hass.async_add_executor_job(
+            _export_csv, self.path, filename, tier, entry_ids, start, end, keys
+        )
+
+
+def query(
+    db: sqlite3.Connection,
+    tier: str,
+    entry_ids: list[str] | None,
+    start: float | None,
+    end: float | None,
+) -> Iterator[tuple[str, float, int, dict[str, tuple[float, ...]]]]:
+    """Yield entry ID, time, poll count and values by key, in time order per pack.
+
+    Raw rows give one value per key, rollups its mean, min and max. Rows are
+    fetched in chunks, so a range of any length is never held in memory.
+    """
+    layouts = {
+        layout: keys.split(",") for layout, keys in db.execute("SELECT id, keys FROM layouts")
+    }
+    packs = dict(db.execute("SELECT id, entry_id FROM packs"))
+
+    for pack, entry_id in packs.items():
+        if entry_ids and entry_id not in entry_ids:
+            continue
+        cursor = db.execute(
+            f"SELECT ts, layout, count, data FROM samples_{tier} "
+            "WHERE pack = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (
+                pack,
+                0 if start is None else round(start * 1000),
+                2**62 if end is None else round(end * 1000),
+            ),
+        )
+        while chunk := cursor.fetchmany(HISTORY_QUERY_CHUNK):
+            for ts, layout, count, data in chunk:
+                values = _unpack(data)
+                row_keys = layouts[layout]
+                # Rollup data is all means, then all minimums, then all maximums
+                width = len(row_keys)
+                yield entry_id, ts / 1000, count, {
+                    key: values[i::width] for i, key in enumerate(row_keys)
+                }
+
+
+def _export_csv(
+    path: str,
+    filename: str,
+    tier: str,
+    entry_ids: list[str] | None,
+    start: float | None,
+    end: float | None,
+    keys: list[str] | None,
+) -> int:
+    """Write a range of one tier as CSV, one row per value (executor)."""
+    rollup = HISTORY_TIERS[tier][0] != 0
+    # A separate read-only connection, so exports never stall the writer
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    rows = 0
+    try:
+        with open(filename, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(
+                ["time", "entry_id", "key", "mean", "min", "max", "polls"]
+                if rollup
+                else ["time", "entry_id", "key", "value"]
+            )
+            for entry_id, when, count, values in query(db, tier, entry_ids, start, end):
+                stamp = datetime.fromtimestamp(when, timezone.utc).isoformat()
+                for key, value in values.items():
+                    if keys and key not in keys:
+                        continue
+                    # float32 holds about 7 significant digits
+                    value = [f"{number:.7g}" for number in value]
+                    if rollup:
+                        writer.writerow([stamp, entry_id, key, *value, count])
+                    else:
+                        writer.writerow([stamp, entry_id, key, *value])
+                    rows += 1
+    finally:
+        db.close()
+    return rows
+
+
+async def async_register_history(hass: HomeAssistant, coordinator: "PaceBMSCoordinator") -> None:
+    """Record a coordinator in the shared history store, opening it if needed."""
+    # Entries set up concurrently must share one store
+    async with hass.data.setdefault(DATA_HISTORY_LOCK, asyncio.Lock()):
+        store: HistoryStore | None = hass.data.get(DATA_HISTORY)
+        if store is None:
+            store = HistoryStore(hass, hass.config.path(HISTORY_FILE))
+            await store.async_start()
+            hass.data[DATA_HISTORY] = store
+        store.async_add_coordinator(coordinator)
+
+
+async def async_unregister_history(hass: HomeAssistant, coordinator: "PaceBMSCoordinator") -> None:
+    """Stop recording a coordinator, closing the store when unused."""
+    async with hass.data.setdefault(DATA_HISTORY_LOCK, asyncio.Lock()):
+        store: HistoryStore | None = hass.data.get(DATA_HISTORY)
+        if store is None:
+            return
+        store.async_remove_coordinator(coordinator)
+        if not store.coordinators:
+            del hass.data[DATA_HISTORY]
+            await store.async_stop()
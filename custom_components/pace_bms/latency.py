@@ -0,0 +1,115 @@
+"""Low-latency tuning of USB serial adapters.
+
+USB serial adapters hold received bytes back until their latency timer runs
+out (16 ms by default on FTDI chips), which adds to every reply. On Linux the
+tty's low-latency flag and, for drivers that have one, the adapter's
+latency_timer in sysfs shorten that.
+"""
+import array
+import fcntl
+import logging
+import os
+import termios
+from typing import Any
+
+from .const import LOW_LATENCY_TIMER
+
+_LOGGER = logging.getLogger(__name__)
+
+# struct serial_struct read as ints, as pyserial does; flags is the fifth one
+_SERIAL_STRUCT_INTS = 32
+_SERIAL_FLAGS = 4
+ASYNC_LOW_LATENCY = 0x2000
+
+_USB_SERIAL_DEVICES = "/sys/bus/usb-serial/devices"
+
+
+def _get_serial(fd: int) -> array.array | None:
+    """Return the serial_struct of a tty, or None if the driver has none."""
+    buf = array.array("i", [0] * _SERIAL_STRUCT_INTS)
+    try:
+        fcntl.ioctl(fd, termios.TIOCGSERIAL, buf)
+    except OSError:
+        return None
+    return buf
+
+
+def _timer_path(path: str) -> str | None:
+    """Return the sysfs latency_timer of the adapter behind a port, if any."""
+    name = os.path.basename(os.path.realpath(path))
+    timer = os.path.join(_USB_SERIAL_DEVICES, name, "latency_timer")
+    return timer if os.path.exists(timer) else None
+
+
+class LatencyTuner:
+    """Low-latency settings of one serial device, and what they were before."""
+
+    def __init__(self, path: str) -> None:
+        """Initialize."""
+        self.path = path
+        # Settings found before the first change, restored by restore()
+        self._low_latency_flag: bool | None = None
+        self._timer: int | None = None
+
+    def apply(self) -> dict[str, Any]:
+        """Set the low-latency flag and latency timer where allowed; return what was set."""
+        applied: dict[str, Any] = {}
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        except OSError as err:
+            _LOGGER.debug("Cannot set low latency flag on %s: %s", self.path, err)
+        else:
+            try:
+                buf = _get_serial(fd)
+                if buf is not None:
+                    if self._low_latency_flag is None:
+                        self._low_latency_flag = bool(buf[_SERIAL_FLAGS] & ASYNC_LOW_LATENCY)
+                    buf[_SERIAL_FLAGS] |= ASYNC_LOW_LATENCY
+                    try:
+                        fcntl.ioctl(fd, termios.TIOCSSERIAL, buf)
+                        applied["low_latency_flag"] = True
+                    except OSError as err:
+                        _LOGGER.debug("Cannot set low latency flag on %s: %s", self.path, err)
+            finally:
+                os.close(fd)
+
+        timer = _timer_path(self.path)
+        if timer is not None and os.access(timer, os.W_OK):
+            try:
+                if self._timer is None:
+                    with open(timer, encoding="ascii") as file:
+                        self._timer = int(file.read())
+                with open(timer, "w", encoding="ascii") as file:
+                    file.write(str(LOW_LATENCY_TIMER))
+                applied["latency_timer"] = LOW_LATENCY_TIMER
+            except (OSError, ValueError) as err:
+                _LOGGER.debug("Cannot set %s: %s", timer, err)
+        return applied
+
+    def restore(self) -> None:
+        """Put back the settings found before apply()."""
+        if self._low_latency_flag is False:
+            try:
+                fd = os.open(self.path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+            except OSError as err:
+                _LOGGER.debug("Cannot restore latency flag on %s: %s", self.path, err)
+            else:
+                try:
+                    buf = _get_serial(fd)
+                    if buf is not None:
+                        buf[_SERIAL_FLAGS] &= ~ASYNC_LOW_LATENCY
+                        fcntl.ioctl(fd, termios.TIOCSSERIAL, buf)
+                except OSError as err:
+                    _LOGGER.debug("Cannot restore latency flag on %s: %s", self.path, err)
+                finally:
+                    os.close(fd)
+        self._low_latency_flag = None
+
+        timer = _timer_path(self.path)
+        if self._timer is not None and timer is not None:
+            try:
+                with open(timer, "w", encoding="ascii") as file:
+                    file.write(str(self._timer))
+            except OSError as err:
+                _LOGGER.debug("Cannot restore %s: %s", timer, err)
+        self._timer = None
@@ -0,0 +1,218 @@
+"""OpenMetrics (Prometheus) scrape endpoint for Pace BMS.
+
+Rendered from the coordinators' last poll and transaction statistics, so a
+scrape never touches the bus. Label sets are formatted once per pack and
+reused by every scrape.
+"""
+from typing import TYPE_CHECKING
+
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    CONF_METRICS,
+    DEFAULT_METRICS,
+    DOMAIN,
+    METRICS_URL,
+    REG_CELL_VOLTAGE_COUNT,
+)
+from .decode import CELL_TEMP_PROBES
+from .stats import LATENCY_BUCKETS
+
+if TYPE_CHECKING:
+    from .coordinator import PaceBMSCoordinator
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Data key, metric name, help text
+PACK_GAUGES: list[tuple[str, str, str]] = [
+    ("current", "pace_bms_current_amperes", "Pack current, positive while charging"),
+    ("pack_voltage", "pace_bms_pack_voltage_volts", "Pack voltage"),
+    ("soc", "pace_bms_state_of_charge_percent", "State of charge"),
+    ("soh", "pace_bms_state_of_health_percent", "State of health"),
+    ("remain_capacity", "pace_bms_remaining_capacity_amp_hours", "Remaining capacity"),
+    ("full_capacity", "pace_bms_full_capacity_amp_hours", "Full charge capacity"),
+    ("design_capacity", "pace_bms_design_capacity_amp_hours", "Design capacity"),
+    ("cycle_count", "pace_bms_cycle_count", "Charge cycles"),
+    ("mosfet_temp", "pace_bms_mosfet_temperature_celsius", "MOSFET temperature"),
+    ("env_temp", "pace_bms_environment_temperature_celsius", "Environment temperature"),
+    ("warning_flags", "pace_bms_warning_flags", "Raw warning flag register"),
+    ("protection_flags", "pace_bms_protection_flags", "Raw protection flag register"),
+    ("status_fault", "pace_bms_status_flags", "Raw status and fault register"),
+    ("balance_status", "pace_bms_balance_flags", "Raw cell balancing register"),
+]
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float | int | bool) -> str:
+    """Format a sample value."""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(round(value, 6))
+
+
+class _PackLabels:
+    """Label sets of one pack, formatted once."""
+
+    __slots__ = ("coordinator", "base", "cells", "probes", "errors", "directions", "buckets")
+
+    def __init__(self, coordinator: "PaceBMSCoordinator") -> None:
+        """Initialize."""
+        self.coordinator = coordinator
+        name = _escape(coordinator.device_name)
+        base = f'slave="{coordinator.slave_id}",device="{name}"'
+        self.base = f"{{{base}}}"
+        # Labels for every input the register map has; the layout may be detected later
+        self.cells = [
+            f'{{{base},cell="{cell}"}}' for cell in range(1, REG_CELL_VOLTAGE_COUNT + 1)
+        ]
+        self.probes = [
+            f'{{{base},probe="{probe}"}}' for probe in range(1, CELL_TEMP_PROBES + 1)
+        ]
+        self.errors = {
+            kind: f'{{{base},kind="{kind}"}}' for kind in coordinator.stats.total.errors
+        }
+        self.directions = (f'{{{base},direction="out"}}', f'{{{base},direction="in"}}')
+        self.buckets = [f'{{{base},le="{bound}"}}' for bound in LATENCY_BUCKETS]
+        self.buckets.append(f'{{{base},le="+Inf"}}')
+
+
+def render_metrics(packs: list[_PackLabels]) -> str:
+    """Render every pack's telemetry and bus statistics."""
+    lines: list[str] = []
+    add = lines.append
+
+    def family(name: str, kind: str, help_text: str) -> None:
+        add(f"# TYPE {name} {kind}")
+        add(f"# HELP {name} {help_text}")
+
+    family("pace_bms_up", "gauge", "1 if the last poll succeeded")
+    for pack in packs:
+        add(f"pace_bms_up{pack.base} {_number(pack.coordinator.last_update_success)}")
+
+    family(
+        "pace_bms_last_success_timestamp_seconds",
+        "gauge",
+        "Unix time of the last successful poll",
+    )
+    for pack in packs:
+        if pack.coordinator.last_success_time is not None:
+            add(
+                f"pace_bms_last_success_timestamp_seconds{pack.base} "
+                f"{_number(pack.coordinator.last_success_time)}"
+            )
+
+    family("pace_bms_poll_duration_seconds", "gauge", "Duration of the last poll")
+    for pack in packs:
+        if pack.coordinator.last_poll_duration is not None:
+            add(
+                f"pace_bms_poll_duration_seconds{pack.base} "
+                f"{_number(pack.coordinator.last_poll_duration)}"
+            )
+
+    family("pace_bms_transactions", "counter", "Bus transactions")
+    for pack in packs:
+        add(f"pace_bms_transactions_total{pack.base} {pack.coordinator.stats.total.transactions}")
+
+    family("pace_bms_transaction_errors", "counter", "Failed bus transactions by kind")
+    for pack in packs:
+        for kind, count in pack.coordinator.stats.total.errors.items():
+            add(f"pace_bms_transaction_errors_total{pack.errors[kind]} {count}")
+
+    family("pace_bms_reconnects", "counter", "Link reopens after a failure")
+    for pack in packs:
+        add(f"pace_bms_reconnects_total{pack.base} {pack.coordinator.stats.reconnects}")
+
+    family("pace_bms_missed_polls", "counter", "Poll slots skipped because the bus overran")
+    for pack in packs:
+        add(f"pace_bms_missed_polls_total{pack.base} {pack.coordinator.stats.missed_polls}")
+
+    family("pace_bms_bus_transferred_bytes", "counter", "RTU-equivalent bytes on the bus")
+    for pack in packs:
+        stats = pack.coordinator.stats.total
+        add(f"pace_bms_bus_transferred_bytes_total{pack.directions[0]} {stats.bytes_out}")
+        add(f"pace_bms_bus_transferred_bytes_total{pack.directions[1]} {stats.bytes_in}")
+
+    family("pace_bms_bus_utilization_ratio", "gauge", "Share of time the bus was busy")
+    for pack in packs:
+        utilization = pack.coordinator.stats.bus_utilization
+        if utilization is not None:
+            add(f"pace_bms_bus_utilization_ratio{pack.base} {_number(utilization / 100)}")
+
+    family("pace_bms_transaction_duration_seconds", "histogram", "Bus transaction time")
+    for pack in packs:
+        stats = pack.coordinator.stats.total
+        cumulative = 0
+        for labels, count in zip(pack.buckets, stats.buckets):
+            cumulative += count
+            add(f"pace_bms_transaction_duration_seconds_bucket{labels} {cumulative}")
+        add(f"pace_bms_transaction_duration_seconds_count{pack.base} {stats.transactions}")
+        add(f"pace_bms_transaction_duration_seconds_sum{pack.base} {_number(stats.busy_time)}")
+
+    for key, name, help_text in PACK_GAUGES:
+        family(name, "gauge", help_text)
+        for pack in packs:
+            data = pack.coordinator.data
+            if data and (value := data.get(key)) is not None:
+                add(f"{name}{pack.base} {_number(value)}")
+
+    family("pace_bms_cell_voltage_volts", "gauge", "Cell voltage")
+    for pack in packs:
+        if data := pack.coordinator.data:
+            cells = pack.coordinator.cells or REG_CELL_VOLTAGE_COUNT
+            for cell, labels in enumerate(pack.cells[:cells], start=1):
+                if (value := data.get(f"cell_{cell}_voltage")) is not None:
+                    add(f"pace_bms_cell_voltage_volts{labels} {_number(value)}")
+
+    family("pace_bms_cell_temperature_celsius", "gauge", "Cell temperature probe")
+    for pack in packs:
+        if data := pack.coordinator.data:
+            probes = pack.coordinator.temp_probes or CELL_TEMP_PROBES
+            for probe, labels in enumerate(pack.probes[:probes], start=1):
+                if (value := data.get(f"temp_{probe}")) is not None:
+                    add(f"pace_bms_cell_temperature_celsius{labels} {_number(value)}")
+
+    add("# EOF")
+    add("")
+    return "\n".join(lines)
+
+
+class PaceBMSMetricsView(HomeAssistantView):
+    """Serve OpenMetrics for every pack with metrics enabled."""
+
+    url = METRICS_URL
+    name = f"api:{DOMAIN}:metrics"
+    requires_auth = True
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self.hass = hass
+        self._labels: dict[str, _PackLabels] = {}
+
+    def _packs(self) -> list[_PackLabels]:
+        """Return the label sets of enabled packs, formatting new ones."""
+        cache: dict[str, _PackLabels] = {}
+        for entry_id, coordinator in self.hass.data.get(DOMAIN, {}).items():
+            if not coordinator.config.get(CONF_METRICS, DEFAULT_METRICS):
+                continue
+            labels = self._labels.get(entry_id)
+            # A reloaded entry brings a new coordinator
+            if labels is None or labels.coordinator is not coordinator:
+                labels = _PackLabels(coordinator)
+            cache[entry_id] = labels
+        self._labels = cache
+        return list(cache.values())
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Render the metrics."""
+        return web.Response(
+            body=render_metrics(self._packs()).encode(),
+            headers={"Content-Type": CONTENT_TYPE},
+        )
@@ -535,6 +535,10 @@ async def async_setup_entry(
     """Set up Pace BMS number entities."""
     coordinator: PaceBMSCoordinator = hass.data[DOMAIN][entry.entry_id]
 
+    # Protection parameters are only reachable through holding registers
+    if not coordinator.register_access:
+        return
+
     entities = []
     for key, config in PARAMETER_CONFIG.items():
         entities.append(PaceBMSNumber(coordinator, key, config))
@@ -594,8 +598,7 @@ class PaceBMSNumber(CoordinatorEntity, NumberEntity):
             self._key, value, scaled_value, self._config["address"], self._config["scale"]
         )
         
-        success = await self.hass.async_add_executor_job(
-            self.coordinator.write_register,
+        success = await self.coordinator.async_write_register(
             self._config["address"],
             scaled_value,
         )
@@ -0,0 +1,116 @@
+"""Pace native RS485 ASCII protocol (version 0x25) encoding and decoding.
+
+Frame layout: ``~ VER ADR CID1 CID2 LENGTH INFO CHKSUM \\r`` where every
+field after the start-of-information marker is sent as upper-case hex.
+"""
+import struct
+from typing import Any
+
+from pymodbus.exceptions import ModbusIOException
+
+from .framing import ModbusDeviceError
+
+PACE_PROTOCOL_VERSION = 0x25
+CID1_BATTERY = 0x46
+CID2_ANALOG = 0x42
+# INFO value asking the master pack for every pack in its parallel group
+ADDRESS_ALL_PACKS = 0xFF
+
+SOI = b"~"
+EOI = b"\r"
+
+# Temperature probes in reply order: four cell probes, MOSFET, environment
+TEMPERATURE_KEYS = ["temp_1", "temp_2", "temp_3", "temp_4", "mosfet_temp", "env_temp"]
+
+
+def _length_field(info_length: int) -> str:
+    """Return the LENGTH field (LCHKSUM nibble + 12-bit LENID) as hex."""
+    nibble_sum = (info_length & 0xF) + ((info_length >> 4) & 0xF) + ((info_length >> 8) & 0xF)
+    lchksum = -nibble_sum & 0xF
+    return f"{(lchksum << 12) | info_length:04X}"
+
+
+def _checksum(body: bytes) -> int:
+    """Return the frame checksum of everything between SOI and CHKSUM."""
+    return -sum(body) & 0xFFFF
+
+
+def encode_command(address: int, cid2: int, info: bytes = b"") -> bytes:
+    """Build a command frame."""
+    info_hex = info.hex().upper()
+    body = (
+        f"{PACE_PROTOCOL_VERSION:02X}{address:02X}{CID1_BATTERY:02X}{cid2:02X}"
+        f"{_length_field(len(info_hex))}{info_hex}"
+    ).encode("ascii")
+    return SOI + body + f"{_checksum(body):04X}".encode("ascii") + EOI
+
+
+def decode_response(frame: bytes) -> tuple[int, bytes]:
+    """Validate a response frame and return (address, INFO bytes)."""
+    frame = frame.strip(b"\r\n")
+    if not frame.startswith(SOI) or len(frame) < 17:
+        raise ModbusIOException(f"Malformed Pace response: {frame[:20]!r}")
+    body, checksum = frame[1:-4], frame[-4:]
+    try:
+        if int(checksum, 16) != _checksum(body):
+            raise ModbusIOException("Checksum error in Pace response")
+        address = int(body[2:4], 16)
+        rtn = int(body[6:8], 16)
+        info_length = int(body[8:12], 16) & 0x0FFF
+        info = bytes.fromhex(body[12:12 + info_length].decode("ascii"))
+    except ValueError as err:
+        raise ModbusIOException(f"Invalid hex in Pace response: {err}") from err
+    if rtn != 0:
+        raise ModbusDeviceError(f"Pace response code {rtn:#04x}")
+    return address, info
+
+
+def _decode_pack(info: bytes, pos: int) -> tuple[int, dict[str, Any], int]:
+    """Decode one pack block; return (pack address, data, next offset)."""
+    address, cells = info[pos], info[pos + 1]
+    pos += 2
+    data: dict[str, Any] = {}
+
+    voltages = struct.unpack_from(f">{cells}H", info, pos)
+    pos += cells * 2
+    for i, voltage in enumerate(voltages, start=1):
+        data[f"cell_{i}_voltage"] = voltage * 0.001
+
+    probes = info[pos]
+    pos += 1
+    temperatures = struct.unpack_from(f">{probes}H", info, pos)
+    pos += probes * 2
+    # Temperatures are reported in 0.1 K
+    for key, temperature in zip(TEMPERATURE_KEYS, temperatures):
+        data[key] = (temperature - 2731) * 0.1
+
+    current, voltage, remain, user_fields = struct.unpack_from(">hHHB", info, pos)
+    pos += 7
+    full, cycles = struct.unpack_from(">HH", info, pos)
+    pos += 4
+    data["current"] = current * 0.01
+    data["pack_voltage"] = voltage * 0.001
+    data["remain_capacity"] = remain * 0.01
+    data["full_capacity"] = full * 0.01
+    data["cycle_count"] = cycles
+    data["soc"] = round(remain * 100 / full) if full else 0
+    if user_fields >= 3:
+        data["design_capacity"] = struct.unpack_from(">H", info, pos)[0] * 0.01
+    # Skip any further user-defined fields this firmware appends
+    pos += max(user_fields - 2, 0) * 2
+
+    return address, data, pos
+
+
+def decode_analog_info(info: bytes) -> dict[int, dict[str, Any]]:
+    """Decode a 0x42 analog reply into data keys per pack address."""
+    packs: dict[int, dict[str, Any]] = {}
+    # First byte is DATAFLAG
+    pos = 1
+    try:
+        while pos < len(info):
+            address, data, pos = _decode_pack(info, pos)
+            packs[address] = data
+    except (IndexError, struct.error) as err:
+        raise ModbusIOException(f"Truncated Pace analog reply: {err}") from err
+    return packs
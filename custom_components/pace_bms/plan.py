@@ -0,0 +1,110 @@
+"""Register plan: the blocks a poll reads, from the entities in use.
+
+Each entity's unique ID ends in the data key it shows, so the enabled
+entities of a config entry tell which span of each telemetry block and of
+the protection parameters and whether the identification strings are needed.
+"""
+from collections.abc import Iterable
+
+from .const import REG_CELL_VOLTAGE_COUNT
+from .decode import IDENTITY_KEYS, PARAMETER_BLOCK, TELEMETRY_ADDRESSES, TELEMETRY_BLOCKS
+
+# Data keys of every cell voltage, which drift detection reads on every poll
+CELL_VOLTAGE_KEYS = tuple(f"cell_{i}_voltage" for i in range(1, REG_CELL_VOLTAGE_COUNT + 1))
+
+# Entity keys that show a data key under another name
+_ALIASES: dict[str, str] = {"balancing_cells": "balance_status"}
+# Entity keys computed from data the coordinator reads for itself
+_DERIVED = frozenset({"drifting_cells"})
+_DECODED_SUFFIX = "_decoded"
+_STATUS_BIT_PREFIX = "status_"
+
+
+class RegisterPlan:
+    """Register blocks read by each poll of one pack."""
+
+    __slots__ = ("telemetry", "parameters", "identity")
+
+    def __init__(
+        self,
+        telemetry: list[tuple[int, int]],
+        parameters: tuple[int, int] | None,
+        identity: bool,
+    ) -> None:
+        """Initialize."""
+        self.telemetry = telemetry
+        self.parameters = parameters
+        self.identity = identity
+
+    def __eq__(self, other: object) -> bool:
+        """Return True if both plans read the same blocks."""
+        if not isinstance(other, RegisterPlan):
+            return NotImplemented
+        return (self.telemetry, self.parameters, self.identity) == (
+            other.telemetry,
+            other.parameters,
+            other.identity,
+        )
+
+    def __repr__(self) -> str:
+        """Return the blocks read, as register ranges."""
+        blocks = [f"{address}-{address + count - 1}" for address, count in self.telemetry]
+        if self.parameters is not None:
+            address, count = self.parameters
+            blocks.append(f"{address}-{address + count - 1}")
+        if self.identity:
+            blocks.append("identity")
+        return f"RegisterPlan({', '.join(blocks) or 'nothing'})"
+
+
+FULL_PLAN = RegisterPlan(list(TELEMETRY_BLOCKS), PARAMETER_BLOCK, True)
+
+
+def data_key(entity_key: str) -> str:
+    """Return the data key an entity key shows."""
+    if entity_key in _ALIASES:
+        return _ALIASES[entity_key]
+    if entity_key.endswith(_DECODED_SUFFIX):
+        return entity_key[: -len(_DECODED_SUFFIX)]
+    if entity_key.startswith(_STATUS_BIT_PREFIX) and entity_key[len(_STATUS_BIT_PREFIX):].isdigit():
+        return "status_fault"
+    return entity_key
+
+
+def build_plan(entity_keys: Iterable[str]) -> RegisterPlan:
+    """Return the plan reading just what the given entity keys need."""
+    # Import here to avoid circular imports
+    from .number import PARAMETER_CONFIG
+    from .sensor import STATISTICS_SENSORS
+
+    statistics = {description[0] for description in STATISTICS_SENSORS}
+    registers: list[int] = []
+    addresses: list[int] = []
+    identity = False
+
+    for entity_key in entity_keys:
+        key = data_key(entity_key)
+        if key in TELEMETRY_ADDRESSES:
+            registers.append(TELEMETRY_ADDRESSES[key])
+        elif key in PARAMETER_CONFIG:
+            addresses.append(PARAMETER_CONFIG[key]["address"])
+        elif key in IDENTITY_KEYS:
+            identity = True
+        elif key not in statistics and key not in _DERIVED:
+            # An entity this module does not know about: read everything
+            return FULL_PLAN
+
+    # One transaction over the span of the registers in use, per block
+    telemetry = []
+    for address, count in TELEMETRY_BLOCKS:
+        if span := _span([r for r in registers if address <= r < address + count]):
+            telemetry.append(span)
+
+    return RegisterPlan(telemetry, _span(addresses), identity)
+
+
+def _span(addresses: list[int]) -> tuple[int, int] | None:
+    """Return the block from the lowest to the highest address, if any."""
+    if not addresses:
+        return None
+    return min(addresses), max(addresses) - min(addresses) + 1
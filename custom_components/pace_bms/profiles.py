@@ -0,0 +1,135 @@
+"""Protection parameter profiles synced across packs.
+
+Each target pack's parameter block is read once and only the registers that
+differ from the profile are written, so a bank that already matches costs one
+read per pack. Packs on different buses are synced in parallel, packs sharing
+a bus one after another.
+"""
+import asyncio
+import logging
+import os
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util.yaml import load_yaml
+
+from .const import PROFILES_FILE
+from .decode import parameter_register, parameter_value
+
+if TYPE_CHECKING:
+    from .coordinator import PaceBMSCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _load_profiles(path: str) -> dict[str, Any]:
+    """Load the profiles file, or nothing if there is none."""
+    if not os.path.exists(path):
+        return {}
+    return load_yaml(path) or {}
+
+
+async def async_load_profile(hass: HomeAssistant, name: str) -> dict[str, float]:
+    """Return a named profile from the profiles file."""
+    path = hass.config.path(PROFILES_FILE)
+    try:
+        profiles = await hass.async_add_executor_job(_load_profiles, path)
+    except HomeAssistantError as err:
+        raise HomeAssistantError(f"Cannot read {path}: {err}") from err
+    if not isinstance(profiles.get(name), dict):
+        raise HomeAssistantError(f"No profile {name} in {path}")
+    return profiles[name]
+
+
+def profile_registers(values: dict[str, float]) -> dict[int, int]:
+    """Return the register values of a profile, checked against the parameter ranges."""
+    # Import here to avoid circular imports
+    from .number import PARAMETER_CONFIG
+
+    registers = {}
+    for key, value in values.items():
+        if (config := PARAMETER_CONFIG.get(key)) is None:
+            raise HomeAssistantError(f"Unknown protection parameter {key}")
+        try:
+            value = float(value)
+        except (TypeError, ValueError) as err:
+            raise HomeAssistantError(f"Invalid value {value!r} for {key}") from err
+        if not config["min"] <= value <= config["max"]:
+            raise HomeAssistantError(
+                f"Value {value} for {key} is outside [{config['min']}, {config['max']}]"
+            )
+        registers[config["address"]] = parameter_register(key, value)
+    return registers
+
+
+def registers_profile(registers: dict[int, int]) -> dict[str, float]:
+    """Return the parameter values of register values."""
+    # Import here to avoid circular imports
+    from .number import PARAMETER_CONFIG
+
+    return {
+        key: parameter_value(key, registers[config["address"]])
+        for key, config in PARAMETER_CONFIG.items()
+        if config["address"] in registers
+    }
+
+
+async def async_read_reference(coordinator: "PaceBMSCoordinator") -> dict[int, int]:
+    """Read a reference pack's parameter registers, to be copied as they are."""
+    return await coordinator.transport.executor.async_run(
+        coordinator.read_parameter_registers
+    )
+
+
+async def async_sync_parameters(
+    coordinators: list["PaceBMSCoordinator"], target: dict[int, int], dry_run: bool
+) -> dict[str, Any]:
+    """Bring every pack to the target registers; return the differences per pack."""
+    # Import here to avoid circular imports
+    from .number import PARAMETER_CONFIG
+
+    keys = {config["address"]: key for key, config in PARAMETER_CONFIG.items()}
+    report: dict[str, Any] = {}
+
+    async def async_sync_pack(coordinator: "PaceBMSCoordinator") -> None:
+        """Sync one pack on its bus thread and report it."""
+        pack: dict[str, Any] = {"name": coordinator.device_name}
+        report[coordinator.entry_id] = pack
+        try:
+            diff = await coordinator.transport.executor.async_run(
+                coordinator.sync_registers, target, dry_run
+            )
+        except Exception as err:
+            _LOGGER.error("Syncing parameters of %s failed: %s", coordinator.device_name, err)
+            pack["error"] = str(err)
+            return
+        pack["changes"] = {
+            keys[address]: {
+                "from": parameter_value(keys[address], old),
+                "to": parameter_value(keys[address], new),
+                "written": written,
+            }
+            for address, (old, new, written) in diff.items()
+        }
+        if any(written for _, _, written in diff.values()):
+            await coordinator.async_request_refresh()
+
+    async def async_sync_bus(packs: list["PaceBMSCoordinator"]) -> None:
+        """Sync the packs sharing one bus in turn."""
+        for coordinator in packs:
+            await async_sync_pack(coordinator)
+
+    buses: dict[int, list["PaceBMSCoordinator"]] = {}
+    for coordinator in coordinators:
+        buses.setdefault(id(coordinator.transport), []).append(coordinator)
+    await asyncio.gather(*(async_sync_bus(packs) for packs in buses.values()))
+
+    changed = sum(1 for pack in report.values() if pack.get("changes"))
+    _LOGGER.info(
+        "Parameter sync%s: %d of %d packs differed",
+        " (dry run)" if dry_run else "",
+        changed,
+        len(report),
+    )
+    return report
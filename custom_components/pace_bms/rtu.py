@@ -0,0 +1,109 @@
+"""Lean Modbus RTU engine for the fixed-block polling path.
+
+The coordinator reads the same handful of blocks every poll, so request
+frames are built once per (slave, address, count) and replies are read into
+one preallocated buffer and unpacked in place with a precompiled struct.
+"""
+import struct
+
+import serial
+from pymodbus.exceptions import ModbusIOException
+
+from .const import MODBUS_CHAR_BITS, MODBUS_TIMEOUT
+from .framing import (
+    FUNC_READ_HOLDING_REGISTERS,
+    ModbusCrcError,
+    ModbusDeviceError,
+    check_write_response,
+    crc16,
+    read_request_pdu,
+    rtu_frame,
+    write_request_pdu,
+)
+
+# Largest RTU frame: address + function + byte count + 250 data bytes + CRC
+RTU_MAX_FRAME = 256
+# Exception responses are address + function + code + CRC
+RTU_EXCEPTION_LENGTH = 5
+RTU_WRITE_RESPONSE_LENGTH = 8
+
+_CRC = struct.Struct("<H")
+
+
+class _ReadRequest:
+    """Precomputed frame and reply layout for one register block."""
+
+    __slots__ = ("frame", "length", "byte_count", "registers")
+
+    def __init__(self, slave_id: int, address: int, count: int) -> None:
+        """Initialize."""
+        self.frame = rtu_frame(slave_id, read_request_pdu(address, count))
+        self.length = 5 + 2 * count
+        self.byte_count = 2 * count
+        self.registers = struct.Struct(f">{count}H")
+
+
+class RtuEngine:
+    """Modbus RTU master working directly on an open serial port."""
+
+    def __init__(
+        self, port: serial.Serial, baudrate: int, turnaround: float = MODBUS_TIMEOUT
+    ) -> None:
+        """Initialize."""
+        self._port = port
+        self._char_time = MODBUS_CHAR_BITS / baudrate
+        self._turnaround = turnaround
+        self._requests: dict[tuple[int, int, int], _ReadRequest] = {}
+        self._buffer = bytearray(RTU_MAX_FRAME)
+        self._view = memoryview(self._buffer)
+
+    def _exchange(self, frame: bytes, length: int) -> int:
+        """Send a frame and read up to length reply bytes into the buffer."""
+        port = self._port
+        port.reset_input_buffer()
+        port.write(frame)
+        port.timeout = self._turnaround + (len(frame) + length) * self._char_time
+        return port.readinto(self._view[:length])
+
+    def _check(self, received: int, length: int, slave_id: int) -> None:
+        """Validate the reply in the buffer, raising on any error."""
+        buffer = self._buffer
+        if (
+            received == RTU_EXCEPTION_LENGTH
+            and buffer[1] & 0x80
+            and crc16(self._view[:3]) == _CRC.unpack_from(buffer, 3)[0]
+        ):
+            raise ModbusDeviceError(f"Exception response, code {buffer[2]}", buffer[2])
+        if received != length:
+            raise ModbusIOException(
+                f"No response from slave {slave_id} ({received} of {length} bytes)"
+            )
+        if crc16(self._view[: length - 2]) != _CRC.unpack_from(buffer, length - 2)[0]:
+            raise ModbusCrcError(f"CRC error in response from slave {slave_id}")
+        if buffer[0] != slave_id:
+            raise ModbusIOException(
+                f"Response from slave {buffer[0]} while waiting for slave {slave_id}"
+            )
+
+    def read(self, slave_id: int, address: int, count: int) -> tuple[int, ...]:
+        """Read a block of holding registers."""
+        key = (slave_id, address, count)
+        request = self._requests.get(key)
+        if request is None:
+            request = self._requests[key] = _ReadRequest(slave_id, address, count)
+
+        received = self._exchange(request.frame, request.length)
+        self._check(received, request.length, slave_id)
+        buffer = self._buffer
+        if buffer[1] != FUNC_READ_HOLDING_REGISTERS or buffer[2] != request.byte_count:
+            raise ModbusIOException(f"Unexpected reply to read of address {address}")
+        return request.registers.unpack_from(buffer, 3)
+
+    def write(self, slave_id: int, address: int, values: list[int]) -> None:
+        """Write holding registers using 0x10 (write multiple registers)."""
+        frame = rtu_frame(slave_id, write_request_pdu(address, values))
+        received = self._exchange(frame, RTU_WRITE_RESPONSE_LENGTH)
+        self._check(received, RTU_WRITE_RESPONSE_LENGTH, slave_id)
+        check_write_response(
+            bytes(self._view[1:RTU_WRITE_RESPONSE_LENGTH - 2]), address, len(values)
+        )
@@ -0,0 +1,75 @@
+"""Poll scheduling for the packs sharing one bus.
+
+Polls of every pack on a bus are anchored to a common epoch, so a slow poll
+never pushes later polls back, and their phases are spread evenly over the
+interval instead of bursting together. A poll that finishes after its
+pack's next slot has passed makes that slot be skipped, which is counted as
+an overrun: the bus cannot carry the requested poll rate.
+"""
+import math
+
+from .const import SCHEDULER_OVERRUN_CYCLES
+
+
+class BusScheduler:
+    """Hand out poll slots to the packs on one bus."""
+
+    def __init__(self, name: str) -> None:
+        """Initialize."""
+        self.name = name
+        # Packs sharing one cached group reply must poll together
+        self.stagger = True
+        self._epoch: float | None = None
+        # Member -> poll interval, in order of registration
+        self._members: dict[str, float] = {}
+        # Member -> last slot handed out
+        self._slots: dict[str, float] = {}
+        self._last_miss: float | None = None
+        self.missed = 0
+        # Overrun state last reported to the user
+        self.reported = False
+
+    def __contains__(self, member: str) -> bool:
+        """Return True if a pack is registered."""
+        return member in self._members
+
+    def add(self, member: str, interval: float, now: float) -> None:
+        """Register a pack, respreading the phases of the others."""
+        if self._epoch is None:
+            self._epoch = now
+        self._members[member] = interval
+        # Phases change, so earlier slots say nothing about missed polls
+        self._slots.clear()
+
+    def remove(self, member: str) -> None:
+        """Unregister a pack."""
+        self._members.pop(member, None)
+        self._slots.clear()
+
+    def phase(self, member: str) -> float:
+        """Return a pack's offset into its interval."""
+        if not self.stagger:
+            return 0.0
+        index = list(self._members).index(member)
+        return self._members[member] * index / len(self._members)
+
+    def next_poll(self, member: str, now: float) -> tuple[float, int]:
+        """Return a pack's next slot after now and the number of slots it missed."""
+        interval = self._members[member]
+        offset = self._epoch + self.phase(member)
+        slot = offset + (math.floor((now - offset) / interval) + 1) * interval
+        missed = 0
+        if (last := self._slots.get(member)) is not None:
+            missed = max(0, round((slot - last) / interval) - 1)
+        self._slots[member] = slot
+        if missed:
+            self.missed += missed
+            self._last_miss = now
+        return slot, missed
+
+    def overrun(self, now: float) -> bool:
+        """Return True if a pack missed a slot in the last few cycles."""
+        if self._last_miss is None or not self._members:
+            return False
+        window = SCHEDULER_OVERRUN_CYCLES * max(self._members.values())
+        return now - self._last_miss < window
@@ -1,4 +1,7 @@
 """Sensor platform for Pace BMS."""
+from collections.abc import Callable
+from typing import Any
+
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
@@ -7,16 +10,69 @@ from homeassistant.components.sensor import (
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
     PERCENTAGE,
+    EntityCategory,
     UnitOfElectricCurrent,
     UnitOfElectricPotential,
+    UnitOfInformation,
     UnitOfTemperature,
+    UnitOfTime,
 )
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN, PROTECTION_FLAGS, STATUS_FLAGS, WARNING_FLAGS
+from .const import (
+    CONF_CELL_STATISTICS,
+    DEFAULT_CELL_STATISTICS,
+    DOMAIN,
+    PROTECTION_FLAGS,
+    REG_CELL_VOLTAGE_COUNT,
+    STATUS_FLAGS,
+    WARNING_FLAGS,
+)
 from .coordinator import PaceBMSCoordinator
+from .stats import ERROR_CRC, ERROR_EXCEPTION, ERROR_TIMEOUT, SlaveStats
+
+
+def _milliseconds(seconds: float | None) -> float | None:
+    """Convert a latency to milliseconds."""
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+# key, name, unit, device class, state class, enabled by default, value
+STATISTICS_SENSORS: list[
+    tuple[str, str, str | None, str | None, str, bool, Callable[[SlaveStats], Any]]
+] = [
+    ("bus_transactions", "Bus Transactions", None, None,
+     SensorStateClass.TOTAL_INCREASING, True, lambda stats: stats.total.transactions),
+    ("transaction_latency", "Transaction Latency", UnitOfTime.MILLISECONDS,
+     SensorDeviceClass.DURATION, SensorStateClass.MEASUREMENT, True,
+     lambda stats: _milliseconds(stats.total.latency_mean)),
+    ("transaction_latency_p95", "Transaction Latency P95", UnitOfTime.MILLISECONDS,
+     SensorDeviceClass.DURATION, SensorStateClass.MEASUREMENT, True,
+     lambda stats: _milliseconds(stats.total.latency_percentile(0.95))),
+    ("bus_timeouts", "Bus Timeouts", None, None, SensorStateClass.TOTAL_INCREASING,
+     True, lambda stats: stats.total.errors[ERROR_TIMEOUT]),
+    ("bus_crc_errors", "CRC Errors", None, None, SensorStateClass.TOTAL_INCREASING,
+     True, lambda stats: stats.total.errors[ERROR_CRC]),
+    ("bus_exceptions", "Exception Responses", None, None,
+     SensorStateClass.TOTAL_INCREASING, True,
+     lambda stats: stats.total.errors[ERROR_EXCEPTION]),
+    ("bus_reconnects", "Reconnects", None, None, SensorStateClass.TOTAL_INCREASING,
+     True, lambda stats: stats.reconnects),
+    ("bus_retries", "Retried Polls", None, None, SensorStateClass.TOTAL_INCREASING,
+     False, lambda stats: stats.retries),
+    ("missed_polls", "Missed Polls", None, None, SensorStateClass.TOTAL_INCREASING,
+     True, lambda stats: stats.missed_polls),
+    ("bus_bytes_out", "Bytes Sent", UnitOfInformation.BYTES, SensorDeviceClass.DATA_SIZE,
+     SensorStateClass.TOTAL_INCREASING, False, lambda stats: stats.total.bytes_out),
+    ("bus_bytes_in", "Bytes Received", UnitOfInformation.BYTES,
+     SensorDeviceClass.DATA_SIZE, SensorStateClass.TOTAL_INCREASING, False,
+     lambda stats: stats.total.bytes_in),
+    ("bus_utilization", "Bus Utilization", PERCENTAGE, None,
+     SensorStateClass.MEASUREMENT, True,
+     lambda stats: None if stats.bus_utilization is None else round(stats.bus_utilization, 1)),
+]
 
 
 async def async_setup_entry(
@@ -94,38 +150,6 @@ async def async_setup_entry(
             SensorStateClass.TOTAL_INCREASING,
         ),
         # Temperatures
-        PaceBMSSensor(
-            coordinator,
-            "temp_1",
-            "Temperature 1",
-            UnitOfTemperature.CELSIUS,
-            SensorDeviceClass.TEMPERATURE,
-            SensorStateClass.MEASUREMENT,
-        ),
-        PaceBMSSensor(
-            coordinator,
-            "temp_2",
-            "Temperature 2",
-            UnitOfTemperature.CELSIUS,
-            SensorDeviceClass.TEMPERATURE,
-            SensorStateClass.MEASUREMENT,
-        ),
-        PaceBMSSensor(
-            coordinator,
-            "temp_3",
-            "Temperature 3",
-            UnitOfTemperature.CELSIUS,
-            SensorDeviceClass.TEMPERATURE,
-            SensorStateClass.MEASUREMENT,
-        ),
-        PaceBMSSensor(
-            coordinator,
-            "temp_4",
-            "Temperature 4",
-            UnitOfTemperature.CELSIUS,
-            SensorDeviceClass.TEMPERATURE,
-            SensorStateClass.MEASUREMENT,
-        ),
         PaceBMSSensor(
             coordinator,
             "mosfet_temp",
@@ -144,8 +168,25 @@ async def async_setup_entry(
         ),
     ]
 
-    # Add cell voltage sensors
-    for i in range(1, 17):
+    # Add sensors for the populated cell temperature probes and cells only
+    for i in range(1, coordinator.temp_probes + 1):
+        entities.append(
+            PaceBMSSensor(
+                coordinator,
+                f"temp_{i}",
+                f"Temperature {i}",
+                UnitOfTemperature.CELSIUS,
+                SensorDeviceClass.TEMPERATURE,
+                SensorStateClass.MEASUREMENT,
+            )
+        )
+    # Cell statistics imported in bulk replace the recorder's own
+    cell_state_class = (
+        None
+        if entry.data.get(CONF_CELL_STATISTICS, DEFAULT_CELL_STATISTICS)
+        else SensorStateClass.MEASUREMENT
+    )
+    for i in range(1, coordinator.cells + 1):
         entities.append(
             PaceBMSSensor(
                 coordinator,
@@ -153,10 +194,25 @@ async def async_setup_entry(
                 f"Cell {i} Voltage",
                 UnitOfElectricPotential.VOLT,
                 SensorDeviceClass.VOLTAGE,
-                SensorStateClass.MEASUREMENT,
+                cell_state_class,
             )
         )
 
+    # Remove the sensors an earlier setup created for inputs the pack does not have
+    coordinator.async_remove_absent_sensors()
+
+    entities.append(PaceBMSDriftSensor(coordinator))
+
+    # Status flags, SOH and identification are only reachable through holding registers
+    if not coordinator.register_access:
+        entities = [
+            entity
+            for entity in entities
+            if entity.unique_id != f"{coordinator.entry_id}_soh"
+        ]
+        async_add_entities(entities)
+        return
+
     # Add flag decode sensors
     entities.extend(
         [
@@ -178,6 +234,12 @@ async def async_setup_entry(
         ]
     )
 
+    # Bus transaction statistics
+    entities.extend(
+        PaceBMSStatisticsSensor(coordinator, *description)
+        for description in STATISTICS_SENSORS
+    )
+
     async_add_entities(entities)
 
 
@@ -260,6 +322,15 @@ class PaceBMSBalanceSensor(CoordinatorEntity, SensorEntity):
 
     _attr_has_entity_name = True
     _attr_should_poll = False
+    # The counters change every poll; keep them out of the state history
+    _unrecorded_attributes = frozenset(
+        {
+            "observed_seconds",
+            "balancing_seconds",
+            "balancing_transitions",
+            "balancing_duty_cycle",
+        }
+    )
 
     def __init__(self, coordinator: PaceBMSCoordinator) -> None:
         """Initialize the sensor."""
@@ -277,4 +348,81 @@ class PaceBMSBalanceSensor(CoordinatorEntity, SensorEntity):
         for i in range(16):
             if value & (1 << i):
                 cells.append(str(i + 1))
-        return ", ".join(cells) if cells else "Off"
\ No newline at end of file
+        return ", ".join(cells) if cells else "Off"
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the balancing time and transitions of each cell so far."""
+        coordinator = self.coordinator
+        return coordinator.balancing.as_dict(coordinator.cells or REG_CELL_VOLTAGE_COUNT)
+
+
+class PaceBMSDriftSensor(CoordinatorEntity, SensorEntity):
+    """Diagnostic sensor for cells drifting away from the pack mean."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    # The statistics change every poll; keep them out of the state history
+    _unrecorded_attributes = frozenset(
+        {"deviation_mv", "deviation_std_mv", "trend_mv_per_hour", "z_score"}
+    )
+
+    def __init__(self, coordinator: PaceBMSCoordinator) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._attr_name = "Drifting Cells"
+        self._attr_unique_id = f"{coordinator.entry_id}_drifting_cells"
+        self._attr_device_info = coordinator.device_info
+
+    @property
+    def native_value(self):
+        """Return the drifting cells."""
+        cells = sorted(self.coordinator.drift.drifting)
+        return ", ".join(str(cell + 1) for cell in cells) if cells else "None"
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the drift statistics of each cell."""
+        coordinator = self.coordinator
+        return coordinator.drift.as_dict(coordinator.cells or REG_CELL_VOLTAGE_COUNT)
+
+
+class PaceBMSStatisticsSensor(CoordinatorEntity, SensorEntity):
+    """Diagnostic sensor for bus transaction statistics."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(
+        self,
+        coordinator: PaceBMSCoordinator,
+        key: str,
+        name: str,
+        unit: str | None,
+        device_class: str | None,
+        state_class: str,
+        enabled_default: bool,
+        value_fn: Callable[[SlaveStats], Any],
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._value_fn = value_fn
+        self._attr_name = name
+        self._attr_unique_id = f"{coordinator.entry_id}_{key}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_class = device_class
+        self._attr_state_class = state_class
+        self._attr_entity_registry_enabled_default = enabled_default
+        self._attr_device_info = coordinator.device_info
+
+    @property
+    def available(self) -> bool:
+        """Stay available while polls fail; that is when these matter most."""
+        return True
+
+    @property
+    def native_value(self):
+        """Return the statistic."""
+        return self._value_fn(self.coordinator.stats)
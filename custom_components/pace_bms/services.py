@@ -0,0 +1,177 @@
+"""Services for Pace BMS."""
+import json
+import logging
+import time
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DATA_HISTORY,
+    DOMAIN,
+    HISTORY_TIER_RAW,
+    HISTORY_TIERS,
+    SERVICE_EXPORT_HISTORY,
+    SERVICE_EXPORT_TRACE,
+    SERVICE_SYNC_PARAMETERS,
+)
+from .profiles import (
+    async_load_profile,
+    async_read_reference,
+    async_sync_parameters,
+    profile_registers,
+    registers_profile,
+)
+from .tracing import TRACER
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_FILENAME = "filename"
+ATTR_ENTRY_ID = "entry_id"
+ATTR_TIER = "tier"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_KEYS = "keys"
+ATTR_REFERENCE = "reference"
+ATTR_PROFILE = "profile"
+ATTR_PARAMETERS = "parameters"
+ATTR_DRY_RUN = "dry_run"
+
+EXPORT_TRACE_SCHEMA = vol.Schema({vol.Optional(ATTR_FILENAME): cv.string})
+
+EXPORT_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ENTRY_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_TIER, default=HISTORY_TIER_RAW): vol.In(list(HISTORY_TIERS)),
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_KEYS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_FILENAME): cv.string,
+    }
+)
+
+SYNC_PARAMETERS_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Optional(ATTR_ENTRY_ID): vol.All(cv.ensure_list, [cv.string]),
+            vol.Exclusive(ATTR_REFERENCE, "source"): cv.string,
+            vol.Exclusive(ATTR_PROFILE, "source"): cv.string,
+            vol.Exclusive(ATTR_PARAMETERS, "source"): {cv.string: vol.Coerce(float)},
+            vol.Optional(ATTR_DRY_RUN, default=False): cv.boolean,
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_REFERENCE, ATTR_PROFILE, ATTR_PARAMETERS),
+)
+
+
+async def _async_check_path(hass: HomeAssistant, filename: str) -> None:
+    """Refuse to write a file outside the allowed directories."""
+    # Resolving the path touches the filesystem
+    if not await hass.async_add_executor_job(hass.config.is_allowed_path, filename):
+        raise HomeAssistantError(
+            f"Cannot write {filename}, no access to path; "
+            "allowlist_external_dirs may need to be adjusted in configuration.yaml"
+        )
+
+
+def _write_trace(path: str, trace: dict) -> None:
+    """Write a trace document to disk."""
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(trace, file)
+
+
+async def async_register_services(hass: HomeAssistant) -> None:
+    """Register the integration services once."""
+    if hass.services.has_service(DOMAIN, SERVICE_EXPORT_TRACE):
+        return
+
+    async def async_export_trace(call: ServiceCall) -> ServiceResponse:
+        """Write the buffered poll spans as a Chrome trace file."""
+        if filename := call.data.get(ATTR_FILENAME):
+            await _async_check_path(hass, filename)
+        else:
+            filename = hass.config.path(
+                f"pace_bms_trace_{time.strftime('%Y%m%d_%H%M%S')}.json"
+            )
+        trace = TRACER.export()
+        await hass.async_add_executor_job(_write_trace, filename, trace)
+        events = sum(1 for event in trace["traceEvents"] if event["ph"] == "X")
+        _LOGGER.info("Wrote %d trace events to %s", events, filename)
+        return {"path": filename, "events": events}
+
+    async def async_export_history(call: ServiceCall) -> ServiceResponse:
+        """Stream a time range of the history store to a CSV file."""
+        if (store := hass.data.get(DATA_HISTORY)) is None:
+            raise HomeAssistantError("No Pace BMS entry records history")
+        tier = call.data[ATTR_TIER]
+        if filename := call.data.get(ATTR_FILENAME):
+            await _async_check_path(hass, filename)
+        else:
+            filename = hass.config.path(
+                f"pace_bms_history_{tier}_{time.strftime('%Y%m%d_%H%M%S')}.csv"
+            )
+        start = call.data.get(ATTR_START)
+        end = call.data.get(ATTR_END)
+        rows = await store.async_export(
+            filename,
+            tier,
+            call.data.get(ATTR_ENTRY_ID),
+            None if start is None else dt_util.as_timestamp(start),
+            None if end is None else dt_util.as_timestamp(end),
+            call.data.get(ATTR_KEYS),
+        )
+        _LOGGER.info("Wrote %d history rows to %s", rows, filename)
+        return {"path": filename, "rows": rows}
+
+    async def async_sync_parameters_service(call: ServiceCall) -> ServiceResponse:
+        """Bring the protection parameters of packs to a profile or reference pack."""
+        coordinators = {
+            entry_id: coordinator
+            for entry_id, coordinator in hass.data.get(DOMAIN, {}).items()
+            if coordinator.register_access
+        }
+        if ATTR_REFERENCE in call.data:
+            reference = call.data[ATTR_REFERENCE]
+            if reference not in coordinators:
+                raise HomeAssistantError(f"No Pace BMS pack with register access: {reference}")
+            target = await async_read_reference(coordinators.pop(reference))
+        elif ATTR_PROFILE in call.data:
+            target = profile_registers(await async_load_profile(hass, call.data[ATTR_PROFILE]))
+        else:
+            target = profile_registers(call.data[ATTR_PARAMETERS])
+
+        targets = call.data.get(ATTR_ENTRY_ID)
+        if targets is not None:
+            if missing := [entry_id for entry_id in targets if entry_id not in coordinators]:
+                raise HomeAssistantError(f"No Pace BMS pack with register access: {missing}")
+            coordinators = {entry_id: coordinators[entry_id] for entry_id in targets}
+        packs = await async_sync_parameters(
+            list(coordinators.values()), target, call.data[ATTR_DRY_RUN]
+        )
+        return {"profile": registers_profile(target), "packs": packs}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_TRACE,
+        async_export_trace,
+        schema=EXPORT_TRACE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_HISTORY,
+        async_export_history,
+        schema=EXPORT_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SYNC_PARAMETERS,
+        async_sync_parameters_service,
+        schema=SYNC_PARAMETERS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
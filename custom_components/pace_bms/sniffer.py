@@ -0,0 +1,147 @@
+"""Passive decoding of Modbus RTU traffic from another master on the bus."""
+import struct
+import time
+from collections.abc import Callable
+
+from .framing import (
+    FUNC_READ_HOLDING_REGISTERS,
+    FUNC_WRITE_MULTIPLE_REGISTERS,
+    crc16,
+)
+
+# Holding registers 0-255 cover the whole Pace register map
+REGISTER_IMAGE_SIZE = 256
+
+# Minimum bytes before any RTU frame can be classified
+_MIN_FRAME = 5
+
+
+def _crc_ok(buffer: bytearray, length: int) -> bool:
+    """Return True if the first length bytes end in a valid CRC."""
+    return crc16(memoryview(buffer)[: length - 2]) == (
+        buffer[length - 2] | buffer[length - 1] << 8
+    )
+
+
+class RegisterImage:
+    """Latest value and capture time of every holding register of one slave."""
+
+    def __init__(self, size: int = REGISTER_IMAGE_SIZE) -> None:
+        """Initialize."""
+        self.values = [0] * size
+        # Monotonic capture time per register; 0.0 means never seen
+        self.stamps = [0.0] * size
+
+    def update(self, address: int, values: tuple[int, ...] | list[int], now: float) -> None:
+        """Store values read or written starting at address."""
+        end = min(address + len(values), len(self.values))
+        if address >= end:
+            return
+        self.values[address:end] = values[: end - address]
+        self.stamps[address:end] = [now] * (end - address)
+
+    def get(self, address: int, count: int, max_age: float) -> list[int] | None:
+        """Return a block if every register in it is younger than max_age."""
+        end = address + count
+        if end > len(self.values):
+            return None
+        oldest = min(self.stamps[address:end])
+        if not oldest or time.monotonic() - oldest > max_age:
+            return None
+        return self.values[address:end]
+
+
+class RtuStreamParser:
+    """Split a captured RTU byte stream into paired requests and responses.
+
+    RTU frames carry no length prefix, so frames are recognised by content:
+    a reply is expected for the last request seen, and every candidate frame
+    must carry a valid CRC before it is accepted. Bytes that fit nothing are
+    dropped one at a time until the stream resynchronises.
+    """
+
+    def __init__(
+        self,
+        on_registers: Callable[[int, int, tuple[int, ...]], None],
+        on_exception: Callable[[int, int, int], None],
+    ) -> None:
+        """Initialize."""
+        self._on_registers = on_registers
+        self._on_exception = on_exception
+        self._buffer = bytearray()
+        # (slave, function, address, count, written values) awaiting a reply
+        self.pending: tuple[int, int, int, int, tuple[int, ...]] | None = None
+
+    def expect(
+        self,
+        slave_id: int,
+        function: int,
+        address: int,
+        count: int,
+        values: tuple[int, ...] = (),
+    ) -> None:
+        """Register a request sent by us, in case the adapter does not echo it."""
+        self.pending = (slave_id, function, address, count, values)
+
+    def feed(self, data: bytes) -> None:
+        """Consume received bytes."""
+        self._buffer += data
+        while len(self._buffer) >= _MIN_FRAME and self._parse_one():
+            pass
+
+    def _parse_one(self) -> bool:
+        """Consume one frame or one stray byte; return False if more data is needed."""
+        buffer = self._buffer
+        slave_id, function = buffer[0], buffer[1]
+
+        pending = self.pending
+        if pending is not None and slave_id == pending[0]:
+            if function == pending[1] | 0x80:
+                if _crc_ok(buffer, 5):
+                    self.pending = None
+                    self._on_exception(slave_id, pending[1], buffer[2])
+                    del buffer[:5]
+                    return True
+            elif function == pending[1]:
+                if function == FUNC_READ_HOLDING_REGISTERS:
+                    length = 5 + 2 * pending[3]
+                else:
+                    length = 8
+                if len(buffer) >= length and _crc_ok(buffer, length):
+                    self.pending = None
+                    if function == FUNC_READ_HOLDING_REGISTERS:
+                        values = struct.unpack_from(f">{pending[3]}H", buffer, 3)
+                    else:
+                        values = pending[4]
+                    self._on_registers(slave_id, pending[2], values)
+                    del buffer[:length]
+                    return True
+
+        if function == FUNC_READ_HOLDING_REGISTERS:
+            if len(buffer) < 8:
+                return False
+            if _crc_ok(buffer, 8):
+                address, count = struct.unpack_from(">HH", buffer, 2)
+                self.pending = (slave_id, function, address, count, ())
+                del buffer[:8]
+                return True
+        elif function == FUNC_WRITE_MULTIPLE_REGISTERS:
+            if len(buffer) < 7:
+                return False
+            length = 9 + buffer[6]
+            if len(buffer) < length:
+                return False
+            if _crc_ok(buffer, length):
+                address, count = struct.unpack_from(">HH", buffer, 2)
+                values = struct.unpack_from(f">{count}H", buffer, 7)
+                self.pending = (slave_id, function, address, count, values)
+                del buffer[:length]
+                return True
+
+        if pending is not None and slave_id == pending[0] and function == pending[1]:
+            # Possibly a reply still arriving
+            if function == FUNC_READ_HOLDING_REGISTERS and len(buffer) < 5 + 2 * pending[3]:
+                return False
+
+        del buffer[0]
+        return True
@@ -0,0 +1,181 @@
+"""Per-slave bus transaction statistics for Pace BMS.
+
+All counters are preallocated: recording a transaction is a handful of
+integer additions and one bisect into a fixed latency histogram.
+"""
+import time
+from bisect import bisect_left
+from typing import Any
+
+from pymodbus.exceptions import ConnectionException
+
+from .framing import ModbusCrcError, ModbusDeviceError
+
+# Upper bounds of the latency histogram buckets in seconds; one more bucket
+# collects everything slower
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0
+)
+
+# RTU-equivalent frame sizes used for the byte counters, whatever the transport
+READ_REQUEST_BYTES = 8
+EXCEPTION_REPLY_BYTES = 5
+WRITE_REPLY_BYTES = 8
+
+ERROR_TIMEOUT = "timeout"
+ERROR_CRC = "crc"
+ERROR_EXCEPTION = "exception"
+ERROR_CONNECTION = "connection"
+
+
+def read_reply_bytes(count: int) -> int:
+    """Return the size of a read reply carrying count registers."""
+    return 5 + 2 * count
+
+
+def write_request_bytes(count: int) -> int:
+    """Return the size of a write request carrying count registers."""
+    return 9 + 2 * count
+
+
+def error_kind(err: Exception) -> str:
+    """Classify a failed transaction."""
+    if isinstance(err, ModbusDeviceError):
+        return ERROR_EXCEPTION
+    if isinstance(err, ModbusCrcError):
+        return ERROR_CRC
+    if isinstance(err, ConnectionException):
+        return ERROR_CONNECTION
+    return ERROR_TIMEOUT
+
+
+class TransactionStats:
+    """Counters and latency histogram for one register block or a whole slave."""
+
+    __slots__ = (
+        "transactions",
+        "errors",
+        "bytes_out",
+        "bytes_in",
+        "busy_time",
+        "latency_max",
+        "buckets",
+    )
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.transactions = 0
+        self.errors = {
+            ERROR_TIMEOUT: 0,
+            ERROR_CRC: 0,
+            ERROR_EXCEPTION: 0,
+            ERROR_CONNECTION: 0,
+        }
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.busy_time = 0.0
+        self.latency_max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(
+        self, latency: float, bytes_out: int, bytes_in: int, error: str | None = None
+    ) -> None:
+        """Count one transaction."""
+        self.transactions += 1
+        self.bytes_out += bytes_out
+        self.bytes_in += bytes_in
+        self.busy_time += latency
+        self.buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+        if latency > self.latency_max:
+            self.latency_max = latency
+        if error is not None:
+            self.errors[error] += 1
+
+    @property
+    def latency_mean(self) -> float | None:
+        """Return the mean transaction time in seconds."""
+        if not self.transactions:
+            return None
+        return self.busy_time / self.transactions
+
+    def latency_percentile(self, fraction: float) -> float | None:
+        """Return the histogram bucket bound the given share of transactions fall under."""
+        if not self.transactions:
+            return None
+        target = fraction * self.transactions
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                if index < len(LATENCY_BUCKETS):
+                    return min(LATENCY_BUCKETS[index], self.latency_max)
+                break
+        return self.latency_max
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters as a plain dict."""
+        bounds = [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+        return {
+            "transactions": self.transactions,
+            "errors": dict(self.errors),
+            "bytes_out": self.bytes_out,
+            "bytes_in": self.bytes_in,
+            "busy_time": round(self.busy_time, 6),
+            "latency_mean": self.latency_mean,
+            "latency_p95": self.latency_percentile(0.95),
+            "latency_max": self.latency_max,
+            "latency_histogram": dict(zip(bounds, self.buckets)),
+        }
+
+
+class SlaveStats:
+    """Transaction statistics of one slave, in total and per register block."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.total = TransactionStats()
+        self.blocks: dict[str, TransactionStats] = {}
+        self.reconnects = 0
+        # Polls issued while the previous poll of this slave had failed
+        self.retries = 0
+        # Poll slots skipped because an earlier poll ran past them
+        self.missed_polls = 0
+        # Share of wall time the bus was busy over the last poll interval
+        self.bus_utilization: float | None = None
+        self._window_start = time.monotonic()
+        self._window_busy: float | None = None
+
+    def record(
+        self,
+        block: str,
+        latency: float,
+        bytes_out: int,
+        bytes_in: int,
+        error: str | None = None,
+    ) -> None:
+        """Count one transaction on a register block."""
+        stats = self.blocks.get(block)
+        if stats is None:
+            stats = self.blocks[block] = TransactionStats()
+        stats.record(latency, bytes_out, bytes_in, error)
+        self.total.record(latency, bytes_out, bytes_in, error)
+
+    def update_bus_utilization(self, bus_busy_time: float) -> None:
+        """Update utilization from the link's cumulative busy time."""
+        now = time.monotonic()
+        if self._window_busy is not None and now > self._window_start:
+            busy = bus_busy_time - self._window_busy
+            self.bus_utilization = min(100.0, 100 * busy / (now - self._window_start))
+        self._window_start = now
+        self._window_busy = bus_busy_time
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return all statistics as a plain dict."""
+        return {
+            **self.total.as_dict(),
+            "reconnects": self.reconnects,
+            "retries": self.retries,
+            "missed_polls": self.missed_polls,
+            "bus_utilization": self.bus_utilization,
+            "blocks": {block: stats.as_dict() for block, stats in self.blocks.items()},
+        }
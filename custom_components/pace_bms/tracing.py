@@ -0,0 +1,128 @@
+"""Opt-in per-phase tracing of poll cycles.
+
+Spans go to a bounded in-memory ring buffer and can be exported as Chrome
+trace event JSON (chrome://tracing, Perfetto). While no config entry has
+tracing enabled, ``span()`` hands back one shared no-op context manager, so
+instrumented code pays a single attribute check.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from .const import TRACE_BUFFER_EVENTS
+
+
+class _NullSpan:
+    """Span used while tracing is off."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """A timed phase, appended to the buffer when it ends."""
+
+    __slots__ = ("_tracer", "_name", "_track", "_args", "_start")
+
+    def __init__(self, tracer: "Tracer", name: str, track: str, args: Any) -> None:
+        self._tracer = tracer
+        self._name = name
+        self._track = track
+        self._args = args
+
+    def __enter__(self) -> "_Span":
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        end = time.perf_counter_ns()
+        failed = exc_info[0] is not None
+        self._tracer.events.append(
+            (self._name, self._track, self._start, end - self._start, self._args, failed)
+        )
+
+
+def _format_args(args: Any) -> dict[str, Any]:
+    """Turn the raw span argument into trace event args, at export time only."""
+    if args is None:
+        return {}
+    if isinstance(args, list) and args and isinstance(args[0], tuple):
+        # Register blocks as (address, count)
+        return {"blocks": ", ".join(f"{a}-{a + c - 1}" for a, c in args)}
+    if isinstance(args, dict):
+        # The export adds fields; the buffered span keeps its own dict
+        return dict(args)
+    return {"detail": str(args)}
+
+
+class Tracer:
+    """Ring buffer of poll-cycle spans shared by all config entries."""
+
+    def __init__(self, size: int = TRACE_BUFFER_EVENTS) -> None:
+        """Initialize."""
+        self.enabled = False
+        self._entries: set[str] = set()
+        # (name, track, start ns, duration ns, args, failed)
+        self.events: deque[tuple[str, str, int, int, Any, bool]] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def enable(self, entry_id: str) -> None:
+        """Start tracing on behalf of a config entry."""
+        with self._lock:
+            self._entries.add(entry_id)
+            self.enabled = True
+
+    def disable(self, entry_id: str) -> None:
+        """Stop tracing for a config entry; tracing ends when none remain."""
+        with self._lock:
+            self._entries.discard(entry_id)
+            self.enabled = bool(self._entries)
+
+    def span(self, name: str, track: str, args: Any = None) -> _Span | _NullSpan:
+        """Return a context manager timing one phase on a track."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, track, args)
+
+    def export(self) -> dict[str, Any]:
+        """Return the buffered spans as a Chrome trace event document."""
+        events = list(self.events)
+        tracks: dict[str, int] = {}
+        trace_events: list[dict[str, Any]] = []
+        for name, track, start, duration, args, failed in events:
+            tid = tracks.setdefault(track, len(tracks) + 1)
+            event_args = _format_args(args)
+            if failed:
+                event_args["error"] = True
+            trace_events.append(
+                {
+                    "name": name,
+                    "cat": "pace_bms",
+                    "ph": "X",
+                    "ts": start / 1000,
+                    "dur": duration / 1000,
+                    "pid": 1,
+                    "tid": tid,
+                    "args": event_args,
+                }
+            )
+        for track, tid in tracks.items():
+            trace_events.append(
+                {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": track}}
+            )
+        trace_events.append(
+            {"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "Pace BMS"}}
+        )
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+
+TRACER = Tracer()
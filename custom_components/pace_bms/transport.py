@@ -0,0 +1,1237 @@
+"""Bus transports for Pace BMS.
+
+A transport is one physical or network link to the bus. Every config entry
+that talks to a slave behind the same serial port or gateway shares a single
+pooled transport, so slaves on one RS485 bus never open the port twice.
+"""
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from typing import Any
+
+import serial
+from pymodbus.client import ModbusSerialClient
+from pymodbus.exceptions import ConnectionException, ModbusException, ModbusIOException
+
+from .const import (
+    AUTO_BAUDRATE_ORDER,
+    BAUDRATE_AUTO,
+    CONF_BAUDRATE,
+    CONF_CAPTURE_FILE,
+    CONF_GROUP_READ,
+    CONF_HOST,
+    CONF_LEAN_RTU,
+    CONF_LOW_LATENCY,
+    CONF_PASSIVE,
+    CONF_PIPELINE,
+    CONF_PORT,
+    CONF_REPLAY_FILE,
+    CONF_REPLAY_SPEED,
+    CONF_SCAN_INTERVAL,
+    CONF_TCP_PORT,
+    CONF_TRANSPORT,
+    CONF_WORKER_PROCESS,
+    DEFAULT_GROUP_READ,
+    DEFAULT_LEAN_RTU,
+    DEFAULT_LOW_LATENCY,
+    DEFAULT_PASSIVE,
+    DEFAULT_PIPELINE,
+    DEFAULT_REPLAY_SPEED,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_TCP_PORT,
+    DEFAULT_WORKER_PROCESS,
+    LATENCY_PROBE_READS,
+    MODBUS_BYTESIZE,
+    MODBUS_CHAR_BITS,
+    MODBUS_PARITY,
+    MODBUS_STOPBITS,
+    MODBUS_TCP_TIMEOUT,
+    MODBUS_TIMEOUT,
+    PACE_ASCII_MAX_PACKS,
+    PACE_ASCII_PACK_CHARS,
+    PACE_ASCII_TIMEOUT,
+    PROBE_TURNAROUND,
+    REG_BASIC_DATA_START,
+    SERIAL_LINK_DIRS,
+    SNIFFER_IDLE_GAP,
+    SNIFFER_IDLE_TIMEOUT,
+    SNIFFER_READ_TIMEOUT,
+    TRANSPORT_LINGER,
+    TRANSPORT_PACE_ASCII,
+    TRANSPORT_REPLAY,
+    TRANSPORT_RTU_OVER_TCP,
+    TRANSPORT_SERIAL,
+    TRANSPORT_TCP,
+)
+from .capture import BusCapture, read_transactions
+from .executor import BusExecutor
+from .latency import LatencyTuner
+from .framing import (
+    FUNC_READ_HOLDING_REGISTERS,
+    FUNC_WRITE_MULTIPLE_REGISTERS,
+    ModbusDeviceError,
+    check_rtu_frame,
+    check_write_response,
+    decode_read_response,
+    read_request_pdu,
+    rtu_frame,
+    rtu_response_length,
+    write_request_pdu,
+)
+from .pace_protocol import (
+    ADDRESS_ALL_PACKS,
+    CID2_ANALOG,
+    EOI,
+    decode_analog_info,
+    decode_response,
+    encode_command,
+)
+from .rtu import RtuEngine
+from .scheduler import BusScheduler
+from .sniffer import RegisterImage, RtuStreamParser
+
+_LOGGER = logging.getLogger(__name__)
+
+_POOL: dict[str, "PaceBMSTransport"] = {}
+_POOL_LOCK = threading.Lock()
+
+
+def stable_port(port: str) -> str:
+    """Return a udev link that follows the device now at a serial port, or the port.
+
+    A USB adapter that re-enumerates comes back under another /dev/ttyUSBn,
+    while its /dev/serial/by-id (or by-path) link is moved along with it.
+    """
+    if port.startswith("/dev/serial/") or not os.path.exists(port):
+        return port
+    target = os.path.realpath(port)
+    for directory in SERIAL_LINK_DIRS:
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            continue
+        for name in names:
+            link = os.path.join(directory, name)
+            if os.path.realpath(link) == target:
+                return link
+    return port
+
+
+class PaceBMSTransport:
+    """Base class for a bus link shared by every slave behind it."""
+
+    def __init__(self, key: str) -> None:
+        """Initialize."""
+        self.key = key
+        # Serializes transactions from coordinators sharing this link
+        self.lock = threading.RLock()
+        self.users = 0
+        # Settings the link was created with, beyond those in its key
+        self.settings: tuple = ()
+        # Pending shutdown of an unused link, cancelled if an entry reuses it
+        self.linger: threading.Timer | None = None
+        # Records every transaction on this link when bus capture is enabled
+        self.capture: BusCapture | None = None
+        # Cumulative time spent in transactions, for bus utilization
+        self.busy_time = 0.0
+        # Every blocking call on this link runs on its own thread
+        self.executor = BusExecutor(key)
+        # Poll slots of the packs on this link
+        self.scheduler = BusScheduler(key)
+
+    def connect(self) -> None:
+        """Open the link if it is not open already."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Close the link; the next transaction reopens it."""
+        raise NotImplementedError
+
+    def is_connected(self) -> bool:
+        """Return True if the link is open."""
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        """Release the link for good once no entry uses it."""
+        self.close()
+
+    def read_holding_registers(
+        self, slave_id: int, address: int, count: int
+    ) -> list[int]:
+        """Read a block of holding registers from a slave."""
+        raise NotImplementedError
+
+    def read_blocks(
+        self, slave_id: int, blocks: list[tuple[int, int]]
+    ) -> list[list[int]]:
+        """Read several (address, count) blocks from a slave."""
+        with self.lock:
+            return [
+                self.read_holding_registers(slave_id, address, count)
+                for address, count in blocks
+            ]
+
+    def write_registers(self, slave_id: int, address: int, values: list[int]) -> None:
+        """Write holding registers using 0x10 (write multiple registers)."""
+        raise NotImplementedError
+
+
+class SerialTransport(PaceBMSTransport):
+    """Modbus RTU over a local serial port."""
+
+    def __init__(self, key: str, port: str, baudrate: int) -> None:
+        """Initialize."""
+        super().__init__(key)
+        self.port = port
+        # Path opened: a udev link following the device once one is found
+        self.path = port
+        # Device node the open port belongs to
+        self._node: str | None = None
+        # Set when the device node was gone at the last attempt to open it
+        self.device_missing = False
+        # Baud rate in use; None until auto-detection has locked onto one
+        self.baudrate: int | None = None if baudrate == BAUDRATE_AUTO else baudrate
+        self.auto_baudrate = baudrate == BAUDRATE_AUTO
+        self._last_baudrate: int | None = None
+        # Adapter latency settings, applied once the port is open
+        self.low_latency = False
+        self.latency: LatencyTuner | None = None
+        self.latency_report: dict[str, Any] | None = None
+        self.client: ModbusSerialClient | None = None
+
+    def _resolve_path(self) -> None:
+        """Switch to a udev link for the port, and note which device it is now."""
+        if self.path == self.port:
+            self.path = stable_port(self.port)
+            if self.path != self.port:
+                _LOGGER.info("Opening %s through %s", self.port, self.path)
+        self.device_missing = not os.path.exists(self.path)
+        self._node = os.path.realpath(self.path)
+
+    def device_present(self) -> bool:
+        """Return True if the device node of the port exists."""
+        return os.path.exists(self.path)
+
+    def watch_device(self) -> None:
+        """Close the port if its device went away or now belongs to another node.
+
+        Transactions on a vanished adapter only time out, so this turns
+        every poll after an unplug into a fast failure until it is back.
+        """
+        if self._node is None or not self.is_connected():
+            return
+        self.device_missing = not os.path.exists(self.path)
+        if self.device_missing or os.path.realpath(self.path) != self._node:
+            _LOGGER.warning("Serial device %s went away, closing the port", self.path)
+            self.close()
+
+    def tune_latency(self, slave_id: int) -> None:
+        """Apply the low-latency settings to the open port.
+
+        The first time, round trips to the slave are timed before and after.
+        Later calls only reapply them, as a re-enumerated adapter loses them.
+        """
+        with self.lock:
+            if self.latency is not None:
+                self.latency.apply()
+                return
+            self.latency = LatencyTuner(self.path)
+            before = self._time_round_trips(slave_id)
+            applied = self.latency.apply()
+            after = self._time_round_trips(slave_id)
+            self.latency_report = {
+                "applied": applied,
+                "round_trip_before_ms": before,
+                "round_trip_after_ms": after,
+            }
+            _LOGGER.info(
+                "Low latency mode on %s: applied %s, round trip %s ms before and %s ms after",
+                self.path,
+                applied or "nothing",
+                before,
+                after,
+            )
+
+    def _time_round_trips(self, slave_id: int) -> float | None:
+        """Return the median round trip to a slave in ms, or None if it failed."""
+        times = []
+        try:
+            for _ in range(LATENCY_PROBE_READS):
+                started = time.perf_counter()
+                self._round_trip(slave_id)
+                times.append(time.perf_counter() - started)
+        except ModbusException as err:
+            _LOGGER.debug("Timing round trips on %s failed: %s", self.path, err)
+            return None
+        return round(sorted(times)[len(times) // 2] * 1000, 2)
+
+    def _round_trip(self, slave_id: int) -> None:
+        """Exchange one short request and reply with a slave."""
+        self.read_holding_registers(slave_id, REG_BASIC_DATA_START, 1)
+
+    def shutdown(self) -> None:
+        """Close the port for good, restoring the adapter latency settings."""
+        with self.lock:
+            if self.latency is not None:
+                self.latency.restore()
+                self.latency = None
+            self.close()
+
+    def _new_client(self, baudrate: int, timeout: float, **kwargs: Any) -> ModbusSerialClient:
+        """Create a serial client for this port."""
+        self._resolve_path()
+        return ModbusSerialClient(
+            port=self.path,
+            baudrate=baudrate,
+            bytesize=MODBUS_BYTESIZE,
+            parity=MODBUS_PARITY,
+            stopbits=MODBUS_STOPBITS,
+            timeout=timeout,
+            **kwargs,
+        )
+
+    def _open_port(self, baudrate: int, timeout: float) -> serial.Serial:
+        """Open the serial port directly, bypassing pymodbus."""
+        self._resolve_path()
+        try:
+            return serial.Serial(
+                port=self.path,
+                baudrate=baudrate,
+                bytesize=MODBUS_BYTESIZE,
+                parity=MODBUS_PARITY,
+                stopbits=MODBUS_STOPBITS,
+                timeout=timeout,
+            )
+        except serial.SerialException as err:
+            raise ConnectionException(f"Failed to open {self.port}: {err}") from err
+
+    @staticmethod
+    def _probe_timeout(baudrate: int) -> float:
+        """Return a probe timeout scaled to the time a frame takes at a baud rate."""
+        # 8-byte request + 7-byte response for a single register, with margin
+        frame_time = 15 * MODBUS_CHAR_BITS / baudrate
+        return PROBE_TURNAROUND + 3 * frame_time
+
+    def detect_baudrate(self, slave_id: int) -> int:
+        """Probe the candidate baud rates and lock onto the first that answers."""
+        with self.lock:
+            self.close()
+            candidates = list(AUTO_BAUDRATE_ORDER)
+            # Try the last known good rate first
+            if self._last_baudrate in candidates:
+                candidates.remove(self._last_baudrate)
+                candidates.insert(0, self._last_baudrate)
+
+            for baudrate in candidates:
+                _LOGGER.debug("Probing BMS at %s with baudrate=%s", self.port, baudrate)
+                if self._probe(baudrate, slave_id):
+                    _LOGGER.info("Detected BMS baud rate %d on %s", baudrate, self.port)
+                    self.baudrate = self._last_baudrate = baudrate
+                    return baudrate
+
+            raise ConnectionException(
+                f"No BMS with slave ID {slave_id} answered on {self.port} "
+                f"at any supported baud rate"
+            )
+
+    def _probe(self, baudrate: int, slave_id: int) -> bool:
+        """Return True if the slave answers a single-register read at a baud rate."""
+        probe = self._new_client(baudrate, self._probe_timeout(baudrate), retries=0)
+        try:
+            if not probe.connect():
+                raise ConnectionException(
+                    f"Failed to open {self.port} for baud rate detection"
+                )
+            result = probe.read_holding_registers(
+                address=REG_BASIC_DATA_START,
+                count=1,
+                device_id=slave_id,
+            )
+            return not result.isError()
+        except ConnectionException:
+            raise
+        except ModbusException as err:
+            _LOGGER.debug("No response at %d baud: %s", baudrate, err)
+            return False
+        finally:
+            probe.close()
+
+    def connect(self) -> None:
+        """Open the serial port if it is not open already."""
+        with self.lock:
+            # Close existing connection if it's in a bad state
+            if self.client is not None:
+                if self.client.is_socket_open():
+                    return
+                self.close()
+
+            if self.baudrate is None:
+                raise ConnectionException(f"Baud rate for {self.port} not detected yet")
+            _LOGGER.debug(
+                "Connecting to BMS at %s (baudrate=%s)", self.port, self.baudrate
+            )
+            self.client = self._new_client(self.baudrate, MODBUS_TIMEOUT)
+            if not self.client.connect():
+                self.client = None
+                raise ConnectionException(
+                    f"Failed to connect to BMS at {self.port}. "
+                    f"Check that the device is connected and not in use by another application."
+                )
+            _LOGGER.info("Successfully connected to BMS at %s", self.port)
+
+    def close(self) -> None:
+        """Close the serial port."""
+        with self.lock:
+            if self.client is not None:
+                try:
+                    self.client.close()
+                    _LOGGER.debug("Disconnected from BMS at %s", self.port)
+                except Exception as err:
+                    _LOGGER.debug("Error disconnecting: %s", err)
+                finally:
+                    self.client = None
+
+    def is_connected(self) -> bool:
+        """Return True if the serial port is open."""
+        return self.client is not None and self.client.is_socket_open()
+
+    def read_holding_registers(
+        self, slave_id: int, address: int, count: int
+    ) -> list[int]:
+        """Read a block of holding registers from a slave."""
+        with self.lock:
+            self.connect()
+            result = self.client.read_holding_registers(
+                address=address,
+                count=count,
+                device_id=slave_id,
+            )
+            if result.isError():
+                raise ModbusDeviceError(
+                    f"Error reading address {address}: {result}",
+                    getattr(result, "exception_code", None),
+                )
+            return result.registers
+
+    def write_registers(self, slave_id: int, address: int, values: list[int]) -> None:
+        """Write holding registers using 0x10 (write multiple registers)."""
+        with self.lock:
+            self.connect()
+            result = self.client.write_registers(
+                address=address,
+                values=values,
+                device_id=slave_id,
+            )
+            if result.isError():
+                raise ModbusDeviceError(
+                    f"Error writing address {address}: {result}",
+                    getattr(result, "exception_code", None),
+                )
+
+
+class RtuSerialTransport(SerialTransport):
+    """Modbus RTU over a local serial port using the built-in lean engine."""
+
+    def __init__(self, key: str, port: str, baudrate: int) -> None:
+        """Initialize."""
+        super().__init__(key, port, baudrate)
+        self._serial: serial.Serial | None = None
+        self._engine: RtuEngine | None = None
+
+    def _probe(self, baudrate: int, slave_id: int) -> bool:
+        """Return True if the slave answers a single-register read at a baud rate."""
+        port = self._open_port(baudrate, MODBUS_TIMEOUT)
+        try:
+            RtuEngine(port, baudrate, turnaround=PROBE_TURNAROUND).read(
+                slave_id, REG_BASIC_DATA_START, 1
+            )
+            return True
+        except ModbusException as err:
+            _LOGGER.debug("No response at %d baud: %s", baudrate, err)
+            return False
+        finally:
+            port.close()
+
+    def connect(self) -> None:
+        """Open the serial port if it is not open already."""
+        with self.lock:
+            if self._serial is not None:
+                return
+            if self.baudrate is None:
+                raise ConnectionException(f"Baud rate for {self.port} not detected yet")
+            _LOGGER.debug(
+                "Connecting to BMS at %s (baudrate=%s, built-in RTU engine)",
+                self.port,
+                self.baudrate,
+            )
+            self._serial = self._open_port(self.baudrate, MODBUS_TIMEOUT)
+            self._engine = RtuEngine(self._serial, self.baudrate)
+            _LOGGER.info("Successfully connected to BMS at %s", self.port)
+
+    def close(self) -> None:
+        """Close the serial port."""
+        with self.lock:
+            if self._serial is not None:
+                try:
+                    self._serial.close()
+                    _LOGGER.debug("Disconnected from BMS at %s", self.port)
+                except serial.SerialException as err:
+                    _LOGGER.debug("Error disconnecting: %s", err)
+                finally:
+                    self._serial = None
+                    self._engine = None
+
+    def is_connected(self) -> bool:
+        """Return True if the serial port is open."""
+        return self._serial is not None
+
+    def read_holding_registers(
+        self, slave_id: int, address: int, count: int
+    ) -> tuple[int, ...]:
+        """Read a block of holding registers from a slave."""
+        with self.lock:
+            self.connect()
+            try:
+                return self._engine.read(slave_id, address, count)
+            except serial.SerialException as err:
+                self.close()
+                raise ConnectionException(f"Serial error on {self.port}: {err}") from err
+
+    def write_registers(self, slave_id: int, address: int, values: list[int]) -> None:
+        """Write holding registers using 0x10 (write multiple registers)."""
+        with self.lock:
+            self.connect()
+            try:
+                self._engine.write(slave_id, address, values)
+            except serial.SerialException as err:
+                self.close()
+                raise ConnectionException(f"Serial error on {self.port}: {err}") from err
+
+
+class SnifferTransport(RtuSerialTransport):
+    """Modbus RTU on a bus that already has a master, listening before polling.
+
+    A reader thread decodes every request/response pair on the wire into a
+    register image per slave. Blocks the other master has read recently are
+    served from the image; only blocks it never reads are polled, and then
+    only while the bus is idle.
+    """
+
+    def __init__(self, key: str, port: str, baudrate: int, max_age: float) -> None:
+        """Initialize."""
+        super().__init__(key, port, baudrate)
+        self.max_age = max_age
+        self.images: dict[int, RegisterImage] = {}
+        self.passive_reads = 0
+        self.active_reads = 0
+        self._bus = threading.Condition()
+        self._parser = RtuStreamParser(self._on_registers, self._on_exception)
+        self._reader: threading.Thread | None = None
+        self._running = False
+        self._last_rx = 0.0
+        self._outstanding: tuple[int, int, int] | None = None
+        self._result: Any = None
+
+    def connect(self) -> None:
+        """Open the serial port and start listening."""
+        with self.lock:
+            if self._serial is not None:
+                return
+            if self.baudrate is None:
+                raise ConnectionException(f"Baud rate for {self.port} not detected yet")
+            _LOGGER.debug(
+                "Listening on %s (baudrate=%s, passive mode)", self.port, self.baudrate
+            )
+            self._serial = self._open_port(self.baudrate, SNIFFER_READ_TIMEOUT)
+            self._running = True
+            self._reader = threading.Thread(
+                target=self._read_loop, name=f"pace_bms sniffer {self.port}", daemon=True
+            )
+            self._reader.start()
+            _LOGGER.info("Successfully connected to BMS at %s", self.port)
+
+    def close(self) -> None:
+        """Stop listening and close the serial port."""
+        with self.lock:
+            self._running = False
+            if self._reader is not None and self._reader is not threading.current_thread():
+                self._reader.join(SNIFFER_READ_TIMEOUT * 4)
+            self._reader = None
+            super().close()
+
+    def _read_loop(self) -> None:
+        """Feed everything on the wire to the parser until closed."""
+        port = self._serial
+        while self._running:
+            try:
+                data = port.read(port.in_waiting or 1)
+            except serial.SerialException as err:
+                _LOGGER.warning("Serial error while listening on %s: %s", self.port, err)
+                self._running = False
+                with self._bus:
+                    self._result = ConnectionException(f"Serial error on {self.port}: {err}")
+                    self._bus.notify_all()
+                break
+            if data:
+                with self._bus:
+                    self._last_rx = time.monotonic()
+                    self._parser.feed(data)
+
+    def _on_registers(self, slave_id: int, address: int, values: tuple[int, ...]) -> None:
+        """Store a decoded read reply or acknowledged write (reader thread)."""
+        image = self.images.get(slave_id)
+        if image is None:
+            image = self.images[slave_id] = RegisterImage()
+        image.update(address, values, time.monotonic())
+        if self._outstanding == (slave_id, address, len(values)):
+            self._result = values
+            self._bus.notify_all()
+
+    def _on_exception(self, slave_id: int, function: int, code: int) -> None:
+        """Hand an exception reply to the waiting request (reader thread)."""
+        if self._outstanding is not None and self._outstanding[0] == slave_id:
+            self._result = ModbusDeviceError(f"Exception response, code {code}", code)
+            self._bus.notify_all()
+
+    def _wait_idle(self) -> None:
+        """Wait until no transaction is in flight and the line has gone quiet."""
+        deadline = time.monotonic() + SNIFFER_IDLE_TIMEOUT
+        while True:
+            now = time.monotonic()
+            quiet = now - self._last_rx
+            if self._parser.pending is None and quiet >= SNIFFER_IDLE_GAP:
+                return
+            if now >= deadline:
+                # The other master may have abandoned a request; take the bus
+                self._parser.pending = None
+                return
+            self._bus.wait(max(SNIFFER_IDLE_GAP - quiet, 0.001))
+
+    def _request(
+        self,
+        slave_id: int,
+        function: int,
+        address: int,
+        count: int,
+        frame: bytes,
+        values: tuple[int, ...] = (),
+    ) -> Any:
+        """Send our own request in a bus gap and wait for its decoded reply."""
+        self.connect()
+        with self._bus:
+            self._wait_idle()
+            self._outstanding = (slave_id, address, count)
+            self._result = None
+            self._parser.expect(slave_id, function, address, count, values)
+            try:
+                self._serial.write(frame)
+            except serial.SerialException as err:
+                self._outstanding = None
+                raise ConnectionException(f"Serial error on {self.port}: {err}") from err
+            reply_bytes = len(frame) + 5 + 2 * count
+            deadline = (
+                time.monotonic()
+                + MODBUS_TIMEOUT
+                + reply_bytes * MODBUS_CHAR_BITS / self.baudrate
+            )
+            try:
+                while self._result is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise ModbusIOException(
+                            f"No response from slave {slave_id} on {self.port}"
+                        )
+                    self._bus.wait(remaining)
+                if isinstance(self._result, Exception):
+                    raise self._result
+                return self._result
+            finally:
+                self._outstanding = None
+
+    def _round_trip(self, slave_id: int) -> None:
+        """Exchange one short request and reply with a slave, bypassing the image."""
+        address = REG_BASIC_DATA_START
+        self._request(
+            slave_id,
+            FUNC_READ_HOLDING_REGISTERS,
+            address,
+            1,
+            rtu_frame(slave_id, read_request_pdu(address, 1)),
+        )
+
+    def read_holding_registers(
+        self, slave_id: int, address: int, count: int
+    ) -> tuple[int, ...] | list[int]:
+        """Return a block from the passive image, polling only if it is stale."""
+        with self.lock:
+            self.connect()
+            with self._bus:
+                image = self.images.get(slave_id)
+                values = image.get(address, count, self.max_age) if image else None
+            if values is not None:
+                self.passive_reads += 1
+                return values
+            self.active_reads += 1
+            return self._request(
+                slave_id,
+                FUNC_READ_HOLDING_REGISTERS,
+                address,
+                count,
+                rtu_frame(slave_id, read_request_pdu(address, count)),
+            )
+
+    def write_registers(self, slave_id: int, address: int, values: list[int]) -> None:
+        """Write holding registers in a bus gap."""
+        with self.lock:
+            self._request(
+                slave_id,
+                FUNC_WRITE_MULTIPLE_REGISTERS,
+                address,
+                len(values),
+                rtu_frame(slave_id, write_request_pdu(address, values)),
+                tuple(values),
+            )
+
+
+class PaceAsciiTransport(SerialTransport):
+    """Pace native ASCII protocol over a local serial port.
+
+    One analog command returns a whole pack, and with group reads enabled one
+    reply covers every pack in the parallel group. Replies are cached per pack
+    address so the other coordinators on the bus can reuse them.
+    """
+
+    def __init__(self, key: str, port: str, baudrate: int, group_reads: bool) -> None:
+        """Initialize."""
+        super().__init__(key, port, baudrate)
+        self.group_reads = group_reads
+        # Packs answered by one group reply poll at the same moment
+        self.scheduler.stagger = not group_reads
+        self._serial: serial.Serial | None = None
+        self._cache: dict[int, tuple[float, dict[str, Any]]] = {}
+
+    @staticmethod
+    def _reply_timeout(baudrate: int, packs: int) -> float:
+        """Return a read timeout long enough for a reply covering some packs."""
+        return PACE_ASCII_TIMEOUT + packs * PACE_ASCII_PACK_CHARS * MODBUS_CHAR_BITS / baudrate
+
+    def _command(
+        self, port: serial.Serial, address: int, cid2: int, info: bytes, timeout: float
+    ) -> tuple[int, bytes]:
+        """Send one command and return the decoded (address, INFO) reply."""
+        port.reset_input_buffer()
+        port.write(encode_command(address, cid2, info))
+        port.timeout = timeout
+        reply = port.read_until(EOI)
+        if not reply.endswith(EOI):
+            raise ModbusIOException(f"No response from pack {address} on {self.port}")
+        return decode_response(reply)
+
+    def _probe(self, baudrate: int, slave_id: int) -> bool:
+        """Return True if the pack answers an analog command at a baud rate."""
+        port = self._open_port(baudrate, PACE_ASCII_TIMEOUT)
+        try:
+            self._command(
+                port, slave_id, CID2_ANALOG, bytes((slave_id,)),
+                self._reply_timeout(baudrate, 1),
+            )
+            return True
+        except ModbusException as err:
+            _LOGGER.debug("No response at %d baud: %s", baudrate, err)
+            return False
+        finally:
+            port.close()
+
+    def connect(self) -> None:
+        """Open the serial port if it is not open already."""
+        with self.lock:
+            if self._serial is not None:
+                return
+            if self.baudrate is None:
+                raise ConnectionException(f"Baud rate for {self.port} not detected yet")
+            _LOGGER.debug(
+                "Connecting to BMS at %s (baudrate=%s, Pace protocol)",
+                self.port,
+                self.baudrate,
+            )
+            self._serial = self._open_port(self.baudrate, PACE_ASCII_TIMEOUT)
+            _LOGGER.info("Successfully connected to BMS at %s", self.port)
+
+    def close(self) -> None:
+        """Close the serial port."""
+        with self.lock:
+            if self._serial is not None:
+                try:
+                    self._serial.close()
+                    _LOGGER.debug("Disconnected from BMS at %s", self.port)
+                except serial.SerialException as err:
+                    _LOGGER.debug("Error disconnecting: %s", err)
+                finally:
+                    self._serial = None
+
+    def is_connected(self) -> bool:
+        """Return True if the serial port is open."""
+        return self._serial is not None
+
+    def _round_trip(self, slave_id: int) -> None:
+        """Exchange one analog request and reply with a pack."""
+        self.connect()
+        self._command(
+            self._serial, slave_id, CID2_ANALOG, bytes((slave_id,)),
+            self._reply_timeout(self.baudrate, 1),
+        )
+
+    def read_holding_registers(
+        self, slave_id: int, address: int, count: int
+    ) -> list[int]:
+        """Register access is not part of the Pace ASCII protocol."""
+        raise ModbusIOException("Register reads are not available over the Pace protocol")
+
+    def write_registers(self, slave_id: int, address: int, values: list[int]) -> None:
+        """Register access is not part of the Pace ASCII protocol."""
+        raise ModbusIOException("Register writes are not available over the Pace protocol")
+
+    def _disable_group_reads(self, err: ModbusException) -> None:
+        """Read packs one by one from now on."""
+        _LOGGER.info(
+            "Group reads not supported on %s (%s), reading packs one by one",
+            self.port,
+            err,
+        )
+        self.group_reads = False
+        self.scheduler.stagger = True
+
+    def read_analog(self, address: int, max_age: float) -> dict[str, Any]:
+        """Return analog data for a pack, from a recent group reply if possible."""
+        with self.lock:
+            cached = self._cache.get(address)
+            if cached is not None and time.monotonic() - cached[0] < max_age:
+                return dict(cached[1])
+
+            self.connect()
+            packs: dict[int, dict[str, Any]] = {}
+            group_error: ModbusIOException | None = None
+            if self.group_reads:
+                try:
+                    _, info = self._command(
+                        self._serial, address, CID2_ANALOG, bytes((ADDRESS_ALL_PACKS,)),
+                        self._reply_timeout(self.baudrate, PACE_ASCII_MAX_PACKS),
+                    )
+                    packs = decode_analog_info(info)
+                except ModbusDeviceError as err:
+                    self._disable_group_reads(err)
+                except ModbusIOException as err:
+                    # Some firmware stays silent on the group address; that only
+                    # differs from a dead bus if the pack then answers on its own
+                    group_error = err
+
+            if address not in packs:
+                _, info = self._command(
+                    self._serial, address, CID2_ANALOG, bytes((address,)),
+                    self._reply_timeout(self.baudrate, 1),
+                )
+                single = decode_analog_info(info)
+                # Some firmware does not echo the pack address in single replies
+                if len(single) == 1:
+                    single = {address: next(iter(single.values()))}
+                packs.update(single)
+                if group_error is not None:
+                    self._disable_group_reads(group_error)
+
+            now = time.monotonic()
+            for pack_address, data in packs.items():
+                self._cache[pack_address] = (now, data)
+            if address not in packs:
+                raise ModbusIOException(f"Pack {address} missing from analog reply")
+            return dict(packs[address])
+
+
+class TcpTransport(PaceBMSTransport):
+    """Modbus TCP or RTU-over-TCP link to a serial-to-Ethernet gateway."""
+
+    def __init__(
+        self, key: str, host: str, port: int, rtu_framing: bool, pipelining: bool
+    ) -> None:
+        """Initialize."""
+        super().__init__(key)
+        self.host = host
+        self.port = port
+        self.rtu_framing = rtu_framing
+        # Only Modbus TCP carries transaction IDs to match pipelined replies
+        self.pipelining = pipelining and not rtu_framing
+        self._sock: socket.socket | None = None
+        self._transaction_id = 0
+
+    def connect(self) -> None:
+        """Open the TCP connection if it is not open already."""
+        with self.lock:
+            if self._sock is not None:
+                return
+            _LOGGER.debug("Connecting to gateway at %s:%s", self.host, self.port)
+            try:
+                sock = socket.create_connection(
+                    (self.host, self.port), timeout=MODBUS_TCP_TIMEOUT
+                )
+            except OSError as err:
+                raise ConnectionException(
+                    f"Failed to connect to gateway at {self.host}:{self.port}: {err}"
+                ) from err
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._sock = sock
+            _LOGGER.info("Successfully connected to gateway at %s:%s", self.host, self.port)
+
+    def close(self) -> None:
+        """Close the TCP connection."""
+        with self.lock:
+            if self._sock is not None:
+                try:
+                    self._sock.close()
+                    _LOGGER.debug("Disconnected from gateway at %s:%s", self.host, self.port)
+                except OSError as err:
+                    _LOGGER.debug("Error disconnecting: %s", err)
+                finally:
+                    self._sock = None
+
+    def is_connected(self) -> bool:
+        """Return True if the TCP connection is open."""
+        return self._sock is not None
+
+    def _send(self, data: bytes) -> None:
+        """Send a request, closing the connection on failure."""
+        try:
+            self._sock.sendall(data)
+        except OSError as err:
+            self.close()
+            raise ConnectionException(f"Send to {self.host}:{self.port} failed: {err}") from err
+
+    def _recv_exact(self, size: int) -> bytes:
+        """Receive exactly size bytes or raise."""
+        buffer = bytearray()
+        while len(buffer) < size:
+            try:
+                chunk = self._sock.recv(size - len(buffer))
+            except OSError as err:
+                self.close()
+                raise ModbusIOException(
+                    f"No response from {self.host}:{self.port}: {err}"
+                ) from err
+            if not chunk:
+                self.close()
+                raise ConnectionException(f"Gateway {self.host}:{self.port} closed the connection")
+            buffer += chunk
+        return bytes(buffer)
+
+    def _next_transaction_id(self) -> int:
+        """Return the next MBAP transaction ID."""
+        self._transaction_id = (self._transaction_id + 1) & 0xFFFF
+        return self._transaction_id
+
+    def _mbap_request(self, slave_id: int, pdu: bytes) -> tuple[int, bytes]:
+        """Wrap a PDU in an MBAP header, returning (transaction_id, frame)."""
+        transaction_id = self._next_transaction_id()
+        header = struct.pack(">HHHB", transaction_id, 0, len(pdu) + 1, slave_id)
+        return transaction_id, header + pdu
+
+    def _recv_mbap(self) -> tuple[int, bytes]:
+        """Receive one MBAP response, returning (transaction_id, pdu)."""
+        transaction_id, _, length, _ = struct.unpack(">HHHB", self._recv_exact(7))
+        return transaction_id, self._recv_exact(length - 1)
+
+    def _recv_rtu(self, slave_id: int) -> bytes:
+        """Receive one RTU response and return its PDU."""
+        header = self._recv_exact(3)
+        frame = header + self._recv_exact(rtu_response_length(header) - 3)
+        return check_rtu_frame(frame, slave_id)
+
+    def _transact(self, slave_id: int, pdu: bytes) -> bytes:
+        """Send one request and return the response PDU."""
+        self.connect()
+        if self.rtu_framing:
+            self._send(rtu_frame(slave_id, pdu))
+            return self._recv_rtu(slave_id)
+        transaction_id, frame = self._mbap_request(slave_id, pdu)
+        self._send(frame)
+        while True:
+            response_id, response = self._recv_mbap()
+            # Drop late replies to requests that already timed out
+            if response_id == transaction_id:
+                return response
+
+    def read_holding_registers(
+        self, slave_id: int, address: int, count: int
+    ) -> list[int]:
+        """Read a block of holding registers from a slave."""
+        with self.lock:
+            response = self._transact(slave_id, read_request_pdu(address, count))
+            return decode_read_response(response, count)
+
+    def read_blocks(
+        self, slave_id: int, blocks: list[tuple[int, int]]
+    ) -> list[list[int]]:
+        """Read several blocks, pipelining the requests when enabled."""
+        if not self.pipelining or len(blocks) < 2:
+            return super().read_blocks(slave_id, blocks)
+
+        with self.lock:
+            self.connect()
+            pending: dict[int, int] = {}
+            frames = []
+            for index, (address, count) in enumerate(blocks):
+                transaction_id, frame = self._mbap_request(
+                    slave_id, read_request_pdu(address, count)
+                )
+                pending[transaction_id] = index
+                frames.append(frame)
+            # All requests go out in one segment; the gateway queues them
+            self._send(b"".join(frames))
+
+            results: list[list[int] | None] = [None] * len(blocks)
+            while pending:
+                transaction_id, response = self._recv_mbap()
+                index = pending.pop(transaction_id, None)
+                if index is None:
+                    continue
+                results[index] = decode_read_response(response, blocks[index][1])
+            return results
+
+    def write_registers(self, slave_id: int, address: int, values: list[int]) -> None:
+        """Write holding registers using 0x10 (write multiple registers)."""
+        with self.lock:
+            response = self._transact(slave_id, write_request_pdu(address, values))
+            check_write_response(response, address, len(values))
+
+
+class ReplayTransport(PaceBMSTransport):
+    """Plays a bus capture back in place of a live link.
+
+    Each request is answered with the next captured reply to the identical
+    request frame, at the captured time scaled by the replay speed, so a
+    coordinator sees the same data, errors and timing as in the field.
+    """
+
+    def __init__(self, key: str, path: str, speed: float) -> None:
+        """Initialize."""
+        super().__init__(key)
+        self.path = path
+        self.speed = speed
+        self._replies: dict[bytes, deque[tuple[float, bytes | None]]] | None = None
+        self._start = 0.0
+        self._open = False
+
+    def connect(self) -> None:
+        """Load the capture on first use."""
+        with self.lock:
+            if self._replies is None:
+                replies: dict[bytes, deque[tuple[float, bytes | None]]] = {}
+                try:
+                    for _, request, answered, response in read_transactions(self.path):
+                        replies.setdefault(request, deque()).append((answered, response))
+                except (OSError, ValueError) as err:
+                    raise ConnectionException(
+                        f"Failed to load capture {self.path}: {err}"
+                    ) from err
+                self._replies = replies
+                self._start = time.monotonic()
+            self._open = True
+
+    def close(self) -> None:
+        """Mark the link closed; the replay position is kept."""
+        self._open = False
+
+    def is_connected(self) -> bool:
+        """Return True if the capture is loaded."""
+        return self._open
+
+    def _replay(self, request: bytes) -> bytes:
+        """Return the PDU of the next captured reply to a request frame."""
+        with self.lock:
+            self.connect()
+            replies = self._replies.get(request)
+            if not replies:
+                raise ConnectionException(
+                    f"Capture {self.path} has no further reply to {request.hex()}"
+                )
+            answered, response = replies.popleft()
+            if self.speed > 0:
+                delay = self._start + answered / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            if response is None:
+                raise ModbusIOException(f"No response from slave {request[0]} (captured)")
+            return check_rtu_frame(response, request[0])
+
+    def read_holding_registers(
+        self, slave_id: int, address: int, count: int
+    ) -> list[int]:
+        """Read a block of holding registers from the capture."""
+        pdu = self._replay(rtu_frame(slave_id, read_request_pdu(address, count)))
+        return decode_read_response(pdu, count)
+
+    def write_registers(self, slave_id: int, address: int, values: list[int]) -> None:
+        """Replay a captured write of holding registers."""
+        pdu = self._replay(rtu_frame(slave_id, write_request_pdu(address, values)))
+        check_write_response(pdu, address, len(values))
+
+
+def _use_worker(config: dict[str, Any]) -> bool:
+    """Return True if the link is polled by a worker process."""
+    return bool(config.get(CONF_WORKER_PROCESS, DEFAULT_WORKER_PROCESS)) and (
+        config.get(CONF_TRANSPORT, TRANSPORT_SERIAL) != TRANSPORT_PACE_ASCII
+    )
+
+
+def _transport_key(config: dict[str, Any]) -> str:
+    """Return the pool key for the link a config entry uses."""
+    if _use_worker(config):
+        return f"process:{_transport_key({**config, CONF_WORKER_PROCESS: False})}"
+    transport = config.get(CONF_TRANSPORT, TRANSPORT_SERIAL)
+    if transport in (TRANSPORT_SERIAL, TRANSPORT_PACE_ASCII):
+        return f"{transport}:{config[CONF_PORT]}"
+    if transport == TRANSPORT_REPLAY:
+        return f"{transport}:{config[CONF_REPLAY_FILE]}"
+    return f"{transport}:{config[CONF_HOST]}:{config.get(CONF_TCP_PORT, DEFAULT_TCP_PORT)}"
+
+
+def _create_transport(key: str, config: dict[str, Any]) -> PaceBMSTransport:
+    """Create a transport for a config entry."""
+    transport = config.get(CONF_TRANSPORT, TRANSPORT_SERIAL)
+    # Probing baud rates would transmit on a bus another master owns
+    if (
+        transport == TRANSPORT_SERIAL
+        and config.get(CONF_PASSIVE, DEFAULT_PASSIVE)
+        and config[CONF_BAUDRATE] == BAUDRATE_AUTO
+    ):
+        raise ConnectionException(
+            f"Passive mode on {config[CONF_PORT]} needs the bus baud rate, "
+            f"it cannot be auto-detected without transmitting"
+        )
+    if _use_worker(config):
+        # Import here to avoid circular imports
+        from .worker import ProcessTransport
+
+        inner = {**config, CONF_WORKER_PROCESS: False}
+        return ProcessTransport(key, _transport_key(inner), inner)
+    if transport == TRANSPORT_REPLAY:
+        return ReplayTransport(
+            key,
+            config[CONF_REPLAY_FILE],
+            config.get(CONF_REPLAY_SPEED, DEFAULT_REPLAY_SPEED),
+        )
+    if transport in (TRANSPORT_TCP, TRANSPORT_RTU_OVER_TCP):
+        return TcpTransport(
+            key,
+            config[CONF_HOST],
+            config.get(CONF_TCP_PORT, DEFAULT_TCP_PORT),
+            rtu_framing=transport == TRANSPORT_RTU_OVER_TCP,
+            pipelining=config.get(CONF_PIPELINE, DEFAULT_PIPELINE),
+        )
+    serial_transport: SerialTransport
+    if transport == TRANSPORT_PACE_ASCII:
+        serial_transport = PaceAsciiTransport(
+            key,
+            config[CONF_PORT],
+            config[CONF_BAUDRATE],
+            group_reads=config.get(CONF_GROUP_READ, DEFAULT_GROUP_READ),
+        )
+    elif config.get(CONF_PASSIVE, DEFAULT_PASSIVE):
+        serial_transport = SnifferTransport(
+            key,
+            config[CONF_PORT],
+            config[CONF_BAUDRATE],
+            # A block the other master read within one scan interval is fresh
+            max_age=config.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
+        )
+    elif config.get(CONF_LEAN_RTU, DEFAULT_LEAN_RTU):
+        serial_transport = RtuSerialTransport(key, config[CONF_PORT], config[CONF_BAUDRATE])
+    else:
+        serial_transport = SerialTransport(key, config[CONF_PORT], config[CONF_BAUDRATE])
+    serial_transport.low_latency = config.get(CONF_LOW_LATENCY, DEFAULT_LOW_LATENCY)
+    return serial_transport
+
+
+def _transport_settings(config: dict[str, Any]) -> tuple:
+    """Return the settings _create_transport() uses that the pool key leaves out."""
+    return (
+        config.get(CONF_BAUDRATE),
+        config.get(CONF_LEAN_RTU, DEFAULT_LEAN_RTU),
+        config.get(CONF_PASSIVE, DEFAULT_PASSIVE),
+        config.get(CONF_LOW_LATENCY, DEFAULT_LOW_LATENCY),
+        config.get(CONF_GROUP_READ, DEFAULT_GROUP_READ),
+        config.get(CONF_PIPELINE, DEFAULT_PIPELINE),
+        config.get(CONF_REPLAY_SPEED, DEFAULT_REPLAY_SPEED),
+        config.get(CONF_CAPTURE_FILE),
+        # A passive link's maximum block age follows the scan interval
+        config.get(CONF_PASSIVE, DEFAULT_PASSIVE)
+        and config.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
+    )
+
+
+def acquire_transport(config: dict[str, Any]) -> PaceBMSTransport:
+    """Return the pooled transport for a config entry, creating it if needed.
+
+    A link left open by an entry that was just unloaded is reused if it was
+    created with the same settings, so a reload keeps the port open.
+    """
+    key = _transport_key(config)
+    settings = _transport_settings(config)
+    stale = None
+    with _POOL_LOCK:
+        transport = _POOL.get(key)
+        if transport is not None and transport.users == 0:
+            transport.linger.cancel()
+            transport.linger = None
+            if transport.settings != settings:
+                stale = _POOL.pop(key)
+                transport = None
+            else:
+                _LOGGER.debug("Reusing the open link %s", key)
+        if transport is None:
+            transport = _POOL[key] = _create_transport(key, config)
+            transport.settings = settings
+        capture_file = config.get(CONF_CAPTURE_FILE)
+        if capture_file and transport.capture is None:
+            try:
+                transport.capture = BusCapture(capture_file)
+            except OSError as err:
+                _LOGGER.error("Failed to open capture file %s: %s", capture_file, err)
+        transport.users += 1
+    if stale is not None:
+        # Callers may be on the event loop; closing can block
+        threading.Thread(
+            target=_shutdown_transport, args=(stale,), name=f"close {key}", daemon=True
+        ).start()
+    return transport
+
+
+def release_transport(transport: PaceBMSTransport) -> None:
+    """Drop a reference to a pooled transport, closing it a little later when unused."""
+    with _POOL_LOCK:
+        transport.users -= 1
+        if transport.users > 0:
+            return
+        transport.linger = threading.Timer(TRANSPORT_LINGER, _expire_transport, (transport,))
+        transport.linger.daemon = True
+        transport.linger.start()
+
+
+def _expire_transport(transport: PaceBMSTransport) -> None:
+    """Close a link that no entry took up again."""
+    with _POOL_LOCK:
+        if transport.users > 0 or _POOL.get(transport.key) is not transport:
+            return
+        del _POOL[transport.key]
+        transport.linger = None
+    _shutdown_transport(transport)
+
+
+def _shutdown_transport(transport: PaceBMSTransport) -> None:
+    """Close a link for good and release its thread and capture file."""
+    transport.shutdown()
+    transport.executor.shutdown()
+    if transport.capture is not None:
+        transport.capture.close()
+        transport.capture = None
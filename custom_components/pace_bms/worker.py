@@ -0,0 +1,506 @@
+"""Out-of-process poller for large battery banks.
+
+With the worker process option, every pack behind a port is polled and
+decoded in a child process owned by that port. The child publishes each
+pack's latest poll into a fixed-layout slot of shared memory, guarded by a
+sequence counter so the reader never sees a half-written slot; coordinators
+only copy the slot out. Writes, on-demand reads and pack registration go
+over a pipe.
+"""
+import ctypes
+import functools
+import logging
+import multiprocessing
+import struct
+import time
+from multiprocessing.connection import Connection
+from typing import Any
+
+from pymodbus.exceptions import ConnectionException, ModbusException, ModbusIOException
+
+from .const import WORKER_SLOTS, WORKER_TIMEOUT
+from .decode import (
+    IDENTITY_BLOCKS,
+    IDENTITY_KEYS,
+    INTEGER_KEYS,
+    PARAMETER_BLOCK,
+    TELEMETRY_BLOCKS,
+    TELEMETRY_KEYS,
+    decode_parameters,
+    decode_telemetry,
+    default_parameters,
+    parameter_keys,
+    registers_to_string,
+)
+from .framing import ModbusCrcError, ModbusDeviceError
+from .stats import ERROR_CONNECTION, ERROR_CRC, ERROR_EXCEPTION, error_kind
+from .transport import PaceBMSTransport, SerialTransport, _create_transport
+
+_LOGGER = logging.getLogger(__name__)
+
+# Register blocks kept in a snapshot, in slot order
+SNAPSHOT_BLOCKS: list[tuple[int, int]] = [
+    *TELEMETRY_BLOCKS,
+    PARAMETER_BLOCK,
+    *IDENTITY_BLOCKS,
+]
+_TELEMETRY_MASK = (1 << len(TELEMETRY_BLOCKS)) - 1
+_PARAMETER_BIT = 1 << len(TELEMETRY_BLOCKS)
+_IDENTITY_SHIFT = len(TELEMETRY_BLOCKS) + 1
+
+# Sequence, wall time, monotonic time, duration, blocks read (bitmask)
+_HEADER = struct.Struct("<QdddH")
+_SEQUENCE = struct.Struct("<Q")
+_ERROR_SIZE = 120
+_IDENTITY_SIZE = 20
+_REGISTER_COUNT = sum(count for _, count in SNAPSHOT_BLOCKS)
+_REGISTERS = struct.Struct(f"<{_REGISTER_COUNT}H")
+
+# A spawned child never inherits Home Assistant's threads or event loop
+_CONTEXT = multiprocessing.get_context("spawn")
+
+
+@functools.cache
+def _value_keys() -> tuple[str, ...]:
+    """Return the decoded values kept in a snapshot, in slot order."""
+    return TELEMETRY_KEYS + parameter_keys()
+
+
+@functools.cache
+def _values() -> struct.Struct:
+    """Return the layout of the decoded values."""
+    return struct.Struct(f"<{len(_value_keys())}d")
+
+
+def _slot_size() -> int:
+    """Return the size of one pack's slot."""
+    return (
+        _HEADER.size
+        + _ERROR_SIZE
+        + _IDENTITY_SIZE * len(IDENTITY_BLOCKS)
+        + _REGISTERS.size
+        + _values().size
+    )
+
+
+class Snapshot:
+    """One pack's latest poll, copied out of shared memory."""
+
+    __slots__ = ("sequence", "time", "monotonic", "duration", "mask", "error", "blocks", "data")
+
+    def __init__(self, raw: bytes) -> None:
+        """Decode a slot."""
+        self.sequence, self.time, self.monotonic, self.duration, self.mask = (
+            _HEADER.unpack_from(raw)
+        )
+        offset = _HEADER.size
+        self.error = raw[offset:offset + _ERROR_SIZE].rstrip(b"\0").decode(errors="replace")
+        offset += _ERROR_SIZE
+        identity = []
+        for _ in IDENTITY_BLOCKS:
+            identity.append(raw[offset:offset + _IDENTITY_SIZE].rstrip(b"\0").decode())
+            offset += _IDENTITY_SIZE
+        registers = _REGISTERS.unpack_from(raw, offset)
+        offset += _REGISTERS.size
+        # Raw blocks read by the last poll, None where the read failed
+        self.blocks: list[tuple[int, ...] | None] = []
+        start = 0
+        for bit, (_, count) in enumerate(SNAPSHOT_BLOCKS):
+            fresh = self.mask & (1 << bit)
+            self.blocks.append(registers[start:start + count] if fresh else None)
+            start += count
+        self.data: dict[str, Any] = dict(zip(_value_keys(), _values().unpack_from(raw, offset)))
+        for key in INTEGER_KEYS:
+            self.data[key] = int(self.data[key])
+        for key, value in zip(IDENTITY_KEYS, identity):
+            self.data[key] = value or "Unknown"
+
+
+def _raise_error(kind: str, message: str, code: int | None) -> None:
+    """Re-raise an error reported by the worker as its original type."""
+    if kind == ERROR_EXCEPTION:
+        raise ModbusDeviceError(message, code)
+    if kind == ERROR_CRC:
+        raise ModbusCrcError(message)
+    if kind == ERROR_CONNECTION:
+        raise ConnectionException(message)
+    raise ModbusIOException(message)
+
+
+def _error_reply(err: Exception) -> tuple:
+    """Return the reply reporting a failed command."""
+    return (
+        "error",
+        error_kind(err),
+        getattr(err, "string", str(err)),
+        err.code if isinstance(err, ModbusDeviceError) else None,
+    )
+
+
+class ProcessTransport(PaceBMSTransport):
+    """Bus link served by a worker process that polls every pack on it."""
+
+    def __init__(self, key: str, inner_key: str, config: dict[str, Any]) -> None:
+        """Initialize."""
+        super().__init__(key)
+        self._inner_key = inner_key
+        self._config = config
+        self._process: multiprocessing.process.BaseProcess | None = None
+        self._conn: Connection | None = None
+        self._memory: Any = None
+        self._buffer: memoryview | None = None
+        # Slave ID -> slot index and poll interval
+        self._slots: dict[int, int] = {}
+        self._intervals: dict[int, float] = {}
+
+    def connect(self) -> None:
+        """Start the worker process if it is not running."""
+        with self.lock:
+            if self.is_connected():
+                return
+            self._stop()
+            self._memory = _CONTEXT.RawArray(ctypes.c_uint8, WORKER_SLOTS * _slot_size())
+            self._buffer = memoryview(self._memory).cast("B")
+            self._conn, child = _CONTEXT.Pipe()
+            self._process = _CONTEXT.Process(
+                target=run_worker,
+                args=(self._inner_key, self._config, self._memory, child),
+                name=f"pace_bms {self._inner_key}",
+                daemon=True,
+            )
+            self._process.start()
+            child.close()
+            _LOGGER.debug("Started poller process %d for %s", self._process.pid, self._inner_key)
+            # Every pack registers again with the new process
+            self._slots.clear()
+
+    def close(self) -> None:
+        """Ask the worker to reopen its link on the next poll."""
+        with self.lock:
+            if self.is_connected():
+                try:
+                    self._command("close")
+                except ModbusException:
+                    # The worker already had its time to answer
+                    self._stop(0)
+
+    def shutdown(self) -> None:
+        """Stop the worker process."""
+        with self.lock:
+            timeout = WORKER_TIMEOUT
+            if self.is_connected():
+                try:
+                    self._command("stop")
+                except ModbusException:
+                    # The worker already had its time to answer
+                    timeout = 0
+            self._stop(timeout)
+
+    def _stop(self, timeout: float = WORKER_TIMEOUT) -> None:
+        """Wait for the worker to exit, killing it after a timeout, and drop the shared memory."""
+        if self._process is not None:
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.kill()
+                self._process.join()
+            self._process = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._buffer is not None:
+            self._buffer.release()
+            self._buffer = None
+        self._memory = None
+
+    def is_connected(self) -> bool:
+        """Return True if the worker process is running."""
+        return self._process is not None and self._process.is_alive()
+
+    def _command(self, *command: Any) -> Any:
+        """Send a command to the worker and return its result."""
+        try:
+            self._conn.send(command)
+            if not self._conn.poll(WORKER_TIMEOUT):
+                raise ModbusIOException(f"Poller process for {self._inner_key} did not answer")
+            reply = self._conn.recv()
+        except (OSError, EOFError) as err:
+            raise ConnectionException(
+                f"Poller process for {self._inner_key} is gone: {err}"
+            ) from err
+        if reply[0] == "error":
+            _raise_error(*reply[1:])
+        return reply[1]
+
+    def register(self, slave_id: int, interval: float) -> None:
+        """Have the worker poll a pack, waiting for its first snapshot."""
+        with self.lock:
+            if self._intervals.get(slave_id) == interval and slave_id in self._slots:
+                return
+            self._intervals[slave_id] = interval
+            slot = self._slots[slave_id] = self._command("add", slave_id, interval)
+        deadline = time.monotonic() + WORKER_TIMEOUT
+        while self._sequence(slot) == 0:
+            if time.monotonic() > deadline:
+                raise ModbusIOException(f"Poller process published nothing for slave {slave_id}")
+            time.sleep(0.05)
+
+    def unregister(self, slave_id: int) -> None:
+        """Stop polling a pack."""
+        with self.lock:
+            self._intervals.pop(slave_id, None)
+            if self._slots.pop(slave_id, None) is not None and self.is_connected():
+                try:
+                    self._command("remove", slave_id)
+                except ModbusException as err:
+                    _LOGGER.debug("Failed to remove slave %d from poller: %s", slave_id, err)
+
+    def _sequence(self, slot: int) -> int:
+        """Return the sequence counter of a slot."""
+        return _SEQUENCE.unpack_from(self._buffer, slot * _slot_size())[0]
+
+    def snapshot(self, slave_id: int) -> Snapshot:
+        """Copy a pack's latest snapshot out of shared memory."""
+        slot = self._slots[slave_id]
+        size = _slot_size()
+        start = slot * size
+        deadline = time.monotonic() + WORKER_TIMEOUT
+        while True:
+            sequence = self._sequence(slot)
+            # An odd sequence means the worker is writing the slot
+            if not sequence & 1:
+                raw = bytes(self._buffer[start:start + size])
+                if self._sequence(slot) == sequence:
+                    return Snapshot(raw)
+            # A worker that died mid-write never finishes the slot
+            if not self.is_connected():
+                raise ModbusIOException(f"Poller process for {self._inner_key} is gone")
+            if time.monotonic() > deadline:
+                raise ModbusIOException(
+                    f"Poller process never finished writing slave {slave_id}"
+                )
+            time.sleep(0.0005)
+
+    def read_holding_registers(
+        self, slave_id: int, address: int, count: int
+    ) -> list[int]:
+        """Read holding registers through the worker, outside its polls."""
+        with self.lock:
+            self.connect()
+            return self._command("read", slave_id, address, count)
+
+    def write_registers(self, slave_id: int, address: int, values: list[int]) -> None:
+        """Write holding registers through the worker."""
+        with self.lock:
+            self.connect()
+            self._command("write", slave_id, address, values)
+
+
+class _Pack:
+    """A pack polled by the worker."""
+
+    __slots__ = ("slave_id", "slot", "interval", "next_poll", "sequence", "registers")
+
+    def __init__(self, slave_id: int, slot: int, interval: float) -> None:
+        """Initialize."""
+        self.slave_id = slave_id
+        self.slot = slot
+        self.interval = interval
+        self.next_poll = time.monotonic()
+        self.sequence = 0
+        # Last values of every snapshot block, kept when a later read fails
+        self.registers = [0] * _REGISTER_COUNT
+
+
+class _Worker:
+    """Poll loop running in the child process."""
+
+    def __init__(self, transport: PaceBMSTransport, buffer: memoryview, conn: Connection) -> None:
+        """Initialize."""
+        self.transport = transport
+        self.buffer = buffer
+        self.conn = conn
+        self.packs: dict[int, _Pack] = {}
+
+    def run(self) -> None:
+        """Poll due packs and serve commands until told to stop."""
+        while True:
+            pack = min(self.packs.values(), key=lambda pack: pack.next_poll, default=None)
+            timeout = 1.0 if pack is None else max(0.0, pack.next_poll - time.monotonic())
+            if self.conn.poll(timeout):
+                try:
+                    command = self.conn.recv()
+                except EOFError:
+                    # Home Assistant went away
+                    break
+                if not self._handle(command):
+                    break
+                continue
+            if pack is not None:
+                self._poll(pack)
+                pack.next_poll += pack.interval
+                if pack.next_poll < time.monotonic():
+                    pack.next_poll = time.monotonic() + pack.interval
+        self.transport.shutdown()
+
+    def _handle(self, command: tuple) -> bool:
+        """Serve one command; return False to stop."""
+        name, *args = command
+        if name == "stop":
+            self.conn.send(("ok", None))
+            return False
+        try:
+            result = getattr(self, f"_command_{name}")(*args)
+        except Exception as err:
+            self.conn.send(_error_reply(err))
+        else:
+            self.conn.send(("ok", result))
+        return True
+
+    def _command_add(self, slave_id: int, interval: float) -> int:
+        """Start polling a pack and return its slot."""
+        if (pack := self.packs.get(slave_id)) is not None:
+            pack.interval = interval
+            return pack.slot
+        used = {pack.slot for pack in self.packs.values()}
+        free = [slot for slot in range(WORKER_SLOTS) if slot not in used]
+        if not free:
+            raise ModbusIOException(f"Poller process serves at most {WORKER_SLOTS} packs")
+        self.packs[slave_id] = pack = _Pack(slave_id, free[0], interval)
+        # Nothing published yet
+        _SEQUENCE.pack_into(self.buffer, pack.slot * _slot_size(), 0)
+        return pack.slot
+
+    def _command_remove(self, slave_id: int) -> None:
+        """Stop polling a pack."""
+        self.packs.pop(slave_id, None)
+
+    def _command_close(self) -> None:
+        """Close the link; the next poll reopens it."""
+        self.transport.close()
+
+    def _command_read(self, slave_id: int, address: int, count: int) -> list[int]:
+        """Read holding registers."""
+        transport = self.transport
+        try:
+            self._connect(slave_id)
+            return transport.read_holding_registers(slave_id, address, count)
+        except ModbusDeviceError:
+            raise
+        except Exception:
+            transport.close()
+            raise
+
+    def _command_write(self, slave_id: int, address: int, values: list[int]) -> None:
+        """Write holding registers."""
+        transport = self.transport
+        try:
+            self._connect(slave_id)
+            transport.write_registers(slave_id, address, values)
+        except ModbusDeviceError:
+            raise
+        except Exception:
+            transport.close()
+            raise
+        # Let the next poll show the written value
+        if (pack := self.packs.get(slave_id)) is not None:
+            pack.next_poll = time.monotonic()
+
+    def _connect(self, slave_id: int) -> None:
+        """Open the link, detecting the baud rate first if needed."""
+        transport = self.transport
+        if (
+            isinstance(transport, SerialTransport)
+            and transport.auto_baudrate
+            and transport.baudrate is None
+        ):
+            transport.detect_baudrate(slave_id)
+        if not transport.is_connected():
+            transport.connect()
+            if isinstance(transport, SerialTransport) and transport.low_latency:
+                transport.tune_latency(slave_id)
+
+    def _poll(self, pack: _Pack) -> None:
+        """Poll and decode one pack and publish the result."""
+        transport = self.transport
+        started = time.monotonic()
+        data: dict[str, Any] = {}
+        identity = [""] * len(IDENTITY_BLOCKS)
+        blocks: list[list[int] | None] = []
+        mask = 0
+        error = ""
+        try:
+            self._connect(pack.slave_id)
+            telemetry = transport.read_blocks(pack.slave_id, TELEMETRY_BLOCKS)
+            decode_telemetry(data, TELEMETRY_BLOCKS, telemetry)
+            blocks.extend(telemetry)
+            mask = _TELEMETRY_MASK
+            try:
+                blocks.append(transport.read_holding_registers(pack.slave_id, *PARAMETER_BLOCK))
+                decode_parameters(data, blocks[-1])
+                mask |= _PARAMETER_BIT
+            except ModbusException as err:
+                _LOGGER.warning("Failed to read protection parameters block: %s", err)
+                blocks.append(None)
+                default_parameters(data)
+            try:
+                identity_blocks = transport.read_blocks(pack.slave_id, IDENTITY_BLOCKS)
+                identity = [registers_to_string(registers) for registers in identity_blocks]
+                blocks.extend(identity_blocks)
+                mask |= ((1 << len(IDENTITY_BLOCKS)) - 1) << _IDENTITY_SHIFT
+            except ModbusException as err:
+                _LOGGER.warning("Failed to read identification strings: %s", err)
+        except Exception as err:
+            error = f"Error communicating with BMS: {err}"
+            if not isinstance(err, ModbusDeviceError):
+                transport.close()
+        self._publish(pack, started, mask, error, blocks, data, identity)
+
+    def _publish(
+        self,
+        pack: _Pack,
+        started: float,
+        mask: int,
+        error: str,
+        blocks: list[list[int] | None],
+        data: dict[str, Any],
+        identity: list[str],
+    ) -> None:
+        """Write a poll result into the pack's slot."""
+        buffer = self.buffer
+        start = pack.slot * _slot_size()
+        now = time.monotonic()
+        # Odd while the slot is being written
+        pack.sequence += 1
+        _SEQUENCE.pack_into(buffer, start, pack.sequence)
+        _HEADER.pack_into(buffer, start, pack.sequence, time.time(), now, now - started, mask)
+        offset = start + _HEADER.size
+        buffer[offset:offset + _ERROR_SIZE] = error.encode()[:_ERROR_SIZE].ljust(_ERROR_SIZE, b"\0")
+        offset += _ERROR_SIZE
+        for text in identity:
+            raw = text.encode("ascii", errors="ignore")[:_IDENTITY_SIZE]
+            buffer[offset:offset + _IDENTITY_SIZE] = raw.ljust(_IDENTITY_SIZE, b"\0")
+            offset += _IDENTITY_SIZE
+        if mask:
+            position = 0
+            for (_, count), values in zip(SNAPSHOT_BLOCKS, blocks):
+                if values is not None:
+                    pack.registers[position:position + count] = values
+                position += count
+            _REGISTERS.pack_into(buffer, offset, *pack.registers)
+            _values().pack_into(
+                buffer,
+                offset + _REGISTERS.size,
+                *(float(data[key]) for key in _value_keys()),
+            )
+        pack.sequence += 1
+        _SEQUENCE.pack_into(buffer, start, pack.sequence)
+
+
+def run_worker(key: str, config: dict[str, Any], memory: Any, conn: Connection) -> None:
+    """Entry point of the worker process."""
+    logging.basicConfig(
+        level=logging.WARNING,
+        format=f"%(asctime)s %(levelname)s (pace_bms worker {key}) %(message)s",
+    )
+    buffer = memoryview(memory).cast("B")
+    _Worker(_create_transport(key, config), buffer, conn).run()
@@ -0,0 +1,413 @@
+"""Poll-cycle benchmark for the Pace BMS coordinator.
+
+Runs real ``PaceBMSCoordinator`` instances and their entities inside a
+headless Home Assistant core against the simulated bus from ``simulator.py``,
+over a matrix of baud rates, pack counts, scan intervals and frame-loss rates.
+
+    python tools/benchmark.py --packs 1,8,32 --baudrates 9600,115200 \\
+        --loss-rates 0,0.05 --duration 60 --output results.json
+    python tools/benchmark.py --baseline before.json --output after.json
+    python tools/benchmark.py --replay field.cap --speed 0 --scan-intervals 1
+
+Each matrix point reports poll latency percentiles, transactions, bytes on the
+wire, CPU time and entity state writes per poll. Results are written as JSON;
+with ``--baseline`` the relative change against an earlier run is printed.
+With ``--replay`` the coordinators are fed a bus capture instead, to profile
+decoding and the entity pipeline on production traffic.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from homeassistant.const import CONF_NAME  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.helpers import entity_registry as er  # noqa: E402
+from homeassistant.helpers.entity import Entity  # noqa: E402
+
+from custom_components.pace_bms import binary_sensor, number, sensor  # noqa: E402
+from custom_components.pace_bms.capture import read_transactions  # noqa: E402
+from custom_components.pace_bms.const import (  # noqa: E402
+    CONF_BAUDRATE,
+    CONF_LEAN_RTU,
+    CONF_PORT,
+    CONF_REPLAY_FILE,
+    CONF_REPLAY_SPEED,
+    CONF_SCAN_INTERVAL,
+    CONF_SLAVE_ID,
+    CONF_TRANSPORT,
+    CONF_WORKER_PROCESS,
+    DOMAIN,
+    REG_CELL_VOLTAGE_COUNT,
+    TRANSPORT_REPLAY,
+    TRANSPORT_SERIAL,
+)
+from custom_components.pace_bms.coordinator import PaceBMSCoordinator  # noqa: E402
+from simulator import BusSimulator, SimulatedPack, open_pty, run_pty  # noqa: E402
+
+PLATFORMS = (sensor, number, binary_sensor)
+
+# Metrics compared against a baseline run; lower is better for all of them
+COMPARED_METRICS = (
+    "latency_p50",
+    "latency_p95",
+    "transactions_per_poll",
+    "bytes_per_poll",
+    "cpu_per_poll",
+    "state_writes_per_poll",
+)
+
+_state_writes = 0
+_original_write = Entity.async_write_ha_state
+
+
+def _counting_write(self: Entity) -> None:
+    """Count entity state writes, then write as usual."""
+    global _state_writes
+    _state_writes += 1
+    _original_write(self)
+
+
+def _percentile(samples: list[float], percent: int) -> float | None:
+    """Return a percentile of samples (inclusive method)."""
+    if not samples:
+        return None
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[percent - 1]
+
+
+async def _add_entities(hass: HomeAssistant, coordinator: PaceBMSCoordinator) -> int:
+    """Create every platform's entities for a coordinator and subscribe them."""
+    entry = SimpleNamespace(entry_id=coordinator.entry_id, data=coordinator.config)
+    created: list[Entity] = []
+
+    def add_entities(entities, update_before_add: bool = False) -> None:
+        created.extend(entities)
+
+    for module in PLATFORMS:
+        await module.async_setup_entry(hass, entry, add_entities)
+    for index, entity in enumerate(created):
+        entity.hass = hass
+        entity.entity_id = f"sensor.bench_{coordinator.slave_id}_{index}"
+        await entity.async_added_to_hass()
+    return len(created)
+
+
+async def _measure(
+    configs: list[dict], scan_interval: float, duration: float, bus: BusSimulator | None
+) -> dict:
+    """Poll with one coordinator per config for a while and return the metrics."""
+    global _state_writes
+
+    hass = HomeAssistant(tempfile.mkdtemp())
+    await er.async_load(hass)
+    hass.data[DOMAIN] = {}
+    latencies: list[float] = []
+    failures = 0
+    coordinators: list[PaceBMSCoordinator] = []
+    entities = 0
+
+    def timed(coordinator: PaceBMSCoordinator):
+        update = coordinator._async_update_data
+
+        async def _timed_update():
+            nonlocal failures
+            started = time.perf_counter()
+            try:
+                return await update()
+            except Exception:
+                failures += 1
+                raise
+            finally:
+                latencies.append(time.perf_counter() - started)
+
+        return _timed_update
+
+    try:
+        for config in configs:
+            coordinator = PaceBMSCoordinator(
+                hass,
+                config,
+                timedelta(seconds=scan_interval),
+                f"bench_{config[CONF_SLAVE_ID]}",
+            )
+            hass.data[DOMAIN][coordinator.entry_id] = coordinator
+            await coordinator.async_refresh()
+            coordinators.append(coordinator)
+        for coordinator in coordinators:
+            entities += await _add_entities(hass, coordinator)
+            coordinator._async_update_data = timed(coordinator)
+
+        # Measure only the steady state once every pack is set up
+        if bus is not None:
+            requests, traffic = bus.requests, bus.bytes_in + bus.bytes_out
+            bus_cpu = bus.cpu_time
+        cpu = time.process_time()
+        _state_writes = 0
+        await asyncio.sleep(duration)
+        cpu = time.process_time() - cpu
+        writes = _state_writes
+        if bus is not None:
+            cpu -= bus.cpu_time - bus_cpu
+            requests = bus.requests - requests
+            traffic = bus.bytes_in + bus.bytes_out - traffic
+    finally:
+        for coordinator in coordinators:
+            await coordinator.async_shutdown()
+            await hass.async_add_executor_job(coordinator.disconnect)
+
+    polls = len(latencies)
+    return {
+        "duration": duration,
+        "entities": entities,
+        "polls": polls,
+        "failed_polls": failures,
+        "latency_p50": _percentile(latencies, 50),
+        "latency_p95": _percentile(latencies, 95),
+        "latency_p99": _percentile(latencies, 99),
+        "latency_max": max(latencies, default=None),
+        "transactions_per_poll": requests / polls if bus and polls else None,
+        "bytes_per_poll": traffic / polls if bus and polls else None,
+        "cpu_per_poll": cpu / polls if polls else None,
+        "state_writes_per_poll": writes / polls if polls else None,
+    }
+
+
+async def run_point(
+    baudrate: int,
+    packs: int,
+    scan_interval: float,
+    loss_rate: float,
+    duration: float,
+    lean_rtu: bool,
+    worker_process: bool = False,
+    cells: int = REG_CELL_VOLTAGE_COUNT,
+) -> dict:
+    """Benchmark one matrix point against the simulated bus."""
+    bus = BusSimulator(
+        [SimulatedPack(slave_id, cells=cells) for slave_id in range(1, packs + 1)],
+        baudrate=baudrate,
+        drop_rate=loss_rate,
+        seed=0,
+    )
+    master, path = open_pty()
+    stop = threading.Event()
+    server = threading.Thread(target=run_pty, args=(bus, master, stop), daemon=True)
+    server.start()
+
+    configs = [
+        {
+            CONF_NAME: f"Bench {slave_id}",
+            CONF_TRANSPORT: TRANSPORT_SERIAL,
+            CONF_PORT: path,
+            CONF_BAUDRATE: baudrate,
+            CONF_SLAVE_ID: slave_id,
+            CONF_SCAN_INTERVAL: scan_interval,
+            CONF_LEAN_RTU: lean_rtu,
+            CONF_WORKER_PROCESS: worker_process,
+        }
+        for slave_id in range(1, packs + 1)
+    ]
+    try:
+        metrics = await _measure(configs, scan_interval, duration, bus)
+    finally:
+        stop.set()
+        server.join()
+        os.close(master)
+
+    return {
+        "baudrate": baudrate,
+        "packs": packs,
+        "scan_interval": scan_interval,
+        "loss_rate": loss_rate,
+        "lean_rtu": lean_rtu,
+        "worker_process": worker_process,
+        "cells": cells,
+        **metrics,
+    }
+
+
+async def run_replay(path: str, speed: float, scan_interval: float, duration: float) -> dict:
+    """Benchmark decoding and the entity pipeline on captured traffic."""
+    slave_ids = sorted({request[0] for _, request, _, _ in read_transactions(path)})
+    configs = [
+        {
+            CONF_NAME: f"Replay {slave_id}",
+            CONF_TRANSPORT: TRANSPORT_REPLAY,
+            CONF_REPLAY_FILE: path,
+            CONF_REPLAY_SPEED: speed,
+            CONF_SLAVE_ID: slave_id,
+            CONF_SCAN_INTERVAL: scan_interval,
+        }
+        for slave_id in slave_ids
+    ]
+    metrics = await _measure(configs, scan_interval, duration, None)
+    return {
+        "replay": path,
+        "speed": speed,
+        "packs": len(slave_ids),
+        "scan_interval": scan_interval,
+        **metrics,
+    }
+
+
+def _point_key(result: dict) -> tuple:
+    """Return the matrix coordinates of a result."""
+    return (
+        result.get("baudrate"),
+        result["packs"],
+        result["scan_interval"],
+        result.get("loss_rate"),
+        result.get("lean_rtu"),
+        result.get("worker_process"),
+        result.get("replay"),
+    )
+
+
+def compare(results: list[dict], baseline: list[dict]) -> None:
+    """Print the relative change of every metric against a baseline run."""
+    previous = {_point_key(result): result for result in baseline}
+    for result in results:
+        before = previous.get(_point_key(result))
+        if before is None:
+            continue
+        changes = []
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), result.get(metric)
+            if old and new is not None:
+                changes.append(f"{metric} {100 * (new - old) / old:+.1f}%")
+        print("{} baud, {} packs, {}s, loss {}, replay {}: {}".format(
+            *_point_key(result)[:4], result.get("replay"), ", ".join(changes)
+        ))
+
+
+def _git_revision() -> str | None:
+    """Return the current commit, if run from a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _numbers(value: str, kind: type = int) -> list:
+    """Parse a comma-separated list."""
+    return [kind(item) for item in value.split(",")]
+
+
+def main() -> None:
+    """Run the benchmark matrix from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baudrates", type=_numbers, default=[9600, 19200, 115200])
+    parser.add_argument("--packs", type=_numbers, default=[1, 4, 16, 32])
+    parser.add_argument(
+        "--scan-intervals", type=lambda value: _numbers(value, float), default=[10.0, 30.0]
+    )
+    parser.add_argument(
+        "--loss-rates", type=lambda value: _numbers(value, float), default=[0.0, 0.02]
+    )
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds per point")
+    parser.add_argument("--lean-rtu", action="store_true", help="use the built-in RTU engine")
+    parser.add_argument(
+        "--worker-process", action="store_true", help="poll in a separate process per port"
+    )
+    parser.add_argument(
+        "--cells", type=int, default=REG_CELL_VOLTAGE_COUNT, help="populated cells per pack"
+    )
+    parser.add_argument("--replay", help="replay a capture file instead of simulating")
+    parser.add_argument(
+        "--speed", type=float, default=0.0, help="replay speed factor (0 = unthrottled)"
+    )
+    parser.add_argument("--output", default="benchmark.json", help="JSON results file")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show integration logs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # Entities are attached without an entity platform on purpose
+    logging.getLogger("homeassistant.helpers.entity").setLevel(logging.ERROR)
+    if not args.verbose:
+        # Injected frame loss makes the integration log every failed poll
+        for logger in ("custom_components.pace_bms", "pymodbus"):
+            logging.getLogger(logger).setLevel(logging.CRITICAL)
+    Entity.async_write_ha_state = _counting_write
+
+    results = []
+    if args.replay:
+        for scan_interval in args.scan_intervals:
+            result = asyncio.run(
+                run_replay(args.replay, args.speed, scan_interval, args.duration)
+            )
+            results.append(result)
+            print(
+                f"replay {result['packs']:>2} packs {scan_interval:>5}s "
+                f"polls {result['polls']:>4} p50 {result['latency_p50'] or 0:.4f}s "
+                f"cpu/poll {1000 * (result['cpu_per_poll'] or 0):.2f}ms",
+                flush=True,
+            )
+    for baudrate, packs, scan_interval, loss_rate in itertools.product(
+        [] if args.replay else args.baudrates,
+        args.packs,
+        args.scan_intervals,
+        args.loss_rates,
+    ):
+        result = asyncio.run(
+            run_point(
+                baudrate,
+                packs,
+                scan_interval,
+                loss_rate,
+                args.duration,
+                args.lean_rtu,
+                args.worker_process,
+                args.cells,
+            )
+        )
+        results.append(result)
+        print(
+            f"{baudrate:>6} baud {packs:>2} packs {scan_interval:>5}s loss {loss_rate:<5} "
+            f"polls {result['polls']:>4} p50 {result['latency_p50'] or 0:.3f}s "
+            f"p95 {result['latency_p95'] or 0:.3f}s "
+            f"tx/poll {result['transactions_per_poll'] or 0:.1f} "
+            f"cpu/poll {1000 * (result['cpu_per_poll'] or 0):.2f}ms",
+            flush=True,
+        )
+
+    document = {
+        "meta": {
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(document, indent=2))
+
+    if args.baseline:
+        compare(results, json.loads(Path(args.baseline).read_text())["results"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,539 @@
+"""Modbus RTU slave simulator for the Pace BMS register map.
+
+Serves one or more simulated packs over a pseudo-terminal (for the serial
+transports) or over TCP (Modbus TCP or RTU-over-TCP, for the gateway
+transports), so the integration can be run and benchmarked without hardware.
+
+    python tools/simulator.py --pty --packs 4 --cells 16
+    python tools/simulator.py --tcp 5020 --slaves 1,2 --drop-rate 0.02
+    python tools/simulator.py --pty --scenario tools/scenarios/cell_ov_trip.json
+
+Register layout follows ``const.py``: telemetry 0-36, protection parameters
+60-114 and identity strings 150-179.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import select
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+import tty
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "custom_components" / "pace_bms"))
+
+from const import (  # noqa: E402
+    MODBUS_CHAR_BITS,
+    PROTECTION_FLAGS,
+    REG_BALANCE_DELTA_VOLTAGE,
+    REG_BALANCE_START_VOLTAGE,
+    REG_CELL_OV_ALARM,
+    REG_CELL_OV_DELAY,
+    REG_CELL_OV_PROTECTION,
+    REG_CELL_OV_RELEASE,
+    REG_CELL_UV_ALARM,
+    REG_CELL_UV_DELAY,
+    REG_CELL_UV_PROTECTION,
+    REG_CELL_UV_RELEASE,
+    REG_CELL_VOLTAGE_COUNT,
+    REG_CELL_VOLTAGE_START,
+    REG_MODEL_SN,
+    REG_PACK_OV_ALARM,
+    REG_PACK_OV_DELAY,
+    REG_PACK_OV_PROTECTION,
+    REG_PACK_OV_RELEASE,
+    REG_PACK_SN,
+    REG_PACK_UV_ALARM,
+    REG_PACK_UV_DELAY,
+    REG_PACK_UV_PROTECTION,
+    REG_PACK_UV_RELEASE,
+    REG_PROTECTION_PARAMS_COUNT,
+    REG_PROTECTION_PARAMS_START,
+    REG_TEMP_GROUP_COUNT,
+    REG_TEMP_GROUP_START,
+    REG_VERSION_INFO,
+)
+from framing import (  # noqa: E402
+    FUNC_READ_HOLDING_REGISTERS,
+    FUNC_WRITE_MULTIPLE_REGISTERS,
+    crc16,
+    rtu_frame,
+)
+
+_LOGGER = logging.getLogger("pace_bms.simulator")
+
+REGISTER_COUNT = 256
+# Time the simulated BMS takes to start answering
+DEFAULT_TURNAROUND = 0.02
+
+EXC_ILLEGAL_FUNCTION = 0x01
+EXC_ILLEGAL_ADDRESS = 0x02
+EXC_ILLEGAL_VALUE = 0x03
+
+# Status register bits (see STATUS_FLAGS)
+STATUS_CHARGING = 1 << 8
+STATUS_DISCHARGING = 1 << 9
+STATUS_CHARGE_MOSFET = 1 << 10
+STATUS_DISCHARGE_MOSFET = 1 << 11
+
+REG_CURRENT = 0
+REG_PACK_VOLTAGE = 1
+REG_SOC = 2
+REG_SOH = 3
+REG_REMAIN = 4
+REG_FULL = 5
+REG_DESIGN = 6
+REG_CYCLES = 7
+REG_WARNING = 9
+REG_PROTECTION = 10
+REG_STATUS = 11
+REG_BALANCE = 12
+
+
+def _to_unsigned(value: int) -> int:
+    """Encode a signed value as a 16-bit register."""
+    return value & 0xFFFF
+
+
+def _string_registers(text: str) -> list[int]:
+    """Encode an ASCII string into 10 big-endian registers."""
+    raw = text.encode("ascii")[:20].ljust(20, b"\x00")
+    return list(struct.unpack(">10H", raw))
+
+
+class SimulatedPack:
+    """Register image and behaviour of one simulated Pace BMS."""
+
+    def __init__(
+        self,
+        slave_id: int,
+        cells: int = REG_CELL_VOLTAGE_COUNT,
+        temp_probes: int = 4,
+        capacity_ah: float = 100.0,
+        seed: int | None = None,
+    ) -> None:
+        """Initialize."""
+        self.slave_id = slave_id
+        self.cells = cells
+        self.temp_probes = temp_probes
+        self.capacity = capacity_ah
+        self.registers = [0] * REGISTER_COUNT
+        self._random = random.Random(seed if seed is not None else slave_id)
+        self._start = time.monotonic()
+        self._last_tick = self._start
+        self.remain = capacity_ah * 0.6
+        self.forced_current: float | None = None
+        # Per-cell offset from the pack mean in mV, plus optional overrides
+        self.cell_offsets = [self._random.uniform(-8, 8) for _ in range(cells)]
+        self.cell_overrides: dict[int, int] = {}
+        self.tripped = 0
+        self._load_defaults()
+
+    def _load_defaults(self) -> None:
+        """Fill identity strings and protection parameters."""
+        regs = self.registers
+        cells = self.cells
+        regs[REG_SOH] = 98
+        regs[REG_FULL] = int(self.capacity * 100)
+        regs[REG_DESIGN] = int(self.capacity * 100)
+        regs[REG_CYCLES] = 42 + self.slave_id
+        regs[REG_VERSION_INFO:REG_VERSION_INFO + 10] = _string_registers("P16S100A-SIM-1.0")
+        regs[REG_MODEL_SN:REG_MODEL_SN + 10] = _string_registers(f"SIMMODEL{self.slave_id:04d}")
+        regs[REG_PACK_SN:REG_PACK_SN + 10] = _string_registers(f"SIMPACK{self.slave_id:05d}")
+
+        for offset in range(REG_PROTECTION_PARAMS_COUNT):
+            regs[REG_PROTECTION_PARAMS_START + offset] = 10
+        defaults = {
+            REG_PACK_OV_ALARM: 3550 * cells,
+            REG_PACK_OV_PROTECTION: 3600 * cells,
+            REG_PACK_OV_RELEASE: 3400 * cells,
+            REG_PACK_OV_DELAY: 10,
+            REG_CELL_OV_ALARM: 3550,
+            REG_CELL_OV_PROTECTION: 3600,
+            REG_CELL_OV_RELEASE: 3400,
+            REG_CELL_OV_DELAY: 10,
+            REG_PACK_UV_ALARM: 2900 * cells,
+            REG_PACK_UV_PROTECTION: 2800 * cells,
+            REG_PACK_UV_RELEASE: 3000 * cells,
+            REG_PACK_UV_DELAY: 10,
+            REG_CELL_UV_ALARM: 2900,
+            REG_CELL_UV_PROTECTION: 2800,
+            REG_CELL_UV_RELEASE: 3000,
+            REG_CELL_UV_DELAY: 10,
+            REG_BALANCE_START_VOLTAGE: 3400,
+            REG_BALANCE_DELTA_VOLTAGE: 30,
+        }
+        for address, value in defaults.items():
+            regs[address] = value & 0xFFFF
+
+    def tick(self, now: float) -> None:
+        """Advance the simulated telemetry to a point in time."""
+        regs = self.registers
+        elapsed = now - self._start
+        dt = now - self._last_tick
+        self._last_tick = now
+
+        if self.tripped:
+            current = 0.0
+        elif self.forced_current is not None:
+            current = self.forced_current
+        else:
+            # Slow charge/discharge cycle with some jitter
+            current = 20 * math.sin(elapsed / 600 + self.slave_id) + self._random.uniform(-0.3, 0.3)
+        self.remain = min(max(self.remain + current * dt / 3600, 0.0), self.capacity)
+        soc = self.remain / self.capacity
+
+        mean_mv = 3000 + 400 * soc + current * 2
+        cell_mv = []
+        for index in range(REG_CELL_VOLTAGE_COUNT):
+            if index >= self.cells:
+                cell_mv.append(0)
+                continue
+            value = self.cell_overrides.get(
+                index + 1,
+                int(mean_mv + self.cell_offsets[index] + self._random.uniform(-1.5, 1.5)),
+            )
+            cell_mv.append(value)
+        regs[REG_CELL_VOLTAGE_START:REG_CELL_VOLTAGE_START + REG_CELL_VOLTAGE_COUNT] = cell_mv
+
+        populated = cell_mv[: self.cells]
+        regs[REG_CURRENT] = _to_unsigned(int(current * 100))
+        regs[REG_PACK_VOLTAGE] = sum(populated) // 10
+        regs[REG_SOC] = round(soc * 100)
+        regs[REG_REMAIN] = int(self.remain * 100)
+
+        temperatures = []
+        for index in range(REG_TEMP_GROUP_COUNT):
+            if index < 4 and index >= self.temp_probes:
+                temperatures.append(0)
+                continue
+            base = 250 + abs(current) * 2 + (40 if index == 4 else 0)
+            temperatures.append(_to_unsigned(int(base + self._random.uniform(-3, 3))))
+        regs[REG_TEMP_GROUP_START:REG_TEMP_GROUP_START + REG_TEMP_GROUP_COUNT] = temperatures
+
+        # Bleed cells above the balance start voltage that lead the minimum
+        start_mv = regs[REG_BALANCE_START_VOLTAGE]
+        delta_mv = regs[REG_BALANCE_DELTA_VOLTAGE]
+        low = min(populated) if populated else 0
+        balance = 0
+        for index, value in enumerate(populated):
+            if value >= start_mv and value - low >= delta_mv:
+                balance |= 1 << index
+        regs[REG_BALANCE] = balance
+
+        status = STATUS_CHARGE_MOSFET | STATUS_DISCHARGE_MOSFET
+        if self.tripped:
+            status &= ~STATUS_CHARGE_MOSFET
+        if current > 0.5:
+            status |= STATUS_CHARGING
+        elif current < -0.5:
+            status |= STATUS_DISCHARGING
+        regs[REG_STATUS] = status
+        regs[REG_PROTECTION] = self.tripped
+
+    def read(self, address: int, count: int) -> list[int] | int:
+        """Return registers, or an exception code."""
+        if not 1 <= count <= 125:
+            return EXC_ILLEGAL_VALUE
+        if address + count > REGISTER_COUNT:
+            return EXC_ILLEGAL_ADDRESS
+        return self.registers[address:address + count]
+
+    def write(self, address: int, values: list[int]) -> int:
+        """Store protection parameters; return 0 or an exception code."""
+        end = REG_PROTECTION_PARAMS_START + REG_PROTECTION_PARAMS_COUNT
+        if address < REG_PROTECTION_PARAMS_START or address + len(values) > end:
+            return EXC_ILLEGAL_ADDRESS
+        self.registers[address:address + len(values)] = values
+        return 0
+
+    def apply(self, event: dict) -> None:
+        """Apply one scenario action."""
+        action = event["action"]
+        if action == "trip":
+            self.tripped |= 1 << PROTECTION_FLAGS.index(event["flag"])
+        elif action == "clear":
+            self.tripped = 0
+        elif action == "set_cell":
+            self.cell_overrides[event["cell"]] = event["mv"]
+        elif action == "release_cell":
+            self.cell_overrides.pop(event["cell"], None)
+        elif action == "current":
+            self.forced_current = event.get("amps")
+        elif action == "set_register":
+            self.registers[event["register"]] = event["value"] & 0xFFFF
+        else:
+            raise ValueError(f"Unknown scenario action {action!r}")
+
+
+class BusSimulator:
+    """The slave side of a simulated RS485 bus carrying several packs."""
+
+    def __init__(
+        self,
+        packs: list[SimulatedPack],
+        baudrate: int = 9600,
+        turnaround: float = DEFAULT_TURNAROUND,
+        drop_rate: float = 0.0,
+        corrupt_rate: float = 0.0,
+        noise_rate: float = 0.0,
+        scenario: list[dict] | None = None,
+        realtime: bool = True,
+        seed: int | None = None,
+    ) -> None:
+        """Initialize."""
+        self.packs = {pack.slave_id: pack for pack in packs}
+        self.baudrate = baudrate
+        self.turnaround = turnaround
+        self.drop_rate = drop_rate
+        self.corrupt_rate = corrupt_rate
+        self.noise_rate = noise_rate
+        self.realtime = realtime
+        self._random = random.Random(seed)
+        self._scenario = sorted(scenario or [], key=lambda event: event["at"])
+        self._start = time.monotonic()
+        # One transaction at a time, as on a real half-duplex bus
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        # CPU spent answering, so benchmarks can subtract the simulator's share
+        self.cpu_time = 0.0
+
+    def _run_scenario(self, now: float) -> None:
+        """Apply every scenario event that is due."""
+        while self._scenario and self._scenario[0]["at"] <= now - self._start:
+            event = self._scenario.pop(0)
+            _LOGGER.info("Scenario: %s", event)
+            targets = [event["slave"]] if "slave" in event else list(self.packs)
+            for slave_id in targets:
+                if slave_id in self.packs:
+                    self.packs[slave_id].apply(event)
+
+    def response_delay(self, request_length: int, response_length: int) -> float:
+        """Return the time the exchange takes on a real line at the bus baud rate."""
+        char_time = MODBUS_CHAR_BITS / self.baudrate
+        return self.turnaround + (request_length + response_length) * char_time
+
+    def handle_pdu(self, slave_id: int, pdu: bytes) -> bytes | None:
+        """Answer one request PDU; None means the slave stays silent."""
+        pack = self.packs.get(slave_id)
+        if pack is None:
+            return None
+        now = time.monotonic()
+        self._run_scenario(now)
+        pack.tick(now)
+
+        function = pdu[0]
+        if function == FUNC_READ_HOLDING_REGISTERS and len(pdu) == 5:
+            address, count = struct.unpack_from(">HH", pdu, 1)
+            result = pack.read(address, count)
+            if isinstance(result, int):
+                return bytes((function | 0x80, result))
+            return struct.pack(f">BB{count}H", function, count * 2, *result)
+        if function == FUNC_WRITE_MULTIPLE_REGISTERS and len(pdu) >= 6:
+            address, count, byte_count = struct.unpack_from(">HHB", pdu, 1)
+            if byte_count != count * 2 or len(pdu) != 6 + byte_count:
+                return bytes((function | 0x80, EXC_ILLEGAL_VALUE))
+            code = pack.write(address, list(struct.unpack_from(f">{count}H", pdu, 6)))
+            if code:
+                return bytes((function | 0x80, code))
+            return pdu[:5]
+        return bytes((function | 0x80, EXC_ILLEGAL_FUNCTION))
+
+    def exchange(self, slave_id: int, pdu: bytes, request_length: int) -> bytes | None:
+        """Handle a request the way the bus would, including delay and faults."""
+        with self.lock:
+            started = time.thread_time()
+            self.requests += 1
+            self.bytes_in += request_length
+            if self._random.random() < self.drop_rate:
+                response = None
+            else:
+                response = self.handle_pdu(slave_id, pdu)
+            self.cpu_time += time.thread_time() - started
+            if response is None:
+                return None
+            if self.realtime:
+                time.sleep(self.response_delay(request_length, len(response) + 3))
+            self.bytes_out += len(response) + 3
+            return response
+
+    def damage(self, frame: bytes) -> bytes:
+        """Apply configured line faults to an outgoing frame."""
+        if self._random.random() < self.corrupt_rate:
+            index = self._random.randrange(len(frame))
+            frame = frame[:index] + bytes((frame[index] ^ 0x5A,)) + frame[index + 1:]
+        if self._random.random() < self.noise_rate:
+            frame = bytes(self._random.randrange(256) for _ in range(3)) + frame
+        return frame
+
+
+def _split_rtu_request(buffer: bytearray) -> bytes | None:
+    """Take one complete RTU request off the front of a buffer, resyncing on junk."""
+    while len(buffer) >= 8:
+        function = buffer[1]
+        if function == FUNC_WRITE_MULTIPLE_REGISTERS:
+            length = 9 + buffer[6]
+        else:
+            length = 8
+        if len(buffer) < length:
+            return None
+        frame = bytes(buffer[:length])
+        if crc16(frame[:-2]) == frame[-2] | frame[-1] << 8:
+            del buffer[:length]
+            return frame
+        del buffer[0]
+    return None
+
+
+def open_pty() -> tuple[int, str]:
+    """Open a raw pseudo-terminal; return the master fd and the slave path."""
+    master, slave = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    return master, os.ttyname(slave)
+
+
+def run_pty(bus: BusSimulator, master: int, stop: threading.Event | None = None) -> None:
+    """Answer requests arriving on a pty master until stopped."""
+    buffer = bytearray()
+    while stop is None or not stop.is_set():
+        if not select.select([master], [], [], 0.2)[0]:
+            continue
+        buffer += os.read(master, 1024)
+        while (frame := _split_rtu_request(buffer)) is not None:
+            response = bus.exchange(frame[0], frame[1:-2], len(frame))
+            if response is not None:
+                os.write(master, bus.damage(rtu_frame(frame[0], response)))
+
+
+def serve_pty(bus: BusSimulator) -> None:
+    """Serve the bus on a pseudo-terminal until interrupted."""
+    master, path = open_pty()
+    print(f"Simulated bus on {path}", flush=True)
+    run_pty(bus, master)
+
+
+class _TcpHandler(socketserver.BaseRequestHandler):
+    """One TCP client of the simulated gateway."""
+
+    server: "_TcpServer"
+
+    def handle(self) -> None:
+        """Serve requests until the client disconnects."""
+        bus = self.server.bus
+        sock: socket.socket = self.request
+        buffer = bytearray()
+        while True:
+            data = sock.recv(1024)
+            if not data:
+                return
+            buffer += data
+            if self.server.rtu_framing:
+                while (frame := _split_rtu_request(buffer)) is not None:
+                    response = bus.exchange(frame[0], frame[1:-2], len(frame))
+                    if response is not None:
+                        sock.sendall(bus.damage(rtu_frame(frame[0], response)))
+                continue
+            while len(buffer) >= 7:
+                transaction_id, protocol_id, length, unit_id = struct.unpack_from(">HHHB", buffer)
+                if len(buffer) < 6 + length:
+                    break
+                pdu = bytes(buffer[7:6 + length])
+                del buffer[:6 + length]
+                response = bus.exchange(unit_id, pdu, len(pdu) + 3)
+                if response is None:
+                    continue
+                sock.sendall(
+                    struct.pack(">HHHB", transaction_id, protocol_id, len(response) + 1, unit_id)
+                    + response
+                )
+
+
+class _TcpServer(socketserver.ThreadingTCPServer):
+    """Simulated serial-to-Ethernet gateway."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, port: int, bus: BusSimulator, rtu_framing: bool) -> None:
+        """Initialize."""
+        self.bus = bus
+        self.rtu_framing = rtu_framing
+        super().__init__(("0.0.0.0", port), _TcpHandler)
+
+
+def serve_tcp(bus: BusSimulator, port: int, rtu_framing: bool = False) -> _TcpServer:
+    """Start a simulated gateway in a background thread and return it."""
+    server = _TcpServer(port, bus, rtu_framing)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    mode = "RTU over TCP" if rtu_framing else "Modbus TCP"
+    print(f"Simulated gateway ({mode}) on port {server.server_address[1]}", flush=True)
+    return server
+
+
+def build_bus(args: argparse.Namespace) -> BusSimulator:
+    """Create the simulated bus from command-line arguments."""
+    if args.slaves:
+        slave_ids = [int(slave_id) for slave_id in args.slaves.split(",")]
+    else:
+        slave_ids = list(range(1, args.packs + 1))
+    packs = [
+        SimulatedPack(slave_id, cells=args.cells, temp_probes=args.temp_probes, seed=args.seed)
+        for slave_id in slave_ids
+    ]
+    scenario = json.loads(Path(args.scenario).read_text()) if args.scenario else None
+    return BusSimulator(
+        packs,
+        baudrate=args.baudrate,
+        drop_rate=args.drop_rate,
+        corrupt_rate=args.corrupt_rate,
+        noise_rate=args.noise_rate,
+        scenario=scenario,
+        realtime=not args.no_delay,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    """Run the simulator from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pty", action="store_true", help="serve on a pseudo-terminal")
+    parser.add_argument("--tcp", type=int, metavar="PORT", help="serve as a TCP gateway")
+    parser.add_argument("--rtu-over-tcp", action="store_true", help="use RTU framing on TCP")
+    parser.add_argument("--packs", type=int, default=1, help="packs with slave IDs 1..N")
+    parser.add_argument("--slaves", help="comma-separated slave IDs (overrides --packs)")
+    parser.add_argument("--cells", type=int, default=16, help="populated cells per pack")
+    parser.add_argument("--temp-probes", type=int, default=4, help="populated cell probes")
+    parser.add_argument("--baudrate", type=int, default=9600, help="baud rate to emulate")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="share of unanswered requests")
+    parser.add_argument("--corrupt-rate", type=float, default=0.0, help="share of CRC-corrupted replies")
+    parser.add_argument("--noise-rate", type=float, default=0.0, help="share of replies preceded by noise")
+    parser.add_argument("--scenario", help="JSON file with timed scenario events")
+    parser.add_argument("--no-delay", action="store_true", help="answer without line delays")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible runs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    bus = build_bus(args)
+    if args.tcp is not None:
+        serve_tcp(bus, args.tcp, args.rtu_over_tcp)
+    try:
+        if args.pty:
+            serve_pty(bus)
+        else:
+            threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()